@@ -0,0 +1,51 @@
+"""Benchmarks of the penalty evaluation and the result creation."""
+from glotaran.analysis.evaluation_plan import EvaluationPlan
+from glotaran.analysis.optimize import _create_result
+from glotaran.analysis.optimize import calculate_penalty
+from glotaran.parameter import ParameterLayout
+
+from .scenarios import COMPARTMENTS
+from .scenarios import DATASET_SIZES
+from .scenarios import GROUPED
+from .scenarios import INDEX_DEPENDENT
+from .scenarios import create_prepared_scheme
+
+PARAMS = (DATASET_SIZES, COMPARTMENTS, GROUPED, INDEX_DEPENDENT)
+PARAM_NAMES = ["size", "compartments", "grouped", "index_dependent"]
+
+
+class CalculatePenalty:
+    params = PARAMS
+    param_names = PARAM_NAMES
+
+    def setup(self, size, compartments, grouped, index_dependent):
+        scheme, bag, groups = create_prepared_scheme(size, compartments, grouped, index_dependent)
+        self.evaluation_plan = EvaluationPlan(scheme, bag, groups)
+        self.parameter = scheme.parameter.as_parameter_dict()
+        self.parameter_layout = ParameterLayout(scheme.parameter)
+        # compile the kernels outside of the measurement
+        calculate_penalty(self.parameter, self.evaluation_plan, self.parameter_layout)
+
+    def time_calculate_penalty(self, size, compartments, grouped, index_dependent):
+        calculate_penalty(self.parameter, self.evaluation_plan, self.parameter_layout)
+
+    def peakmem_calculate_penalty(self, size, compartments, grouped, index_dependent):
+        calculate_penalty(self.parameter, self.evaluation_plan, self.parameter_layout)
+
+
+class CreateResult:
+    params = PARAMS
+    param_names = PARAM_NAMES
+    # the result is written into the datasets of the scheme, so every sample needs a new one
+    number = 1
+    warmup_time = 0
+    timeout = 300
+
+    def setup(self, size, compartments, grouped, index_dependent):
+        self.scheme, _, _ = create_prepared_scheme(size, compartments, grouped, index_dependent)
+
+    def time_create_result(self, size, compartments, grouped, index_dependent):
+        _create_result(self.scheme, self.scheme.parameter)
+
+    def peakmem_create_result(self, size, compartments, grouped, index_dependent):
+        _create_result(self.scheme, self.scheme.parameter)
@@ -0,0 +1,67 @@
+"""Benchmarks of reading data and saving results."""
+import os
+import shutil
+import tempfile
+
+from glotaran.analysis.optimize import optimize
+from glotaran.builtin.file_formats.ascii.wavelength_time_explicit_file import (
+    WavelengthExplicitFile,
+)
+from glotaran.builtin.file_formats.ascii.wavelength_time_explicit_file import read_ascii_time_trace
+
+from .scenarios import COMPARTMENTS
+from .scenarios import DATASET_SIZES
+from .scenarios import GROUPED
+from .scenarios import create_scheme
+
+
+class ReadAsciiTimeTrace:
+    params = DATASET_SIZES
+    param_names = ["size"]
+
+    def setup(self, size):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "data.ascii")
+        dataset = create_scheme(size, 3, False, False).data["dataset1"]
+        WavelengthExplicitFile(filepath=self.path, dataset=dataset.data).write(
+            file_format="WavelengthExplicit"
+        )
+
+    def teardown(self, size):
+        shutil.rmtree(self.directory)
+
+    def time_read_ascii_time_trace(self, size):
+        read_ascii_time_trace(self.path)
+
+    def peakmem_read_ascii_time_trace(self, size):
+        read_ascii_time_trace(self.path)
+
+
+class SaveResult:
+    params = (DATASET_SIZES, COMPARTMENTS, GROUPED)
+    param_names = ["size", "compartments", "grouped"]
+    timeout = 300
+
+    def setup_cache(self):
+        # one optimization step is enough to get a complete result
+        results = {}
+        for size in DATASET_SIZES:
+            for compartments in COMPARTMENTS:
+                for grouped in GROUPED:
+                    scheme = create_scheme(size, compartments, grouped, False)
+                    scheme.nfev = 1
+                    results[size, compartments, grouped] = optimize(scheme, verbose=False)
+        return results
+
+    def setup(self, results, size, compartments, grouped):
+        self.result = results[size, compartments, grouped]
+        self.directory = tempfile.mkdtemp()
+
+    def teardown(self, results, size, compartments, grouped):
+        shutil.rmtree(self.directory)
+
+    def time_save(self, results, size, compartments, grouped):
+        self.result.save(self.directory)
+
+    def peakmem_save(self, results, size, compartments, grouped):
+        self.result.save(self.directory)
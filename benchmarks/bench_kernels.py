@@ -0,0 +1,79 @@
+"""Benchmarks of the numba kernels."""
+import numpy as np
+
+from glotaran.analysis.variable_projection import residual_variable_projection
+from glotaran.analysis.variable_projection import residual_variable_projection_stacked
+from glotaran.builtin.models.kinetic_image.kinetic_image_matrix import (
+    calculate_kinetic_matrix_gaussian_irf,
+)
+from glotaran.builtin.models.kinetic_image.kinetic_image_matrix import (
+    calculate_kinetic_matrix_gaussian_irf_block,
+)
+from glotaran.builtin.models.kinetic_image.kinetic_image_matrix import (
+    calculate_kinetic_matrix_no_irf,
+)
+
+from .scenarios import COMPARTMENTS
+from .scenarios import DATASET_SIZES
+
+BLOCK_SIZE = 64
+"""The number of indices in a block of matrices."""
+
+
+class KineticMatrix:
+    params = (DATASET_SIZES, COMPARTMENTS)
+    param_names = ["size", "compartments"]
+
+    def setup(self, size, compartments):
+        self.times = np.linspace(-1, 20, size)
+        self.rates = -0.5 / np.arange(1, compartments + 1)
+        self.matrix = np.zeros((size, compartments))
+        self.centers = np.asarray([0.3, 0.5])
+        self.widths = np.asarray([0.1, 0.4])
+        self.scales = np.asarray([1.0, 0.5])
+        self.block = np.zeros((BLOCK_SIZE, size, compartments))
+        self.block_centers = 0.3 + np.linspace(0, 0.2, BLOCK_SIZE)[:, np.newaxis] * [1, 1]
+        self.block_widths = np.tile(self.widths, (BLOCK_SIZE, 1))
+        # compile the kernels outside of the measurement
+        self.time_no_irf(size, compartments)
+        self.time_gaussian_irf(size, compartments)
+        self.time_gaussian_irf_block(size, compartments)
+
+    def time_no_irf(self, size, compartments):
+        calculate_kinetic_matrix_no_irf(self.matrix, self.rates, self.times)
+
+    def time_gaussian_irf(self, size, compartments):
+        calculate_kinetic_matrix_gaussian_irf(
+            self.matrix, self.rates, self.times, self.centers, self.widths, self.scales, False, 0
+        )
+
+    def time_gaussian_irf_block(self, size, compartments):
+        calculate_kinetic_matrix_gaussian_irf_block(
+            self.block,
+            self.rates,
+            self.times,
+            self.block_centers,
+            self.block_widths,
+            self.scales,
+            False,
+            0,
+        )
+
+
+class VariableProjection:
+    params = (DATASET_SIZES, COMPARTMENTS)
+    param_names = ["size", "compartments"]
+
+    def setup(self, size, compartments):
+        generator = np.random.default_rng(42)
+        self.matrices = generator.random((BLOCK_SIZE, size, compartments))
+        self.data = generator.random((BLOCK_SIZE, size))
+        # compile the kernels outside of the measurement
+        self.time_stacked(size, compartments)
+
+    def time_single(self, size, compartments):
+        for matrix, data in zip(self.matrices, self.data):
+            residual_variable_projection(matrix, data)
+
+    def time_stacked(self, size, compartments):
+        residual_variable_projection_stacked(self.matrices, self.data)
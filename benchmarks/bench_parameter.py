@@ -0,0 +1,29 @@
+"""Benchmarks of the conversion between parameter groups and lmfit parameter."""
+from glotaran.parameter import ParameterGroup
+from glotaran.parameter import ParameterLayout
+
+from .scenarios import COMPARTMENTS
+
+
+class FromParameterDict:
+    params = [10 * compartments for compartments in COMPARTMENTS] + [1000]
+    param_names = ["parameter"]
+
+    def setup(self, parameter):
+        group = ParameterGroup.from_dict(
+            {
+                "kinetic": [0.1 * (i + 1) for i in range(parameter // 2)],
+                "shape": {"amps": [1.0] * (parameter - parameter // 2)},
+            }
+        )
+        self.parameter = group.as_parameter_dict()
+        self.parameter_layout = ParameterLayout(group)
+
+    def time_from_parameter_dict(self, parameter):
+        ParameterGroup.from_parameter_dict(self.parameter)
+
+    def peakmem_from_parameter_dict(self, parameter):
+        ParameterGroup.from_parameter_dict(self.parameter)
+
+    def time_update_from_parameter_dict(self, parameter):
+        self.parameter_layout.update_from_parameter_dict(self.parameter)
@@ -0,0 +1,141 @@
+"""Synthetic analysis scenarios for the benchmarks.
+
+The scenarios generalize :mod:`glotaran.examples.sequential` to an arbitrary number of
+compartments and datasets. A dispersive irf makes a scenario index dependent, more than one
+dataset makes it grouped.
+"""
+import functools
+
+import numpy as np
+
+from glotaran.analysis.optimize import _create_problem_bag
+from glotaran.analysis.scheme import Scheme
+from glotaran.analysis.simulation import simulate
+from glotaran.builtin.models.kinetic_spectrum import KineticSpectrumModel
+from glotaran.examples import sequential
+from glotaran.parameter import ParameterGroup
+
+DATASET_SIZES = [100, 1000]
+"""The number of points on the time axis, the spectral axis has a tenth of them."""
+
+COMPARTMENTS = [3, 6]
+
+GROUPED = [False, True]
+
+INDEX_DEPENDENT = [False, True]
+
+
+def _model_dict(compartments, datasets, index_dependent, with_shapes):
+    labels = [f"s{i + 1}" for i in range(compartments)]
+    matrix = {(labels[i + 1], labels[i]): f"kinetic.{i + 1}" for i in range(compartments - 1)}
+    matrix[(labels[-1], labels[-1])] = f"kinetic.{compartments}"
+
+    irf = {"type": "spectral-gaussian", "center": "irf.center", "width": "irf.width"}
+    if index_dependent:
+        # lmfit parameter names can not contain underscores in the labels
+        irf["dispersion_center"] = "irf.dispcenter"
+        irf["center_dispersion"] = ["irf.disp1"]
+
+    dataset = {"initial_concentration": "j1", "megacomplex": ["m1"], "irf": "irf1"}
+    model = {
+        "initial_concentration": {
+            "j1": {
+                "compartments": labels,
+                "parameters": ["j.1"] + ["j.0"] * (compartments - 1),
+            },
+        },
+        "k_matrix": {"k1": {"matrix": matrix}},
+        "megacomplex": {"m1": {"k_matrix": ["k1"]}},
+        "irf": {"irf1": irf},
+        "dataset": {f"dataset{i + 1}": dict(dataset) for i in range(datasets)},
+    }
+    if with_shapes:
+        model["shape"] = {
+            f"sh{i + 1}": {
+                "type": "gaussian",
+                "amplitude": f"shape.amps.{i + 1}",
+                "location": f"shape.locs.{i + 1}",
+                "width": f"shape.width.{i + 1}",
+            }
+            for i in range(compartments)
+        }
+        for dataset in model["dataset"].values():
+            dataset["shape"] = {label: f"sh{i + 1}" for i, label in enumerate(labels)}
+    return model
+
+
+def _parameter_dict(compartments, index_dependent, with_shapes):
+    parameter = {
+        "j": [
+            ["1", 1, {"vary": False, "non-negative": False}],
+            ["0", 0, {"vary": False, "non-negative": False}],
+        ],
+        "kinetic": [0.5 / (i + 1) for i in range(compartments)],
+        "irf": [
+            ["center", sequential.wanted_parameter.get("irf.center").value],
+            ["width", sequential.wanted_parameter.get("irf.width").value],
+        ],
+    }
+    if index_dependent:
+        parameter["irf"] += [["dispcenter", 650], ["disp1", 0.1]]
+    if with_shapes:
+        parameter["shape"] = {
+            "amps": [30 + 5 * i for i in range(compartments)],
+            "locs": list(np.linspace(610, 690, compartments)),
+            "width": [40] * compartments,
+        }
+    return parameter
+
+
+@functools.lru_cache(maxsize=None)
+def create_scheme(size, compartments, grouped, index_dependent):
+    """Creates a scheme with simulated data.
+
+    Parameters
+    ----------
+    size :
+        The number of points on the time axis.
+    compartments :
+        The number of compartments of the sequential decay.
+    grouped :
+        If `True`, the scheme contains two datasets with overlapping spectral axes.
+    index_dependent :
+        If `True`, the irf is dispersive.
+    """
+    datasets = 2 if grouped else 1
+    sim_model = KineticSpectrumModel.from_dict(
+        _model_dict(compartments, datasets, index_dependent, True)
+    )
+    wanted = ParameterGroup.from_dict(_parameter_dict(compartments, index_dependent, True))
+    model = KineticSpectrumModel.from_dict(
+        _model_dict(compartments, datasets, index_dependent, False)
+    )
+    parameter = ParameterGroup.from_dict(_parameter_dict(compartments, index_dependent, False))
+
+    time = np.linspace(-1, 20, size)
+    data = {}
+    for i, label in enumerate(sim_model.dataset):
+        spectral = np.linspace(600 + 5 * i, 700 + 5 * i, max(size // 10, 10))
+        data[label] = simulate(
+            sim_model,
+            label,
+            wanted,
+            {"time": time, "spectral": spectral},
+            noise=True,
+            noise_std_dev=1e-2,
+            noise_seed=42,
+        )
+    return Scheme(model=model, parameter=parameter, data=data)
+
+
+def create_prepared_scheme(size, compartments, grouped, index_dependent):
+    """Creates a scheme like :func:`create_scheme` with prepared data and its problem bag."""
+    scheme = create_scheme(size, compartments, grouped, index_dependent)
+    scheme = Scheme(
+        model=scheme.model,
+        parameter=scheme.parameter,
+        data={label: dataset.copy() for label, dataset in scheme.data.items()},
+    )
+    scheme.prepare_data(copy=False)
+    bag, groups = _create_problem_bag(scheme)
+    return scheme, bag, groups
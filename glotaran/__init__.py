@@ -1,24 +1,45 @@
-"""Glotaran package __init__.py"""
+"""Glotaran package __init__.py
 
-from . import io  # noqa: F401
-from . import model  # noqa: F401
-from . import parameter
+The subpackages and the functions exported here are imported on their first use, so that
+importing glotaran does not import the numerical libraries. The models and file formats of
+plugins are loaded on the first lookup, see :mod:`glotaran.plugins`.
+"""
+import importlib
+import sys
+import types
 
 __version__ = "0.1.0"
 
-ParameterGroup = parameter.ParameterGroup
-
-read_parameter_from_csv_file = ParameterGroup.from_csv
-read_parameter_from_yml = ParameterGroup.from_yaml
-read_parameter_from_yml_file = ParameterGroup.from_yaml_file
-
-
-from .parse import parser  # noqa: E402
-
-read_model_from_yml = parser.load_yml
-read_model_from_yml_file = parser.load_yml_file
-
-import pkg_resources  # noqa: E402
-
-for entry_point in pkg_resources.iter_entry_points("glotaran.plugins"):
-    entry_point.load()
+_SUBPACKAGES = {"analysis", "builtin", "cli", "examples", "io", "model", "parameter", "parse"}
+
+_EXPORTS = {
+    "ParameterGroup": ("glotaran.parameter", "ParameterGroup"),
+    "read_parameter_from_csv_file": ("glotaran.parameter", "ParameterGroup.from_csv"),
+    "read_parameter_from_yml": ("glotaran.parameter", "ParameterGroup.from_yaml"),
+    "read_parameter_from_yml_file": ("glotaran.parameter", "ParameterGroup.from_yaml_file"),
+    "read_model_from_yml": ("glotaran.parse.parser", "load_yml"),
+    "read_model_from_yml_file": ("glotaran.parse.parser", "load_yml_file"),
+    "warmup": ("glotaran.kernels", "warmup"),
+}
+"""The exported names and the module and attribute they are imported from."""
+
+
+class _LazyModule(types.ModuleType):
+    # a module level __getattr__ needs python 3.7
+    def __getattr__(self, name):
+        if name in _SUBPACKAGES:
+            return importlib.import_module(f"{__name__}.{name}")
+        if name in _EXPORTS:
+            module_name, attribute = _EXPORTS[name]
+            value = importlib.import_module(module_name)
+            for part in attribute.split("."):
+                value = getattr(value, part)
+            setattr(self, name, value)
+            return value
+        raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | _SUBPACKAGES | set(_EXPORTS))
+
+
+sys.modules[__name__].__class__ = _LazyModule
@@ -0,0 +1,725 @@
+"""The evaluation plan for the penalty calculation of a scheme."""
+
+import functools
+import typing
+
+import numpy as np
+from dask.optimization import cull
+from dask.system import CPU_COUNT
+from dask.threaded import get as threaded_get
+
+from glotaran.model.bound_item import BoundItem
+from glotaran.parameter import ParameterGroup
+
+from .matrix_calculation import LabelAndMatrix
+from .matrix_calculation import LabelAndMatrixAndDerivatives
+from .matrix_calculation import _calculate_matrix
+from .matrix_calculation import _calculate_matrix_derivatives
+from .matrix_calculation import _combine_matrices
+from .matrix_calculation import _combine_matrix_derivatives
+from .nnls import residual_nnls
+from .nnls import residual_nnls_stacked
+from .problem_bag import create_grouped_problems
+from .problem_bag import grouped_problem_block
+from .profiling import Profile
+from .scheme import Scheme
+from .variable_projection import jacobian_variable_projection
+from .variable_projection import residual_variable_projection
+from .variable_projection import residual_variable_projection_stacked
+
+PARAMETER_KEY = ("parameter",)
+DESCRIPTORS_KEY = ("descriptors",)
+PENALTY_KEY = ("penalty",)
+
+STACK_SIZE = 256
+"""The maximum number of problems with different matrices or weights which are solved together
+in one task."""
+
+RUN_SIZE = 16
+"""The minimum number of neighbouring data columns with the same weight which are solved with
+one factorization of the weighted matrix. Shorter runs are solved in stacks."""
+
+BLOCK_SIZE = 2 ** 19
+"""The size in bytes of a block of data columns which are solved together with one matrix.
+
+The solver passes the data twice, so a block should fit into the L2 cache.
+"""
+
+
+class EvaluationPlan:
+    """An evaluation plan is a task graph which calculates the penalty of a scheme.
+
+    The graph is built once from the scheme and the problem bag. The parameter are a placeholder
+    in the graph, so an evaluation only feeds in new parameter and runs the same graph again.
+
+    If the model supplies matrix derivatives, the graph also contains the tasks for the Jacobian
+    of the penalty.
+
+    The dataset descriptors are bound to the model once and filled in place, so a plan must not
+    be evaluated by several threads at the same time.
+    """
+
+    def __init__(self, scheme: Scheme, bag, groups, profile: Profile = None):
+        """
+
+        Parameters
+        ----------
+        scheme :
+            The scheme to evaluate. The data of the scheme must be prepared.
+        bag :
+            The problem bag of the scheme. Grouped problems are taken from the packed buffers of
+            :func:`glotaran.analysis.problem_bag.create_grouped_problems` instead.
+        groups :
+            The dataset groups of the scheme, `None` if the model is not grouped.
+        profile :
+            If given, the time spent in the phases of the evaluation is recorded in the profile.
+        """
+        model = scheme.model
+
+        self._model = model
+        self._profile = profile
+        self._data = scheme.data
+        self._residual_function = residual_nnls if scheme.nnls else residual_variable_projection
+        self._stacked_residual_function = (
+            residual_nnls_stacked if scheme.nnls else residual_variable_projection_stacked
+        )
+        self._has_constraints = (
+            callable(model.has_matrix_constraints_function)
+            and model.has_matrix_constraints_function()
+        )
+        self._penalty_function = (
+            model.additional_penalty_function
+            if callable(model.has_additional_penalty_function)
+            and model.has_additional_penalty_function()
+            else None
+        )
+
+        # the Kaufman Jacobian is only implemented for the unconstrained variable projection
+        self._has_jacobian = (
+            model.matrix_derivative is not None
+            and not scheme.nnls
+            and not self._has_constraints
+            and self._penalty_function is None
+        )
+
+        self._graph = {}
+        for label, descriptor in model.dataset.items():
+            self._graph[("descriptor", label)] = (
+                self._profiled("fill", label, BoundItem(descriptor, model).fill),
+                PARAMETER_KEY,
+            )
+        self._graph[DESCRIPTORS_KEY] = (
+            functools.partial(_collect_descriptors, list(model.dataset)),
+            [("descriptor", label) for label in model.dataset],
+        )
+        self._penalty_keys = []
+        self._jacobian_keys = []
+
+        if model.grouped():
+            problems = create_grouped_problems(scheme)
+            if model.index_dependent():
+                self._add_index_dependent_grouped_tasks(problems)
+            else:
+                self._add_index_independent_grouped_tasks(problems)
+        else:
+            if model.index_dependent():
+                self._add_index_dependent_ungrouped_tasks(bag)
+            else:
+                self._add_index_independent_ungrouped_tasks(bag)
+
+        self._graph[PENALTY_KEY] = (
+            self._profiled("penalty", None, _concatenate_penalty),
+            self._penalty_keys,
+        )
+
+        # the threaded scheduler runs every task of a graph, so the graph is split in the tasks
+        # needed for the penalty and the tasks needed for the Jacobian
+        graph = {**self._graph, PARAMETER_KEY: None}
+        self._penalty_graph, _ = cull(graph, [PENALTY_KEY])
+        self._jacobian_graph, _ = cull(graph, self._jacobian_keys)
+
+    @property
+    def has_jacobian(self) -> bool:
+        """Whether the plan can calculate the Jacobian of the penalty."""
+        return self._has_jacobian
+
+    @property
+    def size(self) -> int:
+        """The number of tasks in the plan."""
+        return len(self._graph)
+
+    def evaluate(self, parameter: ParameterGroup) -> np.ndarray:
+        """Calculates the penalty for the given parameter.
+
+        Parameters
+        ----------
+        parameter :
+            The parameter to evaluate the plan with.
+        """
+        if self._profile is not None:
+            self._profile.count("evaluations")
+        graph = self._penalty_graph.copy()
+        graph[PARAMETER_KEY] = parameter
+        return threaded_get(graph, PENALTY_KEY)
+
+    def evaluate_jacobian(
+        self, parameter: ParameterGroup, labels: typing.List[str]
+    ) -> typing.Tuple[np.ndarray, typing.List[str]]:
+        """Calculates the Jacobian of the penalty for the given parameter.
+
+        Returns the Jacobian and the labels of the parameter which are not covered by the matrix
+        derivatives of the model. The columns of those parameter are zero.
+
+        Parameters
+        ----------
+        parameter :
+            The parameter to evaluate the plan with.
+        labels :
+            The full labels of the parameter which make up the columns of the Jacobian.
+        """
+        if not self._has_jacobian:
+            raise ValueError("The model does not supply matrix derivatives.")
+
+        if self._profile is not None:
+            self._profile.count("jacobian_evaluations")
+        graph = self._jacobian_graph.copy()
+        graph[PARAMETER_KEY] = parameter
+        blocks = threaded_get(graph, self._jacobian_keys)
+
+        columns = {label: i for i, label in enumerate(labels)}
+        jacobian = np.zeros((sum(block.shape[0] for _, block in blocks), len(labels)))
+        covered = set()
+        start = 0
+        for block_labels, block in blocks:
+            end = start + block.shape[0]
+            for i, label in enumerate(block_labels):
+                if label in columns:
+                    jacobian[start:end, columns[label]] = block[:, i]
+                    covered.add(label)
+            start = end
+        return jacobian, [label for label in labels if label not in covered]
+
+    def _add_index_independent_ungrouped_tasks(self, bag):
+        for label, problem in bag.items():
+            matrix_key = ("matrix", label)
+            self._add_matrix_task(matrix_key, label, problem.model_axis, None)
+
+            self._add_index_independent_residual_tasks(
+                ("residual", label),
+                label,
+                matrix_key,
+                problem.data.values,
+                problem.weight.values if problem.weight is not None else None,
+                problem.global_axis,
+            )
+
+    def _add_index_dependent_ungrouped_tasks(self, bag):
+        for label, problem in bag.items():
+            data = problem.data.values
+            weight = problem.weight.values if problem.weight is not None else None
+            for start in range(0, problem.global_axis.size, STACK_SIZE):
+                end = start + STACK_SIZE
+                indices = problem.global_axis[start:end]
+                matrix_key = ("matrix", label, start)
+                self._graph[matrix_key] = (
+                    self._profiled(
+                        "matrix",
+                        label,
+                        functools.partial(
+                            _calculate_dataset_matrices,
+                            self._model,
+                            self._constrain_function(label),
+                            label,
+                            problem.model_axis,
+                            indices,
+                        ),
+                    ),
+                    DESCRIPTORS_KEY,
+                    PARAMETER_KEY,
+                )
+                if self._has_jacobian:
+                    self._graph[_derivative_key(matrix_key)] = (
+                        self._profiled(
+                            "derivative",
+                            label,
+                            functools.partial(
+                                _calculate_stacked_dataset_derivatives,
+                                self._model,
+                                label,
+                                problem.model_axis,
+                                indices,
+                            ),
+                        ),
+                        DESCRIPTORS_KEY,
+                    )
+                self._add_stacked_residual_task(
+                    ("residual", label, start),
+                    label,
+                    matrix_key,
+                    list(data[:, start:end].T),
+                    list(weight[:, start:end].T) if weight is not None else None,
+                    indices,
+                )
+
+    def _add_index_independent_grouped_tasks(self, problems):
+        for label in self._model.dataset:
+            self._add_matrix_task(
+                ("matrix", label),
+                label,
+                self._data[label].coords[self._model.model_dimension].values,
+                None,
+            )
+
+        for group_label, group in problems.groups.items():
+            self._graph[("group_matrix", group_label)] = (
+                self._profiled("matrix", group_label, _combine_matrices),
+                [("matrix", label) for label in group],
+            )
+            if self._has_jacobian:
+                self._graph[_derivative_key(("group_matrix", group_label))] = (
+                    self._profiled("derivative", group_label, _combine_matrix_derivatives),
+                    [_derivative_key(("matrix", label)) for label in group],
+                )
+
+        # problems with the same matrix get solved together
+        rows_by_matrix = {}
+        for row, descriptor in enumerate(problems.descriptor):
+            if len(descriptor) == 1:
+                matrix_key = ("matrix", descriptor[0].dataset)
+            else:
+                matrix_key = ("group_matrix", "".join(item.dataset for item in descriptor))
+            rows_by_matrix.setdefault(matrix_key, []).append(row)
+
+        for i, (matrix_key, rows) in enumerate(rows_by_matrix.items()):
+            data, weight = grouped_problem_block(problems, rows)
+            self._add_index_independent_residual_tasks(
+                ("residual", i),
+                matrix_key[1],
+                matrix_key,
+                data.T,
+                weight.T,
+                [problems.descriptor[row][0].index for row in rows],
+            )
+
+    def _add_index_dependent_grouped_tasks(self, problems):
+        sizes = np.diff(problems.offsets)
+        for start in range(0, sizes.size, STACK_SIZE):
+            end = min(start + STACK_SIZE, sizes.size)
+            stack = problems.descriptor[start:end]
+            if np.all(sizes[start:end] == sizes[start]):
+                data, weight = grouped_problem_block(problems, range(start, end))
+            else:
+                stop = end + 1
+                offsets = problems.offsets[start:stop]
+                bounds = list(zip(offsets[:-1], offsets[1:]))
+                data = [problems.data[begin:finish] for begin, finish in bounds]
+                weight = [problems.weight[begin:finish] for begin, finish in bounds]
+            matrix_key = ("matrix", start)
+            self._graph[matrix_key] = (
+                self._profiled(
+                    "matrix",
+                    None,
+                    functools.partial(
+                        _calculate_group_matrices,
+                        self._model,
+                        self._constrain_function(None),
+                        stack,
+                    ),
+                ),
+                DESCRIPTORS_KEY,
+                PARAMETER_KEY,
+            )
+            if self._has_jacobian:
+                self._graph[_derivative_key(matrix_key)] = (
+                    self._profiled(
+                        "derivative",
+                        None,
+                        functools.partial(
+                            _calculate_stacked_group_derivatives,
+                            self._model,
+                            stack,
+                        ),
+                    ),
+                    DESCRIPTORS_KEY,
+                )
+            self._add_stacked_residual_task(
+                ("residual", start),
+                None,
+                matrix_key,
+                data,
+                weight,
+                [descriptor[0].index for descriptor in stack],
+            )
+
+    def _profiled(self, phase, dataset, function):
+        if self._profile is None or function is None:
+            return function
+        return self._profile.wrap(phase, dataset, function)
+
+    def _constrain_function(self, label):
+        return self._profiled(
+            "constraints",
+            label,
+            self._model.constrain_matrix_function if self._has_constraints else None,
+        )
+
+    def _add_matrix_task(self, key, label, axis, index):
+        self._graph[key] = (
+            self._profiled(
+                "matrix",
+                label,
+                functools.partial(
+                    _calculate_dataset_matrix,
+                    self._model,
+                    self._constrain_function(label),
+                    label,
+                    axis,
+                    index,
+                ),
+            ),
+            DESCRIPTORS_KEY,
+            PARAMETER_KEY,
+        )
+        if self._has_jacobian:
+            self._graph[_derivative_key(key)] = (
+                self._profiled(
+                    "derivative",
+                    label,
+                    functools.partial(
+                        _calculate_dataset_derivatives, self._model, label, axis, index
+                    ),
+                ),
+                DESCRIPTORS_KEY,
+            )
+
+    def _add_index_independent_residual_tasks(self, key, label, matrix_key, data, weight, indices):
+        """Adds the residual tasks for the columns of data which share the same matrix.
+
+        Runs of neighbouring columns with the same weight have the same weighted matrix and are
+        solved together in blocks. The columns of a run are split over as many tasks as there are
+        threads to evaluate the plan. The columns of shorter runs, e.g. with a weight per column,
+        are collected and solved in stacks.
+        """
+        nr_columns = data.shape[1]
+        bounds = [0, nr_columns]
+        if weight is not None:
+            changes = np.flatnonzero(np.any(weight[:, 1:] != weight[:, :-1], axis=0)) + 1
+            bounds[1:1] = changes.tolist()
+
+        block_size = _block_size(data.shape[0])
+        stacked_columns = []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if weight is not None and end - start < RUN_SIZE:
+                stacked_columns += range(start, end)
+                continue
+            nr_tasks = min(CPU_COUNT, -(-(end - start) // block_size))
+            task_bounds = np.linspace(start, end, nr_tasks + 1).astype(int)
+            for begin, finish in zip(task_bounds[:-1], task_bounds[1:]):
+                task_data = data[:, begin:finish]
+                task_weight = weight[:, begin] if weight is not None else None
+                task_key = key + (int(begin),)
+                self._graph[task_key] = (
+                    self._profiled(
+                        "residual",
+                        label,
+                        functools.partial(
+                            _calculate_batched_residual,
+                            self._profiled("solve", label, self._residual_function),
+                            self._penalty_function,
+                            task_data,
+                            task_weight,
+                            indices[begin:finish],
+                        ),
+                    ),
+                    matrix_key,
+                    PARAMETER_KEY,
+                )
+                self._penalty_keys.append(task_key)
+                self._add_jacobian_task(task_key, label, matrix_key, task_data, task_weight)
+
+        for start in range(0, len(stacked_columns), STACK_SIZE):
+            end = start + STACK_SIZE
+            columns = stacked_columns[start:end]
+            task_key = key + ("stack", start)
+            # the matrix is the same for all columns of the stack
+            stack_matrix_key = ("stack_matrix",) + task_key
+            self._graph[stack_matrix_key] = (
+                functools.partial(_repeat, len(columns)),
+                matrix_key,
+            )
+            if self._has_jacobian:
+                self._graph[_derivative_key(stack_matrix_key)] = (
+                    functools.partial(_repeat, len(columns)),
+                    _derivative_key(matrix_key),
+                )
+            self._add_stacked_residual_task(
+                task_key,
+                label,
+                stack_matrix_key,
+                data[:, columns].T,
+                weight[:, columns].T,
+                [indices[column] for column in columns],
+            )
+
+    def _add_stacked_residual_task(self, key, label, matrix_key, data, weight, indices):
+        self._graph[key] = (
+            self._profiled(
+                "residual",
+                label,
+                functools.partial(
+                    _calculate_stacked_residual,
+                    self._profiled("solve", label, self._residual_function),
+                    self._profiled("solve", label, self._stacked_residual_function),
+                    self._penalty_function,
+                    data,
+                    weight,
+                    indices,
+                ),
+            ),
+            matrix_key,
+            PARAMETER_KEY,
+        )
+        self._penalty_keys.append(key)
+        if self._has_jacobian:
+            jacobian_key = ("jacobian",) + key
+            self._graph[jacobian_key] = (
+                self._profiled(
+                    "jacobian", label, functools.partial(_calculate_stacked_jacobian, data, weight)
+                ),
+                _derivative_key(matrix_key),
+            )
+            self._jacobian_keys.append(jacobian_key)
+
+    def _add_jacobian_task(self, key, label, matrix_key, data, weight):
+        if self._has_jacobian:
+            jacobian_key = ("jacobian",) + key
+            self._graph[jacobian_key] = (
+                self._profiled(
+                    "jacobian", label, functools.partial(_calculate_jacobian, data, weight)
+                ),
+                _derivative_key(matrix_key),
+            )
+            self._jacobian_keys.append(jacobian_key)
+
+
+def _derivative_key(matrix_key):
+    return ("derivative",) + matrix_key
+
+
+def _block_size(nr_rows):
+    return max(1, BLOCK_SIZE // (8 * nr_rows))
+
+
+def _repeat(nr_times, item):
+    return [item] * nr_times
+
+
+def _concatenate_penalty(penalties):
+    # the penalty of a single task is a new array, which does not need to be copied
+    return penalties[0] if len(penalties) == 1 else np.concatenate(penalties)
+
+
+def _collect_descriptors(labels, descriptors):
+    return dict(zip(labels, descriptors))
+
+
+def _calculate_dataset_matrix(model, constrain, label, axis, index, descriptors, parameter):
+    clp_label, matrix = _calculate_matrix(model.matrix, descriptors[label], axis, {}, index=index)
+    if constrain is not None:
+        clp_label, matrix = constrain(parameter, clp_label, matrix, index)
+    return LabelAndMatrix(clp_label, matrix)
+
+
+def _calculate_dataset_matrices(model, constrain, label, axis, indices, descriptors, parameter):
+    if model.matrix_block is not None:
+        return _calculate_dataset_matrix_block(
+            model, constrain, label, axis, indices, descriptors, parameter
+        )
+    return [
+        _calculate_dataset_matrix(model, constrain, label, axis, index, descriptors, parameter)
+        for index in indices
+    ]
+
+
+def _calculate_dataset_matrix_block(
+    model, constrain, label, axis, indices, descriptors, parameter
+):
+    dataset_descriptor = descriptors[label]
+    clp_label, matrices = model.matrix_block(
+        dataset_descriptor=dataset_descriptor, axis=axis, indices=indices
+    )
+    if dataset_descriptor.scale is not None:
+        matrices *= dataset_descriptor.scale
+    labels_and_matrices = []
+    for index, matrix in zip(indices, matrices):
+        index_clp_label = list(clp_label)
+        if constrain is not None:
+            index_clp_label, matrix = constrain(parameter, index_clp_label, matrix, index)
+        labels_and_matrices.append(LabelAndMatrix(index_clp_label, matrix))
+    return labels_and_matrices
+
+
+def _calculate_group_matrices(model, constrain, groups, descriptors, parameter):
+    return [
+        _calculate_group_matrix(model, constrain, group, descriptors, parameter)
+        for group in groups
+    ]
+
+
+def _calculate_group_matrix(model, constrain, group, descriptors, parameter):
+    clp_label, matrix = _combine_matrices(
+        [
+            _calculate_matrix(
+                model.matrix, descriptors[problem.dataset], problem.axis, {}, index=problem.index
+            )
+            for problem in group
+        ]
+    )
+    index = group[0].index
+    if constrain is not None:
+        clp_label, matrix = constrain(parameter, clp_label, matrix, index)
+    return LabelAndMatrix(clp_label, matrix)
+
+
+def _calculate_dataset_derivatives(model, label, axis, index, descriptors):
+    return _calculate_matrix_derivatives(
+        model.matrix_derivative, descriptors[label], axis, {}, index=index
+    )
+
+
+def _calculate_stacked_dataset_derivatives(model, label, axis, indices, descriptors):
+    return [
+        _calculate_dataset_derivatives(model, label, axis, index, descriptors) for index in indices
+    ]
+
+
+def _calculate_stacked_group_derivatives(model, groups, descriptors):
+    return [
+        _combine_matrix_derivatives(
+            [
+                _calculate_matrix_derivatives(
+                    model.matrix_derivative,
+                    descriptors[problem.dataset],
+                    problem.axis,
+                    {},
+                    index=problem.index,
+                )
+                for problem in group
+            ]
+        )
+        for group in groups
+    ]
+
+
+def _calculate_batched_residual(
+    residual_function: typing.Callable,
+    penalty_function: typing.Callable,
+    data: np.ndarray,
+    weight: np.ndarray,
+    indices: typing.List[typing.Any],
+    label_and_matrix: LabelAndMatrix,
+    parameter: ParameterGroup,
+) -> np.ndarray:
+    clp_label, matrix = label_and_matrix
+    # the residual of the columns are concatenated in the penalty
+    residual = np.empty(data.shape[::-1], dtype=np.float64)
+    clp = None
+    block_size = _block_size(data.shape[0])
+    for start in range(0, data.shape[1], block_size):
+        end = start + block_size
+        block_clp, block_residual = residual_function(matrix, data[:, start:end], weight)
+        residual[start:end] = block_residual.T
+        if penalty_function is not None:
+            if clp is None:
+                clp = np.empty((block_clp.shape[0], data.shape[1]), dtype=np.float64)
+            clp[:, start:end] = block_clp
+
+    if penalty_function is None:
+        return residual.ravel()
+    penalty = [residual.ravel()]
+    penalty += [
+        penalty_function(parameter, clp_label, clp[:, i], index) for i, index in enumerate(indices)
+    ]
+    return np.concatenate(penalty)
+
+
+def _calculate_stacked_residual(
+    residual_function: typing.Callable,
+    stacked_residual_function: typing.Callable,
+    penalty_function: typing.Callable,
+    data: typing.List[np.ndarray],
+    weight: typing.List[np.ndarray],
+    indices: typing.List[typing.Any],
+    labels_and_matrices: typing.List[LabelAndMatrix],
+    parameter: ParameterGroup,
+) -> np.ndarray:
+    clp_labels = [label_and_matrix.clp_label for label_and_matrix in labels_and_matrices]
+    matrices = [label_and_matrix.matrix for label_and_matrix in labels_and_matrices]
+
+    if all(
+        clp_label == clp_labels[0] and matrix.shape == matrices[0].shape
+        for clp_label, matrix in zip(clp_labels, matrices)
+    ):
+        clps, residuals = stacked_residual_function(
+            np.stack(matrices), np.asarray(data), None if weight is None else np.asarray(weight)
+        )
+    else:
+        # the clp differ between the indices, so the matrices cannot be stacked
+        if weight is None:
+            weight = [None] * len(matrices)
+        clps, residuals = zip(
+            *[residual_function(matrix, d, w) for matrix, d, w in zip(matrices, data, weight)]
+        )
+
+    penalty = list(residuals)
+    if penalty_function is not None:
+        penalty += [
+            penalty_function(parameter, clp_label, clp, index)
+            for clp_label, clp, index in zip(clp_labels, clps, indices)
+        ]
+    return np.concatenate(penalty)
+
+
+def _calculate_jacobian(
+    data: np.ndarray,
+    weight: np.ndarray,
+    label_matrix_and_derivatives: LabelAndMatrixAndDerivatives,
+) -> typing.Tuple[typing.List[str], np.ndarray]:
+    _, matrix, derivatives = label_matrix_and_derivatives
+    labels = list(derivatives)
+    derivatives = np.asarray([derivatives[label] for label in labels]).reshape(
+        (len(labels),) + matrix.shape
+    )
+    if data.ndim == 1:
+        return labels, jacobian_variable_projection(matrix, derivatives, data, weight)
+
+    # the residual of the columns are concatenated in the penalty
+    blocks = []
+    block_size = _block_size(data.shape[0])
+    for start in range(0, data.shape[1], block_size):
+        end = start + block_size
+        jacobian = jacobian_variable_projection(matrix, derivatives, data[:, start:end], weight)
+        blocks.append(jacobian.transpose((2, 0, 1)).reshape((-1, len(labels))))
+    return labels, np.concatenate(blocks)
+
+
+def _calculate_stacked_jacobian(
+    data: typing.List[np.ndarray],
+    weight: typing.List[np.ndarray],
+    labels_matrices_and_derivatives: typing.List[LabelAndMatrixAndDerivatives],
+) -> typing.Tuple[typing.List[str], np.ndarray]:
+    blocks = [
+        _calculate_jacobian(d, weight[i] if weight is not None else None, item)
+        for i, (d, item) in enumerate(zip(data, labels_matrices_and_derivatives))
+    ]
+    labels = []
+    for block_labels, _ in blocks:
+        labels += [label for label in block_labels if label not in labels]
+
+    jacobian = np.zeros((sum(block.shape[0] for _, block in blocks), len(labels)))
+    start = 0
+    for block_labels, block in blocks:
+        end = start + block.shape[0]
+        jacobian[start:end, [labels.index(label) for label in block_labels]] = block
+        start = end
+    return labels, jacobian
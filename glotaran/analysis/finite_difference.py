@@ -0,0 +1,194 @@
+"""Concurrent evaluation of finite difference columns of the Jacobian of the penalty.
+
+The columns of a forward difference Jacobian are independent penalty evaluations. They are
+calculated either in a pool of worker processes or on the workers of a dask distributed client.
+The scheme is shipped only once to every worker, where it is prepared and turned into an
+:class:`EvaluationPlan`, which is kept for the following evaluations.
+"""
+import copy
+import multiprocessing
+import threading
+import typing
+
+import lmfit
+import numpy as np
+
+from glotaran.parameter import ParameterLayout
+
+from .evaluation_plan import EvaluationPlan
+from .scheme import Scheme
+
+_worker_state = {}
+"""The evaluation plan and parameter of a worker process."""
+
+_client_plan_lock = threading.Lock()
+_client_plan_cache = {}
+"""The evaluation plans of the threads of a dask worker for the latest scattered scheme."""
+
+
+class FiniteDifferenceJacobian:
+    """Calculates forward difference columns of the Jacobian of the penalty concurrently.
+
+    Parameters
+    ----------
+    scheme :
+        The prepared optimization scheme.
+    parameter :
+        The initial parameter as :class:`lmfit.Parameters`.
+    evaluation_plan :
+        The local evaluation plan, used for the penalty at the unperturbed values.
+    workers :
+        The number of worker processes, which receive a pickled copy of the scheme. Ignored if a
+        client is given.
+    client :
+        A dask distributed client to evaluate the columns on.
+    """
+
+    def __init__(
+        self,
+        scheme: Scheme,
+        parameter: lmfit.Parameters,
+        evaluation_plan: EvaluationPlan,
+        workers: int = None,
+        client=None,
+    ):
+        self._parameter = copy.deepcopy(parameter)
+        self._parameter_layout = ParameterLayout(scheme.parameter)
+        self._evaluation_plan = evaluation_plan
+        self._client = client
+        self._pool = None
+        if client is not None:
+            self._scheme = client.scatter(scheme, broadcast=True)
+            self._initial_parameter = client.scatter(parameter, broadcast=True)
+        else:
+            # forking a process with running threads may deadlock the workers
+            self._pool = multiprocessing.get_context("spawn").Pool(
+                processes=workers, initializer=_initialize_worker, initargs=(scheme, parameter)
+            )
+
+    def evaluate(
+        self,
+        values: np.ndarray,
+        var_names: typing.List[str],
+        indices: typing.List[int] = None,
+    ) -> np.ndarray:
+        """Calculates the forward difference Jacobian columns of the penalty.
+
+        Parameters
+        ----------
+        values :
+            The values of the varying parameter.
+        var_names :
+            The names of the varying parameter.
+        indices :
+            The indices of the varying parameter to calculate the columns for. `None` for all.
+        """
+        if indices is None:
+            indices = range(len(var_names))
+
+        steps = []
+        perturbed_values = []
+        for i in indices:
+            step = finite_difference_step(values[i], self._parameter[var_names[i]].max)
+            perturbed = np.array(values, dtype=np.float64)
+            perturbed[i] += step
+            steps.append(step)
+            perturbed_values.append(perturbed)
+
+        if self._client is not None:
+            futures = self._client.map(
+                _evaluate_penalty_on_client,
+                perturbed_values,
+                plan_key=self._scheme.key,
+                scheme=self._scheme,
+                parameter=self._initial_parameter,
+                var_names=var_names,
+                pure=False,
+            )
+        else:
+            pending = self._pool.starmap_async(
+                _evaluate_penalty_on_worker,
+                [(var_names, perturbed) for perturbed in perturbed_values],
+            )
+
+        # the unperturbed penalty is calculated locally while the workers are busy
+        penalty = _evaluate_penalty(
+            self._evaluation_plan, self._parameter_layout, self._parameter, var_names, values
+        )
+
+        if self._client is not None:
+            perturbed_penalties = self._client.gather(futures)
+        else:
+            perturbed_penalties = pending.get()
+
+        jacobian = np.empty((penalty.size, len(steps)), dtype=np.float64)
+        for i, (step, perturbed_penalty) in enumerate(zip(steps, perturbed_penalties)):
+            jacobian[:, i] = (perturbed_penalty - penalty) / step
+        return jacobian
+
+    def close(self):
+        """Shuts down the worker processes and releases the scattered scheme."""
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+        if self._client is not None:
+            self._client.cancel([self._scheme, self._initial_parameter])
+            self._client = None
+
+
+def finite_difference_step(value: float, maximum: float) -> float:
+    """Returns the forward difference step for a value, turned backwards at the upper bound."""
+    step = np.sqrt(np.finfo(np.float64).eps) * max(1.0, abs(value))
+    return -step if value + step > maximum else step
+
+
+def _evaluate_penalty(evaluation_plan, parameter_layout, parameter, var_names, values):
+    for name, value in zip(var_names, values):
+        parameter[name].value = value
+    parameter.update_constraints()
+    return evaluation_plan.evaluate(parameter_layout.update_from_parameter_dict(parameter))
+
+
+def _create_evaluation_plan(scheme):
+    from .optimize import _create_problem_bag
+
+    scheme.prepare_data(copy=False)
+    problem_bag, groups = _create_problem_bag(scheme)
+    return EvaluationPlan(scheme, problem_bag, groups)
+
+
+def _initialize_worker(scheme, parameter):
+    _worker_state["evaluation_plan"] = _create_evaluation_plan(scheme)
+    _worker_state["parameter_layout"] = ParameterLayout(scheme.parameter)
+    _worker_state["parameter"] = parameter
+
+
+def _evaluate_penalty_on_worker(var_names, values):
+    return _evaluate_penalty(
+        _worker_state["evaluation_plan"],
+        _worker_state["parameter_layout"],
+        _worker_state["parameter"],
+        var_names,
+        values,
+    )
+
+
+def _evaluate_penalty_on_client(values, plan_key, scheme, parameter, var_names):
+    # an evaluation plan can not be evaluated by several threads at the same time
+    key = (plan_key, threading.get_ident())
+    with _client_plan_lock:
+        if any(cached_key[0] != plan_key for cached_key in _client_plan_cache):
+            # keep only the plans of the latest scheme
+            _client_plan_cache.clear()
+        if key not in _client_plan_cache:
+            _client_plan_cache[key] = _create_evaluation_plan(copy.deepcopy(scheme))
+        evaluation_plan = _client_plan_cache[key]
+    # the parameter are shared between the threads of a dask worker
+    return _evaluate_penalty(
+        evaluation_plan,
+        ParameterLayout(scheme.parameter),
+        copy.deepcopy(parameter),
+        var_names,
+        values,
+    )
@@ -5,6 +5,9 @@ import numpy as np
 
 LabelAndMatrix = collections.namedtuple("LabelAndMatrix", "clp_label matrix")
 LabelAndMatrixAndData = collections.namedtuple("LabelAndMatrixAndData", "label_matrix data")
+LabelAndMatrixAndDerivatives = collections.namedtuple(
+    "LabelAndMatrixAndDerivatives", "clp_label matrix derivatives"
+)
 
 
 def calculate_index_independent_ungrouped_matrices(scheme, parameter):
@@ -150,6 +153,47 @@ def _calculate_matrix(matrix_function, dataset_descriptor, axis, extra, index=No
     return LabelAndMatrix(clp_label, matrix)
 
 
+def _calculate_matrix_derivatives(
+    derivative_function, dataset_descriptor, axis, extra, index=None
+):
+    args = {
+        "dataset_descriptor": dataset_descriptor,
+        "axis": axis,
+    }
+    for k, v in extra:
+        args[k] = v
+    if index is not None:
+        args["index"] = index
+    clp_label, matrix, derivatives = derivative_function(**args)
+    if dataset_descriptor.scale is not None:
+        matrix *= dataset_descriptor.scale
+        for derivative in derivatives.values():
+            derivative *= dataset_descriptor.scale
+    return LabelAndMatrixAndDerivatives(clp_label, matrix, derivatives)
+
+
+def _combine_matrix_derivatives(labels_matrices_and_derivatives):
+    clp_label, matrix = _combine_matrices(
+        [LabelAndMatrix(item.clp_label, item.matrix) for item in labels_matrices_and_derivatives]
+    )
+    parameter_labels = []
+    for item in labels_matrices_and_derivatives:
+        parameter_labels += [label for label in item.derivatives if label not in parameter_labels]
+
+    # a matrix which does not depend on a parameter contributes zeros to its derivative
+    derivatives = {}
+    for label in parameter_labels:
+        _, derivatives[label] = _combine_matrices(
+            [
+                LabelAndMatrix(
+                    item.clp_label, item.derivatives.get(label, np.zeros_like(item.matrix))
+                )
+                for item in labels_matrices_and_derivatives
+            ]
+        )
+    return LabelAndMatrixAndDerivatives(clp_label, matrix, derivatives)
+
+
 def _combine_matrices(labels_and_matrices):
     masks = []
     full_clp_labels = None
@@ -158,7 +202,7 @@ def _combine_matrices(labels_and_matrices):
         (clp_label, matrix) = label_and_matrix
         sizes.append(matrix.shape[0])
         if full_clp_labels is None:
-            full_clp_labels = clp_label
+            full_clp_labels = list(clp_label)
             masks.append([i for i, _ in enumerate(clp_label)])
         else:
             mask = []
@@ -176,4 +220,4 @@ def _combine_matrices(labels_and_matrices):
         full_matrix[start:end, masks[i]] = m[1]
         start = end
 
-    return (full_clp_labels, full_matrix)
+    return LabelAndMatrix(full_clp_labels, full_matrix)
@@ -8,7 +8,7 @@ from scipy.optimize import nnls
 
 
 def residual_nnls(
-    matrix: np.ndarray, data: np.ndarray
+    matrix: np.ndarray, data: np.ndarray, weight: np.ndarray = None
 ) -> typing.Tuple[typing.List[str], np.ndarray]:
     """Calculate the conditionally linear parameters and residual with the nnls method.
 
@@ -19,8 +19,39 @@ def residual_nnls(
     matrix :
         The model matrix.
     data : np.ndarray
-        The data to analyze.
+        The data to analyze. If the data is 2-dimensional, every column is solved with the same
+        matrix and the clp and residual are 2-dimensional too.
+    weight :
+        The weight of the rows of the matrix. The data must already be weighted.
     """
-    clp, _ = nnls(matrix, data)
+    if weight is not None:
+        matrix = matrix * weight[:, np.newaxis]
+    if data.ndim == 2:
+        clp = np.stack([nnls(matrix, column)[0] for column in data.T], axis=1)
+    else:
+        clp, _ = nnls(matrix, data)
     residual = data - np.dot(matrix, clp)
     return clp, residual
+
+
+def residual_nnls_stacked(
+    matrices: np.ndarray, data: np.ndarray, weight: np.ndarray = None
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Calculate the conditionally linear parameters and residual with the nnls method for a
+    stack of matrices.
+
+    Parameters
+    ----------
+    matrices :
+        The model matrices with shape `(stack, rows, clp)`.
+    data : np.ndarray
+        The data to analyze with shape `(stack, rows)`.
+    weight :
+        The weight of the rows of the matrices with shape `(stack, rows)`. The data must already
+        be weighted.
+    """
+    if weight is not None:
+        matrices = matrices * np.asarray(weight)[:, :, np.newaxis]
+    clp = np.stack([nnls(matrix, problem)[0] for matrix, problem in zip(matrices, data)])
+    residual = data - np.einsum("src,sc->sr", matrices, clp)
+    return clp, residual
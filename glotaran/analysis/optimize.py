@@ -1,18 +1,27 @@
 import collections
+import contextlib
+import functools
 
 import dask
+import dask.array as da
 import lmfit
 import numpy as np
 
+from glotaran.io.prepare_dataset import calculate_svd
 from glotaran.parameter import ParameterGroup
+from glotaran.parameter import ParameterLayout
 
 from . import problem_bag
 from . import residual_calculation
+from .evaluation_plan import EvaluationPlan
+from .finite_difference import FiniteDifferenceJacobian
+from .finite_difference import finite_difference_step
 from .matrix_calculation import calculate_index_independent_grouped_matrices
 from .matrix_calculation import calculate_index_independent_ungrouped_matrices
 from .matrix_calculation import create_index_dependent_grouped_matrix_jobs
 from .matrix_calculation import create_index_dependent_ungrouped_matrix_jobs
 from .nnls import residual_nnls
+from .profiling import Profile
 from .result import Result
 from .variable_projection import residual_variable_projection
 
@@ -20,34 +29,61 @@ ResultFuture = collections.namedtuple(
     "ResultFuture", "bag clp_label matrix full_clp_label clp residual"
 )
 
+_profiling = []
 
-def optimize(scheme, verbose=True, client=None):
 
-    initial_parameter = scheme.parameter.as_parameter_dict()
+@contextlib.contextmanager
+def profiling():
+    """Records the time spent in the phases of the optimizations run in the context.
 
-    if client is not None:
-        scheme = client.scatter(scheme)
-        optimization_result_future = client.submit(
-            optimize_task, initial_parameter, scheme, verbose
-        )
-        result = optimization_result_future.result()
+    Every optimization records into its own :class:`glotaran.analysis.profiling.Profile`,
+    which is available as :attr:`glotaran.analysis.result.Result.timings`.
+
+    Examples
+    --------
+
+    >>> with profiling():
+    ...     result = optimize(scheme)
+    >>> result.timings.to_json("timings.json")
+    """
+    _profiling.append(True)
+    try:
+        yield
+    finally:
+        _profiling.pop()
 
-    else:
-        result = optimize_task(initial_parameter, scheme, verbose)
 
-    return result
+def optimize(scheme, verbose=True, client=None):
+    """Optimizes the parameter of a scheme.
+
+    Parameters
+    ----------
+    scheme :
+        The optimization scheme.
+    verbose :
+        If `True` feedback is printed at every iteration.
+    client :
+        A dask distributed client. If given, the finite difference columns of the Jacobian are
+        evaluated on its workers while the optimization itself runs locally.
+    """
+
+    initial_parameter = scheme.parameter.as_parameter_dict()
+    return optimize_task(initial_parameter, scheme, verbose, client=client)
 
 
-def optimize_task(initial_parameter, scheme, verbose):
+def optimize_task(initial_parameter, scheme, verbose, client=None):
 
     scheme.prepare_data(copy=False)
     problem_bag, groups = _create_problem_bag(scheme)
+    profile = Profile() if _profiling else None
+    evaluation_plan = EvaluationPlan(scheme, problem_bag, groups, profile=profile)
+    parameter_layout = ParameterLayout(scheme.parameter)
 
     minimizer = lmfit.Minimizer(
         calculate_penalty,
         initial_parameter,
-        fcn_args=[scheme, problem_bag, groups],
-        fcn_kws=None,
+        fcn_args=[evaluation_plan],
+        fcn_kws={"parameter_layout": parameter_layout},
         iter_cb=None,
         scale_covar=True,
         nan_policy="omit",
@@ -55,10 +91,55 @@ def optimize_task(initial_parameter, scheme, verbose):
         **{},
     )
     verbose = 2 if verbose else 0
-    lm_result = minimizer.minimize(method="least_squares", verbose=verbose, max_nfev=scheme.nfev)
+
+    finite_difference = (
+        FiniteDifferenceJacobian(
+            scheme,
+            initial_parameter,
+            evaluation_plan,
+            workers=scheme.jacobian_workers,
+            client=client,
+        )
+        if client is not None or scheme.jacobian_workers is not None
+        else None
+    )
+
+    # parameter with expressions are not covered by the matrix derivatives
+    if evaluation_plan.has_jacobian and not any(
+        parameter.expr for parameter in minimizer.params.values()
+    ):
+        jacobian = functools.partial(
+            calculate_jacobian,
+            minimizer=minimizer,
+            evaluation_plan=evaluation_plan,
+            finite_difference=finite_difference,
+            parameter_layout=parameter_layout,
+        )
+    elif finite_difference is not None:
+        jacobian = functools.partial(
+            calculate_finite_difference_jacobian,
+            minimizer=minimizer,
+            finite_difference=finite_difference,
+            evaluation_plan=evaluation_plan,
+            parameter_layout=parameter_layout,
+        )
+    else:
+        jacobian = "2-point"
+
+    try:
+        lm_result = minimizer.minimize(
+            method="least_squares", verbose=verbose, max_nfev=scheme.nfev, jac=jacobian
+        )
+    finally:
+        if finite_difference is not None:
+            finite_difference.close()
 
     parameter = ParameterGroup.from_parameter_dict(lm_result.params)
-    datasets = _create_result(scheme, parameter)
+    if profile is None:
+        datasets = _create_result(scheme, parameter)
+    else:
+        with profile.phase("result"):
+            datasets = _create_result(scheme, parameter)
     covar = lm_result.covar if hasattr(lm_result, "covar") else None
 
     return Result(
@@ -73,55 +154,100 @@ def optimize_task(initial_parameter, scheme, verbose):
         lm_result.redchi,
         lm_result.var_names,
         covar,
+        timings=profile,
     )
 
 
-def calculate_penalty(parameter, scheme, bag, groups):
-    parameter = ParameterGroup.from_parameter_dict(parameter)
-    residual_function = residual_nnls if scheme.nnls else residual_variable_projection
-    if scheme.model.grouped():
-        if scheme.model.index_dependent():
-            _, _, constraint_labels_and_matrices = create_index_dependent_grouped_matrix_jobs(
-                scheme, bag, parameter
-            )
-            _, _, _, penalty = residual_calculation.create_index_dependent_grouped_residual(
-                scheme, parameter, bag, constraint_labels_and_matrices, residual_function
-            )
-        else:
-
-            _, _, constraint_labels_and_matrices = calculate_index_independent_grouped_matrices(
-                scheme, groups, parameter
-            )
+def calculate_penalty(parameter, evaluation_plan, parameter_layout=None):
+    """Calculates the penalty for an lmfit.Parameters dictionary.
 
-            _, _, _, penalty = residual_calculation.create_index_independent_grouped_residual(
-                scheme, parameter, bag, constraint_labels_and_matrices, residual_function
-            )
+    If a :class:`glotaran.parameter.ParameterLayout` of the parameter is given, the values are
+    written into its group instead of building a new group.
+    """
+    if parameter_layout is not None:
+        parameter = parameter_layout.update_from_parameter_dict(parameter)
     else:
-        if scheme.model.index_dependent():
-            _, _, constraint_labels_and_matrices = create_index_dependent_ungrouped_matrix_jobs(
-                scheme, bag, parameter
-            )
-            _, _, _, penalty = residual_calculation.create_index_dependent_ungrouped_residual(
-                scheme, parameter, bag, constraint_labels_and_matrices, residual_function
-            )
-        else:
+        parameter = ParameterGroup.from_parameter_dict(parameter)
+    return evaluation_plan.evaluate(parameter)
+
+
+def calculate_jacobian(
+    values, minimizer, evaluation_plan, finite_difference=None, parameter_layout=None, **kwargs
+):
+    """Calculates the Jacobian of the penalty for the values of the varying parameter.
+
+    The columns of parameter which are not covered by the matrix derivatives of the model are
+    calculated by forward differences, concurrently if a
+    :class:`glotaran.analysis.finite_difference.FiniteDifferenceJacobian` is given.
+    """
+    result = minimizer.result
+    parameter = result.params
+    for name, value in zip(result.var_names, values):
+        parameter[name].value = value
+
+    labels = [parameter[name].user_data["full_label"] for name in result.var_names]
+    jacobian, uncovered = evaluation_plan.evaluate_jacobian(
+        parameter_layout.update_from_parameter_dict(parameter)
+        if parameter_layout is not None
+        else ParameterGroup.from_parameter_dict(parameter),
+        labels,
+    )
 
-            _, _, constraint_labels_and_matrices = calculate_index_independent_ungrouped_matrices(
-                scheme, parameter
-            )
+    # non-negative parameter are optimized in logarithmic space
+    for i, name in enumerate(result.var_names):
+        if parameter[name].user_data["non_neg"]:
+            jacobian[:, i] *= np.exp(parameter[name].value)
+
+    if uncovered and finite_difference is not None:
+        indices = [labels.index(label) for label in uncovered]
+        jacobian[:, indices] = finite_difference.evaluate(values, result.var_names, indices)
+    elif uncovered:
+        penalty = calculate_penalty(parameter, evaluation_plan, parameter_layout)
+        for label in uncovered:
+            i = labels.index(label)
+            name = result.var_names[i]
+            value = parameter[name].value
+            step = finite_difference_step(value, parameter[name].max)
+            parameter[name].value = value + step
+            jacobian[:, i] = (
+                calculate_penalty(parameter, evaluation_plan, parameter_layout) - penalty
+            ) / step
+            parameter[name].value = value
+    return _omit_non_finite_rows(
+        jacobian, lambda: calculate_penalty(parameter, evaluation_plan, parameter_layout)
+    )
+
+
+def calculate_finite_difference_jacobian(
+    values, minimizer, finite_difference, evaluation_plan, parameter_layout=None, **kwargs
+):
+    """Calculates the forward difference Jacobian of the penalty concurrently."""
+    jacobian = finite_difference.evaluate(values, minimizer.result.var_names)
+
+    def penalty():
+        parameter = minimizer.result.params
+        for name, value in zip(minimizer.result.var_names, values):
+            parameter[name].value = value
+        return calculate_penalty(parameter, evaluation_plan, parameter_layout)
+
+    return _omit_non_finite_rows(jacobian, penalty)
 
-            _, _, _, penalty = residual_calculation.create_index_independent_ungrouped_residual(
-                scheme, parameter, bag, constraint_labels_and_matrices, residual_function
-            )
-    penalty = penalty.compute()
-    return penalty
+
+def _omit_non_finite_rows(jacobian, penalty):
+    """Removes the rows of the non-finite values of the penalty, which are omitted by lmfit.
+
+    The penalty is only calculated again if the Jacobian has non-finite values, which it has
+    wherever the penalty has.
+    """
+    if np.all(np.isfinite(jacobian)):
+        return jacobian
+    return jacobian[np.isfinite(penalty())]
 
 
 def _create_problem_bag(scheme):
     groups = None
     if scheme.model.grouped():
         bag, groups = problem_bag.create_grouped_bag(scheme)
-        bag = bag.persist()
     else:
         bag = problem_bag.create_ungrouped_bag(scheme)
     return bag, groups
@@ -199,137 +325,186 @@ def _create_result(scheme, parameter):
     indices = None
 
     if model.grouped():
-        indices = bag.map(lambda group: [d.index for d in group.descriptor])
+        problems = problem_bag.create_grouped_problems(scheme)
+        indices = [[descriptor.index for descriptor in group] for group in problems.descriptor]
+        # the results are bags, which are computed in a process pool by default
+        clp_labels, matrices, reduced_clp_labels, reduced_clps, residuals = dask.compute(
+            clp_labels, matrices, reduced_clp_labels, reduced_clps, residuals, scheduler="threads"
+        )
         if model.index_dependent():
-            (
-                groups,
-                indices,
-                clp_labels,
-                matrices,
-                reduced_clp_labels,
-                reduced_clps,
-                residuals,
-            ) = dask.compute(
-                groups, indices, clp_labels, matrices, reduced_clp_labels, reduced_clps, residuals
-            )
+            problem_clp_labels = reduced_clp_labels
         else:
-            groups, indices, reduced_clp_labels, reduced_clps, residuals = dask.compute(
-                groups, indices, reduced_clp_labels, reduced_clps, residuals
+            # the reduced clp labels are the same for all problems of a group
+            problem_clp_labels = [
+                reduced_clp_labels["".join(descriptor.dataset for descriptor in group)]
+                for group in problems.descriptor
+            ]
+
+        for label, dataset in datasets.items():
+            members, rows, parts = _find_dataset_in_problems(
+                label, problems, dataset.indexes[model.global_dimension]
             )
-
-    for label, dataset in datasets.items():
-        if model.grouped():
             if model.index_dependent():
-                groups = bag.map(lambda group: [d.dataset for d in group.descriptor]).compute()
-                for i, group in enumerate(groups):
-                    if label in group:
-                        group_index = group.index(label)
-                        if "matrix" not in dataset:
-                            # we assume that the labels are the same, this might not be true in
-                            # future models
-                            dataset.coords["clp_label"] = clp_labels[i][group_index]
-
-                            dim1 = dataset.coords[model.global_dimension].size
-                            dim2 = dataset.coords[model.model_dimension].size
-                            dim3 = dataset.clp_label.size
-                            dataset["matrix"] = (
-                                (
-                                    (model.global_dimension),
-                                    (model.model_dimension),
-                                    ("clp_label"),
-                                ),
-                                np.zeros((dim1, dim2, dim3), dtype=np.float64),
-                            )
-                        dataset.matrix.loc[
-                            {model.global_dimension: indices[i][group_index]}
-                        ] = matrices[i][group_index]
-            else:
-                clp_label, matrix = dask.compute(
-                    clp_labels[label],
-                    matrices[label],
+                # we assume that the labels are the same, this might not be true in future models
+                i, j = members[0]
+                clp_label = clp_labels[i][j]
+                matrix = np.zeros(
+                    (dataset.coords[model.global_dimension].size,) + matrices[i][j].shape,
+                    dtype=np.float64,
                 )
+                matrix[rows] = np.asarray([matrices[i][j] for i, j in members])
                 dataset.coords["clp_label"] = clp_label
-                dataset["matrix"] = (((model.model_dimension), ("clp_label")), matrix)
-            dim1 = dataset.coords[model.global_dimension].size
-            dim2 = dataset.coords["clp_label"].size
+                dataset["matrix"] = (
+                    ((model.global_dimension), (model.model_dimension), ("clp_label")),
+                    matrix,
+                )
+            else:
+                clp_label = clp_labels[label]
+                dataset.coords["clp_label"] = clp_label
+                dataset["matrix"] = (((model.model_dimension), ("clp_label")), matrices[label])
+
             dataset["clp"] = (
                 (model.global_dimension, "clp_label"),
-                np.zeros((dim1, dim2), dtype=np.float64),
+                _assemble_clp(
+                    clp_label,
+                    dataset.coords[model.global_dimension].size,
+                    rows,
+                    [problem_clp_labels[i] for i, _ in members],
+                    [reduced_clps[i] for i, _ in members],
+                ),
             )
 
-            dim1 = dataset.coords[model.model_dimension].size
-            dim2 = dataset.coords[model.global_dimension].size
-            dataset["residual"] = (
-                (model.model_dimension, model.global_dimension),
-                np.zeros((dim1, dim2), dtype=np.float64),
+            residual = np.zeros(
+                (
+                    dataset.coords[model.model_dimension].size,
+                    dataset.coords[model.global_dimension].size,
+                ),
+                dtype=np.float64,
             )
-            idx = 0
-            for i, group in enumerate(groups):
-                if label in group:
-                    index = indices[i][group.index(label)]
-                    for j, clp in enumerate(reduced_clp_labels[i]):
-                        if clp in dataset.clp_label:
-                            dataset.clp.loc[
-                                {"clp_label": clp, model.global_dimension: index}
-                            ] = reduced_clps[i][j]
-                    start = 0
-                    for dset in group:
-                        if dset == label:
-                            break
-                        start += datasets[dset].coords[model.model_dimension].size
-                    end = start + dataset.coords[model.model_dimension].size
-                    dataset.residual.loc[{model.global_dimension: index}] = residuals[i][start:end]
+            if members:
+                residual[:, rows] = np.asarray(
+                    [residuals[i][part] for (i, _), part in zip(members, parts)]
+                ).T
+            dataset["residual"] = ((model.model_dimension, model.global_dimension), residual)
 
-        else:
-            clp_label, matrix, reduced_clp_label, reduced_clp, residual = dask.compute(
-                clp_labels[label],
-                matrices[label],
-                reduced_clp_labels[label],
-                reduced_clps[label],
-                residuals[label],
-            )
-            reduced_clp = np.asarray(reduced_clp)
+            _finalize_dataset(dataset, model, scheme.svd_rank)
+
+    else:
+        for label, dataset in datasets.items():
+            size = dataset.coords[model.global_dimension].size
+            rows = np.arange(size)
 
             if model.index_dependent():
+                # the matrices of all indices are only computed when they are accessed
+                clp_label, reduced_clp_label, reduced_clp, residual = dask.compute(
+                    clp_labels[label][0],
+                    reduced_clp_labels[label],
+                    reduced_clps[label],
+                    residuals[label],
+                )
                 # we assume that the labels are the same, this might not be true in future models
-                dataset.coords["clp_label"] = clp_label[0]
+                dataset.coords["clp_label"] = clp_label
+                shape = (dataset.coords[model.model_dimension].size, len(clp_label))
                 dataset["matrix"] = (
                     ((model.global_dimension), (model.model_dimension), ("clp_label")),
-                    matrix,
+                    da.stack(
+                        [
+                            da.from_delayed(matrix, shape, dtype=np.float64)
+                            for matrix in matrices[label]
+                        ]
+                    ),
                 )
+                clp = _assemble_clp(clp_label, size, rows, reduced_clp_label, reduced_clp)
             else:
+                clp_label, matrix, reduced_clp_label, reduced_clp, residual = dask.compute(
+                    clp_labels[label],
+                    matrices[label],
+                    reduced_clp_labels[label],
+                    reduced_clps[label],
+                    residuals[label],
+                )
                 dataset.coords["clp_label"] = clp_label
                 dataset["matrix"] = (((model.model_dimension), ("clp_label")), matrix)
-
-            dim1 = dataset.coords[model.global_dimension].size
-            dim2 = dataset.coords["clp_label"].size
-            dataset["clp"] = (
-                (model.global_dimension, "clp_label"),
-                np.zeros((dim1, dim2), dtype=np.float64),
-            )
-            for i, clp in enumerate(reduced_clp_label):
-                if model.index_dependent():
-                    idx = dataset.coords[model.global_dimension][i]
-                    for c in clp:
-                        if c not in reduced_clp_label[i]:
-                            continue
-                        j = reduced_clp_label[i].index(c)
-                        dataset.clp.loc[
-                            {"clp_label": c, model.global_dimension: idx}
-                        ] = reduced_clp[i][j]
-                else:
-                    dataset.clp.loc[{"clp_label": clp}] = reduced_clp[:, i]
+                clp = np.zeros((size, len(clp_label)), dtype=np.float64)
+                _scatter_clp(
+                    clp, _index_map(clp_label), rows, reduced_clp_label, np.asarray(reduced_clp)
+                )
+            dataset["clp"] = ((model.global_dimension, "clp_label"), clp)
 
             dataset["residual"] = (
                 ((model.model_dimension), (model.global_dimension)),
                 np.asarray(residual).T,
             )
 
+            _finalize_dataset(dataset, model, scheme.svd_rank)
+
+    if callable(model.finalize_data):
+        model.finalize_data(indices, reduced_clp_labels, reduced_clps, parameter, datasets)
+
+    return datasets
+
+
+def _find_dataset_in_problems(label, problems, global_index):
+    """Returns the grouped problems which contain a dataset.
+
+    Returns a list of tuples of the position of the problem and the position of the dataset in
+    the problem, the positions of the problems on the global axis of the dataset and the slices
+    of the rows of the dataset in the residual of the problems.
+    """
+    members = []
+    index = []
+    parts = []
+    for i, group in enumerate(problems.descriptor):
+        start = 0
+        for j, descriptor in enumerate(group):
+            if descriptor.dataset == label:
+                members.append((i, j))
+                index.append(descriptor.index)
+                parts.append(slice(start, start + descriptor.axis.size))
+                break
+            start += descriptor.axis.size
+    return members, global_index.get_indexer(index), parts
+
+
+def _index_map(labels):
+    return {label: i for i, label in enumerate(labels)}
+
+
+def _assemble_clp(clp_label, size, rows, reduced_clp_labels, reduced_clps):
+    """Returns the clp of a dataset as array with the shape `(global axis, clp_label)`.
+
+    The reduced clp of the indices `rows` are grouped by their labels, so that every group of
+    indices is written with one assignment.
+    """
+    clp = np.zeros((size, len(clp_label)), dtype=np.float64)
+    clp_index = _index_map(clp_label)
+    blocks = {}
+    for row, labels, values in zip(rows, reduced_clp_labels, reduced_clps):
+        block = blocks.setdefault(tuple(labels), ([], []))
+        block[0].append(row)
+        block[1].append(values)
+    for labels, (block_rows, values) in blocks.items():
+        _scatter_clp(clp, clp_index, block_rows, labels, np.asarray(values))
+    return clp
+
+
+def _scatter_clp(clp, clp_index, rows, labels, values):
+    """Writes the reduced clp `values` with the shape `(rows, labels)` into `clp`.
+
+    Reduced clp which are not part of the clp of the dataset, e.g. the clp of other datasets of
+    a group, are skipped.
+    """
+    selection = [i for i, label in enumerate(labels) if label in clp_index]
+    columns = [clp_index[labels[i]] for i in selection]
+    clp[np.ix_(rows, columns)] = values[:, selection]
+
+
+def _finalize_dataset(dataset, model, svd_rank):
     if "weight" in dataset:
         dataset["weighted_residual"] = dataset.residual
         dataset["residual"] = dataset.weighted_residual / dataset.weight
-        _create_svd("weighted_residual", dataset, model)
-    _create_svd("residual", dataset, model)
+        _create_svd("weighted_residual", dataset, model, svd_rank)
+    _create_svd("residual", dataset, model, svd_rank)
 
     # Calculate RMS
     size = dataset.residual.shape[0] * dataset.residual.shape[1]
@@ -338,23 +513,34 @@ def _create_result(scheme, parameter):
     # reconstruct fitted data
     dataset["fitted_data"] = dataset.data - dataset.residual
 
-    if callable(model.finalize_data):
-        model.finalize_data(indices, reduced_clp_labels, reduced_clps, parameter, datasets)
-
-    return datasets
 
+def _create_svd(name, dataset, model, rank):
+    """Adds the singular value decomposition of a variable to a dataset.
 
-def _create_svd(name, dataset, model):
-    l, v, r = np.linalg.svd(dataset[name])
+    The decomposition is computed lazily, the variables are backed by dask arrays which are
+    computed when their values are accessed or the dataset is saved. Only `rank` singular
+    vectors are calculated, see :func:`glotaran.io.prepare_dataset.calculate_svd`.
+    """
+    rows, columns = dataset[name].shape
+    size = min(rows, columns)
+    if rank is None:
+        left_shape, right_shape = (rows, rows), (columns, columns)
+    else:
+        size = min(rank, size)
+        left_shape, right_shape = (rows, size), (size, columns)
+    l, v, r = dask.delayed(calculate_svd, nout=3, pure=True)(dataset[name].values, rank)
 
     dataset[f"{name}_left_singular_vectors"] = (
         (model.model_dimension, "left_singular_value_index"),
-        l,
+        da.from_delayed(l, left_shape, dtype=np.float64),
     )
 
     dataset[f"{name}_right_singular_vectors"] = (
         ("right_singular_value_index", model.global_dimension),
-        r,
+        da.from_delayed(r, right_shape, dtype=np.float64),
     )
 
-    dataset[f"{name}_singular_values"] = (("singular_value_index"), v)
+    dataset[f"{name}_singular_values"] = (
+        ("singular_value_index"),
+        da.from_delayed(v, (size,), dtype=np.float64),
+    )
@@ -1,9 +1,7 @@
 import collections
-import itertools
+import typing
 
 import numpy as np
-import xarray as xr
-from dask import array as da
 from dask import bag as db
 
 ProblemDescriptor = collections.namedtuple(
@@ -11,6 +9,15 @@ ProblemDescriptor = collections.namedtuple(
 )
 GroupedProblem = collections.namedtuple("GroupedProblem", "data weight descriptor")
 GroupedProblemDescriptor = collections.namedtuple("ProblemDescriptor", "dataset index axis")
+GroupedProblems = collections.namedtuple(
+    "GroupedProblems", "data weight offsets descriptor groups"
+)
+"""The grouped problems of a scheme packed in contiguous buffers.
+
+`data` and `weight` are the concatenated weighted data and weight of all problems, the data and
+weight of problem `i` are `data[offsets[i]:offsets[i + 1]]`. `descriptor` contains the list of
+:class:`GroupedProblemDescriptor` of every problem and `groups` the groups of datasets.
+"""
 
 
 def create_ungrouped_bag(scheme):
@@ -32,85 +39,181 @@ def create_ungrouped_bag(scheme):
 
 
 def create_grouped_bag(scheme):
-    bag = None
-    datasets = None
-    full_axis = None
-    for label in scheme.model.dataset:
+    """Creates the problems of the grouped datasets of a scheme as dask bag.
+
+    The data and weight of the problems are views of the buffers of
+    :func:`create_grouped_problems`.
+
+    Returns the problems, sorted by the global axis, and the groups of datasets.
+    """
+    problems = create_grouped_problems(scheme)
+    offsets = problems.offsets
+    bag = db.from_sequence(
+        [
+            GroupedProblem(problems.data[start:end], problems.weight[start:end], descriptor)
+            for start, end, descriptor in zip(offsets[:-1], offsets[1:], problems.descriptor)
+        ]
+    )
+    return bag, problems.groups
+
+
+def create_grouped_problems(scheme) -> GroupedProblems:
+    """Creates the problems of the grouped datasets of a scheme along the global axis.
+
+    The items of the global axes of the datasets which are close within the group tolerance of the
+    scheme are grouped into one problem. The problems are sorted by the global axis. The result is
+    cached on the scheme as long as its model, group tolerance and datasets are the same objects.
+    """
+    key = _grouping_key(scheme)
+    cached = scheme._grouping_cache
+    if cached is not None and _is_same_grouping_key(cached[0], key):
+        return cached[1]
+
+    model = scheme.model
+    full_axis = np.empty(0)
+    members = []
+    global_axes = {}
+    model_axes = {}
+    data = {}
+    weight = {}
+    for label in model.dataset:
         dataset = scheme.data[label]
-        weight = (
-            dataset.weight
-            if "weight" in dataset
-            else xr.DataArray(np.ones_like(dataset.data), coords=dataset.data.coords)
-        )
-        data = dataset.data * weight
-        global_axis = dataset.coords[scheme.model.global_dimension].values
-        model_axis = dataset.coords[scheme.model.model_dimension].values
-        if bag is None:
-            bag = collections.deque(
-                GroupedProblem(
-                    data.isel({scheme.model.global_dimension: i}).values,
-                    weight.isel({scheme.model.global_dimension: i}).values,
-                    [GroupedProblemDescriptor(label, value, model_axis)],
-                )
-                for i, value in enumerate(global_axis)
-            )
-            datasets = collections.deque([label] for _, _ in enumerate(global_axis))
-            full_axis = collections.deque(global_axis)
+        global_axis = dataset.coords[model.global_dimension].values
+        global_axes[label] = global_axis
+        model_axes[label] = dataset.coords[model.model_dimension].values
+
+        # the blocks are stored along the global axis, so that every problem is a contiguous row
+        dimensions = (model.global_dimension, model.model_dimension)
+        dataset_data = dataset.data.transpose(*dimensions).values
+        if "weight" in dataset:
+            weight[label] = dataset.weight.transpose(*dimensions).values
+            data[label] = dataset_data * weight[label]
         else:
-            i1, i2 = _find_overlap(full_axis, global_axis, atol=scheme.group_tolerance)
-
-            for i, j in enumerate(i1):
-                datasets[j].append(label)
-                bag[j] = GroupedProblem(
-                    da.concatenate(
-                        [
-                            bag[j][0],
-                            data.isel({scheme.model.global_dimension: i2[i]}).values,
-                        ]
-                    ),
-                    da.concatenate(
-                        [
-                            bag[j][1],
-                            weight.isel({scheme.model.global_dimension: i2[i]}).values,
-                        ]
-                    ),
-                    bag[j][2] + [GroupedProblemDescriptor(label, global_axis[i2[i]], model_axis)],
-                )
-
-            # Add non-overlaping regions
-            begin_overlap = i2[0] if len(i2) != 0 else 0
-            end_overlap = i2[-1] + 1 if len(i2) != 0 else 0
-            for i in itertools.chain(
-                range(0, begin_overlap), range(end_overlap, len(global_axis))
-            ):
-                problem = GroupedProblem(
-                    data.isel({scheme.model.global_dimension: i}).values,
-                    weight.isel({scheme.model.global_dimension: i}).values,
-                    [GroupedProblemDescriptor(label, global_axis[i], model_axis)],
-                )
-                if i < end_overlap:
-                    datasets.appendleft([label])
-                    full_axis.appendleft(global_axis[i])
-                    bag.appendleft(problem)
-                else:
-                    datasets.append([label])
-                    full_axis.append(global_axis[i])
-                    bag.append(problem)
-
-    return db.from_sequence(bag), {"".join(d): d for d in datasets if len(d) > 1}
+            weight[label] = np.ones_like(dataset_data)
+            data[label] = dataset_data
+
+        order = np.argsort(global_axis, kind="stable")
+        i1, i2 = _find_overlap(full_axis, global_axis[order], atol=scheme.group_tolerance)
+        i2 = order[i2]
+        for i, j in zip(i1, i2):
+            members[i].append((label, j))
+
+        unmatched = np.setdiff1d(order, i2, assume_unique=True)
+        full_axis = np.concatenate([full_axis, global_axis[unmatched]])
+        members += [[(label, j)] for j in unmatched]
+        order = np.argsort(full_axis, kind="stable")
+        full_axis = full_axis[order]
+        members = [members[i] for i in order]
+
+    rows_by_group = {}
+    for row, row_members in enumerate(members):
+        rows_by_group.setdefault(tuple(label for label, _ in row_members), []).append(row)
+
+    offsets = np.zeros(len(members) + 1, dtype=int)
+    np.cumsum(
+        [sum(model_axes[label].size for label, _ in row_members) for row_members in members],
+        out=offsets[1:],
+    )
+    data_buffer = np.empty(offsets[-1], dtype=np.float64)
+    weight_buffer = np.empty(offsets[-1], dtype=np.float64)
+    for group, rows in rows_by_group.items():
+        # the problems of a group have the same size and are copied as one block
+        columns = np.asarray([[j for _, j in members[row]] for row in rows])
+        size = offsets[rows[0] + 1] - offsets[rows[0]]
+        positions = offsets[rows][:, np.newaxis] + np.arange(size)
+        data_buffer[positions] = np.concatenate(
+            [data[label][columns[:, i]] for i, label in enumerate(group)], axis=1
+        )
+        weight_buffer[positions] = np.concatenate(
+            [weight[label][columns[:, i]] for i, label in enumerate(group)], axis=1
+        )
+
+    problems = GroupedProblems(
+        data_buffer,
+        weight_buffer,
+        offsets,
+        [
+            [
+                GroupedProblemDescriptor(label, global_axes[label][j], model_axes[label])
+                for label, j in row_members
+            ]
+            for row_members in members
+        ],
+        {"".join(group): list(group) for group in rows_by_group if len(group) > 1},
+    )
+    scheme._grouping_cache = (key, problems)
+    return problems
+
+
+def grouped_problem_block(
+    problems: GroupedProblems, rows: typing.List[int]
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Returns the data and weight of grouped problems of the same size as 2D arrays.
+
+    Every row of the arrays belongs to one problem. The arrays are views of the buffers if the
+    problems are consecutive.
+
+    Parameters
+    ----------
+    problems :
+        The packed grouped problems.
+    rows :
+        The indices of the problems.
+    """
+    rows = np.asarray(rows)
+    offsets = problems.offsets
+    size = offsets[rows[0] + 1] - offsets[rows[0]]
+    if np.all(np.diff(rows) == 1):
+        start = offsets[rows[0]]
+        end = offsets[rows[-1] + 1]
+        return (
+            problems.data[start:end].reshape((rows.size, size)),
+            problems.weight[start:end].reshape((rows.size, size)),
+        )
+    positions = offsets[rows][:, np.newaxis] + np.arange(size)
+    return problems.data[positions], problems.weight[positions]
+
+
+def _grouping_key(scheme):
+    return (
+        scheme.model,
+        scheme.group_tolerance,
+        tuple((label, scheme.data[label]) for label in scheme.model.dataset),
+    )
+
+
+def _is_same_grouping_key(a, b):
+    model_a, tolerance_a, data_a = a
+    model_b, tolerance_b, data_b = b
+    return (
+        model_a is model_b
+        and tolerance_a == tolerance_b
+        and len(data_a) == len(data_b)
+        and all(
+            label_a == label_b and dataset_a is dataset_b
+            for (label_a, dataset_a), (label_b, dataset_b) in zip(data_a, data_b)
+        )
+    )
 
 
 def _find_overlap(a, b, rtol=1e-05, atol=1e-08):
-    ovr_a = []
-    ovr_b = []
-    start_b = 0
-    for i, ai in enumerate(a):
-        for j, bj in itertools.islice(enumerate(b), start_b, None):
-            if np.isclose(ai, bj, rtol=rtol, atol=atol, equal_nan=False):
-                ovr_a.append(i)
-                ovr_b.append(j)
-            elif bj > ai:  # (more than tolerance)
-                break  # all the rest will be farther away
-            else:  # bj < ai (more than tolerance)
-                start_b += 1  # ignore further tests of this item
-    return (ovr_a, ovr_b)
+    """Returns the indices of the items of `a` and `b` which are close to each other.
+
+    Both `a` and `b` must be sorted ascending. Every item of `b` is matched with its closest item
+    in `a` and every item of `a` is matched at most once.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    if a.size == 0 or b.size == 0:
+        return np.empty(0, dtype=int), np.empty(0, dtype=int)
+
+    right = np.searchsorted(a, b).clip(0, a.size - 1)
+    left = (right - 1).clip(0, a.size - 1)
+    closest = np.where(np.abs(a[left] - b) <= np.abs(a[right] - b), left, right)
+    close = np.isclose(a[closest], b, rtol=rtol, atol=atol, equal_nan=False)
+
+    ovr_a = closest[close]
+    ovr_b = np.flatnonzero(close)
+    # keep the first match of every item of `a`
+    ovr_a, first = np.unique(ovr_a, return_index=True)
+    return ovr_a, ovr_b[first]
@@ -0,0 +1,200 @@
+"""Per phase timing of the penalty evaluation."""
+
+import collections
+import functools
+import json
+import threading
+import time
+import typing
+
+import numpy as np
+
+PhaseStatistics = collections.namedtuple("PhaseStatistics", "time calls bytes")
+"""The statistics of a phase for a dataset.
+
+`time` is the wall time in seconds spent in the phase itself, without the time of the phases it
+calls. `bytes` is the size of the arrays returned by the phase.
+"""
+
+PHASES = [
+    "fill",
+    "matrix",
+    "constraints",
+    "solve",
+    "residual",
+    "penalty",
+    "derivative",
+    "jacobian",
+    "result",
+]
+"""The phases which are recorded.
+
+* `fill`: Filling the dataset descriptors with the parameter.
+* `matrix`: Calculating the matrices.
+* `constraints`: Applying the constraints and relations to the matrices.
+* `solve`: Solving for the conditionally linear parameter.
+* `residual`: Weighting the matrices and calculating additional penalties.
+* `penalty`: Concatenating the residuals to the penalty.
+* `derivative`: Calculating the matrix derivatives.
+* `jacobian`: Calculating the Jacobian of the penalty.
+* `result`: Creating the result datasets.
+"""
+
+
+class Profile:
+    """Records the wall time, the number of calls and the bytes returned per phase and dataset.
+
+    Phases can be nested, the time of a phase does not include the time of the phases it calls
+    in the same thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._statistics = {}
+        self._counters = collections.Counter()
+
+    def wrap(self, phase: str, dataset: str, function: typing.Callable) -> typing.Callable:
+        """Returns the function wrapped so that its calls are recorded.
+
+        Parameters
+        ----------
+        phase :
+            The phase the function belongs to.
+        dataset :
+            The label of the dataset the function is called for, `None` for all datasets.
+        function :
+            The function to record.
+        """
+        return functools.partial(self._call, phase, dataset, function)
+
+    def phase(self, phase: str, dataset: str = None) -> "_PhaseContext":
+        """Returns a context manager which records the code in its context as phase.
+
+        Parameters
+        ----------
+        phase :
+            The phase of the code.
+        dataset :
+            The label of the dataset the code runs for, `None` for all datasets.
+        """
+        return _PhaseContext(self, phase, dataset)
+
+    def count(self, name: str):
+        """Increments the counter with the given name."""
+        with self._lock:
+            self._counters[name] += 1
+
+    @property
+    def counters(self) -> typing.Dict[str, int]:
+        """The counters, e.g. the number of penalty evaluations."""
+        with self._lock:
+            return dict(self._counters)
+
+    def statistics(self) -> typing.Dict[str, typing.Dict[str, PhaseStatistics]]:
+        """Returns the statistics per phase and dataset.
+
+        Statistics which are not recorded for a single dataset are stored under the label `all`.
+        """
+        with self._lock:
+            statistics = {}
+            for (phase, dataset), (elapsed, calls, size) in self._statistics.items():
+                statistics.setdefault(phase, {})[dataset or "all"] = PhaseStatistics(
+                    elapsed, calls, size
+                )
+        return statistics
+
+    def to_json(self, path: str = None) -> str:
+        """Returns the statistics and counters as JSON string.
+
+        Parameters
+        ----------
+        path :
+            If given, the JSON is written to the file at this path.
+        """
+        content = json.dumps(
+            {
+                "phases": {
+                    phase: {dataset: stats._asdict() for dataset, stats in datasets.items()}
+                    for phase, datasets in self.statistics().items()
+                },
+                "counters": self.counters,
+            },
+            indent=2,
+        )
+        if path is not None:
+            with open(path, "w") as f:
+                f.write(content)
+        return content
+
+    def markdown(self) -> str:
+        """Formats the statistics as markdown table."""
+        string = "| Phase | Dataset | Time [s] | Calls | Bytes |\n"
+        string += "|-------|---------|----------|-------|-------|\n"
+        statistics = self.statistics()
+        for phase in sorted(statistics, key=_phase_order):
+            for dataset, stats in statistics[phase].items():
+                string += (
+                    f"| {phase} | {dataset} | {stats.time:.3e} | {stats.calls} "
+                    f"| {stats.bytes} |\n"
+                )
+        return string
+
+    def _call(self, phase, dataset, function, *args, **kwargs):
+        self._enter()
+        start = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            children = self._exit(elapsed)
+        self._record(phase, dataset, elapsed - children, _nbytes(result))
+        return result
+
+    def _enter(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        self._local.stack.append(0.0)
+
+    def _exit(self, elapsed):
+        children = self._local.stack.pop()
+        if self._local.stack:
+            self._local.stack[-1] += elapsed
+        return children
+
+    def _record(self, phase, dataset, elapsed, size):
+        with self._lock:
+            total, calls, total_size = self._statistics.get((phase, dataset), (0.0, 0, 0))
+            self._statistics[phase, dataset] = (total + elapsed, calls + 1, total_size + size)
+
+
+class _PhaseContext:
+    def __init__(self, profile, phase, dataset):
+        self._profile = profile
+        self._phase = phase
+        self._dataset = dataset
+
+    def __enter__(self):
+        self._profile._enter()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._start
+        children = self._profile._exit(elapsed)
+        self._profile._record(self._phase, self._dataset, elapsed - children, 0)
+        return False
+
+
+def _phase_order(phase):
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sum(_nbytes(item) for item in value.values())
+    return 0
@@ -7,39 +7,52 @@ def create_index_independent_ungrouped_residual(
     scheme, parameter, problem_bag, constraint_labels_and_matrices, residual_function
 ):
 
-    global_dimension = scheme.model.global_dimension
     reduced_clp_labels = {}
     reduced_clps = {}
     residuals = {}
     penalties = []
     for label in problem_bag:
-        data = problem_bag[label].data
+        data = problem_bag[label].data.values
         size = problem_bag[label].global_axis.size
         weight = problem_bag[label].weight
+        weight = weight.values if weight is not None else None
         reduced_clp_labels[label] = constraint_labels_and_matrices[label].clp_label
         matrix = constraint_labels_and_matrices[label].matrix
 
-        reduced_clps[label] = []
-        residuals[label] = []
-        for i in range(size):
-            data_stripe = data.isel({global_dimension: i}).values
-            matrix_stripe = matrix
-
-            if weight is not None:
-                for j in range(matrix.shape[1]):
-                    matrix[:, j] *= weight.isel({global_dimension: i}).values
-
-            clp, residual = dask.delayed(residual_function, nout=2)(matrix_stripe, data_stripe)
-            reduced_clps[label].append(clp)
-            residuals[label].append(residual)
-            penalties.append(residual)
+        if weight is None or np.all(weight == weight[:, :1]):
+            # the weighted matrix is the same for every index, so we solve all at once
+            clp, residual = dask.delayed(residual_function, nout=2)(
+                matrix, data, weight[:, 0] if weight is not None else None
+            )
+            reduced_clps[label] = dask.delayed(np.transpose)(clp)
+            residuals[label] = dask.delayed(np.transpose)(residual)
+            penalties.append(dask.delayed(np.ravel)(residuals[label]))
 
             if callable(scheme.model.has_additional_penalty_function):
                 if scheme.model.has_additional_penalty_function():
-                    additional_penalty = dask.delayed(scheme.model.additional_penalty_function)(
-                        parameter, reduced_clp_labels[label], reduced_clps[label], i
-                    )
-                    penalties.append(additional_penalty)
+                    for i, index in enumerate(problem_bag[label].global_axis):
+                        additional_penalty = dask.delayed(
+                            scheme.model.additional_penalty_function
+                        )(parameter, reduced_clp_labels[label], clp[:, i], index)
+                        penalties.append(additional_penalty)
+
+        else:
+            reduced_clps[label] = []
+            residuals[label] = []
+            for i in range(size):
+                clp, residual = dask.delayed(residual_function, nout=2)(
+                    matrix, data[:, i], weight[:, i]
+                )
+                reduced_clps[label].append(clp)
+                residuals[label].append(residual)
+                penalties.append(residual)
+
+                if callable(scheme.model.has_additional_penalty_function):
+                    if scheme.model.has_additional_penalty_function():
+                        additional_penalty = dask.delayed(
+                            scheme.model.additional_penalty_function
+                        )(parameter, reduced_clp_labels[label], reduced_clps[label], i)
+                        penalties.append(additional_penalty)
 
     penalty = dask.delayed(np.concatenate)(penalties)
     return reduced_clp_labels, reduced_clps, residuals, penalty
@@ -48,32 +61,24 @@ def create_index_independent_ungrouped_residual(
 def create_index_dependent_ungrouped_residual(
     scheme, parameter, problem_bag, matrix_jobs, residual_function
 ):
-    def apply_weight(matrix, weight):
-        for i in range(matrix.shape[1]):
-            matrix[:, i] *= weight
-        return matrix
-
-    global_dimension = scheme.model.global_dimension
     reduced_clp_labels = {}
     reduced_clps = {}
     residuals = {}
     penalties = []
     for label in problem_bag:
-        data = problem_bag[label].data
+        data = problem_bag[label].data.values
         size = problem_bag[label].global_axis.size
         matrices = matrix_jobs[label]
         weight = problem_bag[label].weight
+        weight = weight.values if weight is not None else None
         reduced_clp_labels[label] = []
         reduced_clps[label] = []
         residuals[label] = []
         for i in range(size):
             matrix = matrices[i][1]
 
-            if weight is not None:
-                matrix = dask.delayed(apply_weight)(matrix, weight.isel({global_dimension: i}))
-
             clp, residual = dask.delayed(residual_function, nout=2)(
-                matrix, data.isel({global_dimension: i}).values
+                matrix, data[:, i], weight[:, i] if weight is not None else None
             )
 
             clp_label = matrices[i][0]
@@ -106,9 +111,7 @@ def create_index_independent_grouped_residual(
     def penalty_function(matrix_label, problem, labels_and_matrices):
 
         matrix = labels_and_matrices[matrix_label].matrix
-        for i in range(matrix.shape[1]):
-            matrix[:, i] *= problem.weight
-        clp, residual = residual_function(matrix, problem.data)
+        clp, residual = residual_function(matrix, problem.data, problem.weight)
 
         penalty = residual
         if callable(scheme.model.has_additional_penalty_function):
@@ -138,11 +141,7 @@ def create_index_dependent_grouped_residual(
     scheme, parameter, problem_bag, constraint_labels_and_matrices, residual_function
 ):
     def penalty_function(problem, labels_and_matrices):
-        matrix = labels_and_matrices.matrix
-        for i in range(matrix.shape[1]):
-            matrix[:, i] *= problem.weight
-
-        clp, residual = residual_function(matrix, problem.data)
+        clp, residual = residual_function(labels_and_matrices.matrix, problem.data, problem.weight)
 
         penalty = residual
         if callable(scheme.model.has_additional_penalty_function):
@@ -3,14 +3,19 @@
 import os
 import typing
 
+import dask
 import numpy as np
 import xarray as xr
 
 import glotaran
 from glotaran.parameter import ParameterGroup
 
+from .profiling import Profile
 from .scheme import Scheme
 
+_INPUT_VARIABLES = ["data", "weight"]
+"""The variables of the result data which are never downcasted."""
+
 
 class Result:
     def __init__(
@@ -26,6 +31,7 @@ class Result:
         red_chisqr: float,
         var_names: typing.List[str],
         covar: np.ndarray,
+        timings: Profile = None,
     ):
         """The result of a global analysis.
 
@@ -43,6 +49,9 @@ class Result:
         atol :
             (default = 0)
             The tolerance for grouping datasets along the global axis.
+        timings :
+            The profile of the optimization, if it ran in
+            :func:`glotaran.analysis.optimize.profiling`.
         """
         self._scheme = scheme
         self._data = data
@@ -55,6 +64,7 @@ class Result:
         self._red_chisqr = red_chisqr
         self._var_names = var_names
         self._covar = covar
+        self._timings = timings
 
     @property
     def scheme(self) -> Scheme:
@@ -79,6 +89,11 @@ class Result:
         -----
         The actual content of the data depends on the actual model and can be found in the
         documentation for the model.
+
+        Expensive variables, like the singular value decompositions and the matrix of index
+        dependent models, are backed by dask arrays. They are only computed when their values
+        are accessed or the data is saved, and recomputed on every access. Use
+        :xarraydoc:`Dataset.load` to keep them in memory.
         """
         return self._data
 
@@ -140,6 +155,14 @@ class Result:
         The rows and columns are corresponding to :attr:`var_names`."""
         return self._covar
 
+    @property
+    def timings(self) -> typing.Optional[Profile]:
+        """The time spent in the phases of the optimization per dataset.
+
+        `None` if the optimization did not run in :func:`glotaran.analysis.optimize.profiling`.
+        """
+        return self._timings
+
     @property
     def optimized_parameter(self) -> ParameterGroup:
         """The optimized parameters."""
@@ -163,7 +186,13 @@ class Result:
         except KeyError:
             raise Exception(f"Unknown dataset '{dataset_label}'")
 
-    def save(self, path: str) -> typing.List[str]:
+    def save(
+        self,
+        path: str,
+        complevel: int = None,
+        chunks: typing.Dict[str, int] = None,
+        float32: bool = False,
+    ) -> typing.List[str]:
         """Saves the result to given folder.
 
         Returns a list with paths of all saved items.
@@ -173,11 +202,24 @@ class Result:
         * `result.md`: The result with the model formatted as markdown text.
         * `optimized_parameter.csv`: The optimized parameter as csv file.
         * `{dataset_label}.nc`: The result data for each dataset as NetCDF file.
+        * `timings.json`: The :attr:`timings` of the optimization, if recorded.
+
+        The datasets are written one after another. Lazily computed variables are computed
+        in full when their dataset is written.
 
         Parameters
         ----------
         path :
             The path to the folder in which to save the result.
+        complevel :
+            The zlib compression level from 1 to 9 of the variables of the datasets. `None` for
+            no compression.
+        chunks :
+            The size of the chunks of the variables in the NetCDF files by dimension. Dimensions
+            which are not given are not split.
+        float32 :
+            If `True`, all variables except the data and the weight are stored with single
+            precision.
         """
         if not os.path.exists(path):
             os.makedirs(path)
@@ -197,11 +239,88 @@ class Result:
 
         for label, data in self.data.items():
             nc_path = os.path.join(path, f"{label}.nc")
-            data.to_netcdf(nc_path, engine="netcdf4")
+            encoding = _create_netcdf_encoding(
+                data,
+                complevel,
+                chunks,
+                [name for name in data.data_vars if name not in _INPUT_VARIABLES]
+                if float32
+                else [],
+            )
+            data.to_netcdf(nc_path, engine="netcdf4", encoding=encoding)
             paths.append(nc_path)
 
+        if self.timings is not None:
+            timings_path = os.path.join(path, "timings.json")
+            self.timings.to_json(timings_path)
+            paths.append(timings_path)
+
         return paths
 
+    def save_zarr(self, store: str, run: str = None) -> str:
+        """Saves the result into a zarr store, appending it to the results already in the store.
+
+        Returns the label of the run of the result in the store.
+
+        Every result is a run in the store and all variables get the additional dimension
+        `run`. The store contains the groups:
+
+        * `{dataset_label}`: The result data for each dataset. The attributes of the data are
+          stored as variables.
+        * `parameter`: The values of the optimized parameter.
+        * `result`: The statistics of the optimization and the result as markdown text.
+
+        All results appended to a store must have the same datasets with the same axes and the
+        same parameter. Use :func:`open_result_store` to read the store lazily.
+
+        Parameters
+        ----------
+        store :
+            The path to the zarr store. It is created if it does not exist.
+        run :
+            The label of the run. Defaults to the number of runs in the store.
+        """
+        zarr = _import_zarr()
+        append = "result" in zarr.open_group(store, mode="a")
+        if run is None:
+            run = str(xr.open_zarr(store, group="result").sizes["run"]) if append else "0"
+
+        # strings are stored with variable length, so that longer ones can be appended
+        run = np.asarray([run], dtype=object)
+        groups = {label: _expand_run(data, run) for label, data in self.data.items()}
+
+        labels, values = zip(
+            *[(label, parameter.value) for label, parameter in self.optimized_parameter.all()]
+        )
+        groups["parameter"] = xr.Dataset(
+            {"value": (("run", "parameter"), [values])},
+            coords={"run": run, "parameter": list(labels)},
+        )
+        groups["result"] = xr.Dataset(
+            {
+                "nfev": ("run", [self.nfev]),
+                "nvars": ("run", [self.nvars]),
+                "chisqr": ("run", [self.chisqr]),
+                "red_chisqr": ("run", [self.red_chisqr]),
+                "root_mean_square_error": ("run", [self.root_mean_square_error]),
+                "markdown": ("run", np.asarray([self.markdown()], dtype=object)),
+            },
+            coords={"run": run},
+        )
+
+        writes = [
+            dataset.to_zarr(
+                store,
+                group=group,
+                mode="a",
+                append_dim="run" if append else None,
+                compute=False,
+            )
+            for group, dataset in groups.items()
+        ]
+        dask.compute(*writes)
+        return run[0]
+
     def markdown(self, with_model=True) -> str:
         """Formats the model as a markdown text.
 
@@ -253,3 +372,58 @@ class Result:
 
     def __str__(self):
         return self.markdown(with_model=False)
+
+
+def _create_netcdf_encoding(
+    dataset: xr.Dataset,
+    complevel: typing.Optional[int],
+    chunks: typing.Optional[typing.Dict[str, int]],
+    float32_variables: typing.List[str],
+) -> typing.Dict[str, typing.Dict[str, typing.Any]]:
+    encoding = {}
+    for name, variable in dataset.data_vars.items():
+        variable_encoding = {}
+        if complevel is not None:
+            variable_encoding["zlib"] = True
+            variable_encoding["complevel"] = complevel
+        if chunks is not None and variable.ndim > 0:
+            variable_encoding["chunksizes"] = tuple(
+                min(chunks.get(dim, size), size)
+                for dim, size in zip(variable.dims, variable.shape)
+            )
+        if name in float32_variables and variable.dtype == np.float64:
+            variable_encoding["dtype"] = "float32"
+        encoding[name] = variable_encoding
+    return encoding
+
+
+def open_result_store(store: str) -> typing.Dict[str, xr.Dataset]:
+    """Opens the groups of a zarr store written by :meth:`Result.save_zarr`.
+
+    The variables are read lazily as dask arrays.
+
+    Parameters
+    ----------
+    store :
+        The path to the zarr store.
+    """
+    zarr = _import_zarr()
+    return {
+        group: xr.open_zarr(store, group=group)
+        for group in zarr.open_group(store, mode="r").group_keys()
+    }
+
+
+def _expand_run(dataset: xr.Dataset, run: np.ndarray) -> xr.Dataset:
+    # the attributes, e.g. the root mean square error, differ between the runs
+    dataset = dataset.assign(dataset.attrs)
+    dataset.attrs = {}
+    return dataset.expand_dims(run=run)
+
+
+def _import_zarr():
+    try:
+        import zarr
+    except ImportError:
+        raise ImportError("Saving results as zarr store requires the package 'zarr'.")
+    return zarr
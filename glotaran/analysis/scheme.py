@@ -28,6 +28,8 @@ class Scheme:
         group_tolerance: float = 0.0,
         nnls: bool = False,
         nfev: int = None,
+        jacobian_workers: int = None,
+        svd_rank: typing.Optional[int] = 10,
     ):
 
         self.model = model
@@ -36,6 +38,10 @@ class Scheme:
         self.group_tolerance = group_tolerance
         self.nnls = nnls
         self.nfev = nfev
+        self.jacobian_workers = jacobian_workers
+        self.svd_rank = svd_rank
+        # the grouping of the datasets, see `glotaran.analysis.problem_bag.create_grouped_bag`
+        self._grouping_cache = None
 
     @classmethod
     def from_yml_file(cls, filename: str) -> "Scheme":
@@ -86,6 +92,8 @@ class Scheme:
         nnls = scheme.get("nnls", False)
         nfev = scheme.get("nfev", None)
         group_tolerance = scheme.get("group_tolerance", 0.0)
+        jacobian_workers = scheme.get("jacobian_workers", None)
+        svd_rank = scheme.get("svd_rank", 10)
         return cls(
             model=model,
             parameter=parameter,
@@ -93,6 +101,8 @@ class Scheme:
             nnls=nnls,
             nfev=nfev,
             group_tolerance=group_tolerance,
+            jacobian_workers=jacobian_workers,
+            svd_rank=svd_rank,
         )
 
     @property
@@ -147,6 +157,29 @@ class Scheme:
     def group_tolerance(self, group_tolerance: float):
         self._group_tolerance = group_tolerance
 
+    @property
+    def jacobian_workers(self) -> int:
+        return self._jacobian_workers
+
+    @jacobian_workers.setter
+    def jacobian_workers(self, jacobian_workers: int):
+        self._jacobian_workers = jacobian_workers
+
+    @property
+    def svd_rank(self) -> typing.Optional[int]:
+        """The number of singular vectors of the residuals in the result, `None` for all."""
+        return self._svd_rank
+
+    @svd_rank.setter
+    def svd_rank(self, svd_rank: typing.Optional[int]):
+        self._svd_rank = svd_rank
+
+    def __getstate__(self):
+        # the grouping is rebuilt from the data after unpickling
+        state = self.__dict__.copy()
+        state["_grouping_cache"] = None
+        return state
+
     def problem_list(self) -> typing.List[str]:
         """Returns a list with all problems in the model and missing parameters."""
         return self.model.problem_list(self.parameter)
@@ -190,22 +223,19 @@ class Scheme:
             dataset = self._transpose_dataset(dataset)
             self._add_weight(label, dataset)
 
-            # This protects transposing when getting data with svd in it
-            if "data_singular_values" in dataset and (
-                dataset.coords["right_singular_value_index"].size
-                != dataset.coords[self.model.global_dimension].size
+            # This protects transposing when getting data with svd in it. The singular vectors
+            # are checked by their dimensions, since their number can be truncated.
+            if (
+                "data_right_singular_vectors" in dataset
+                and self.model.global_dimension not in dataset.data_right_singular_vectors.dims
             ):
                 dataset = dataset.rename(
-                    right_singular_value_index="right_singular_value_indexTMP"
-                )
-                dataset = dataset.rename(left_singular_value_index="right_singular_value_index")
-                dataset = dataset.rename(right_singular_value_indexTMP="left_singular_value_index")
-                dataset = dataset.rename(right_singular_vectors="right_singular_value_vectorsTMP")
-                dataset = dataset.rename(
-                    left_singular_value_vectors="right_singular_value_vectors"
-                )
-                dataset = dataset.rename(
-                    right_singular_value_vectorsTMP="left_singular_value_vectors"
+                    {
+                        "left_singular_value_index": "right_singular_value_index",
+                        "right_singular_value_index": "left_singular_value_index",
+                        "data_left_singular_vectors": "data_right_singular_vectors",
+                        "data_right_singular_vectors": "data_left_singular_vectors",
+                    }
                 )
             new_dims = [self.model.model_dimension, self.model.global_dimension]
             new_dims += [
@@ -228,6 +258,8 @@ class Scheme:
         s += f"* *nnls*: {self.nnls}\n"
         s += f"* *nfev*: {self.nfev}\n"
         s += f"* *group_tolerance*: {self.group_tolerance}\n"
+        s += f"* *jacobian_workers*: {self.jacobian_workers}\n"
+        s += f"* *svd_rank*: {self.svd_rank}\n"
 
         return s
 
@@ -0,0 +1,175 @@
+import copy
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from glotaran.analysis import evaluation_plan
+from glotaran.analysis import residual_calculation
+from glotaran.analysis.evaluation_plan import EvaluationPlan
+from glotaran.analysis.matrix_calculation import calculate_index_independent_grouped_matrices
+from glotaran.analysis.matrix_calculation import calculate_index_independent_ungrouped_matrices
+from glotaran.analysis.matrix_calculation import create_index_dependent_grouped_matrix_jobs
+from glotaran.analysis.matrix_calculation import create_index_dependent_ungrouped_matrix_jobs
+from glotaran.analysis.optimize import _create_problem_bag
+from glotaran.analysis.scheme import Scheme
+from glotaran.analysis.simulation import simulate
+from glotaran.analysis.variable_projection import residual_variable_projection
+
+from .test_optimization import MultichannelMulticomponentDecay
+
+
+def calculate_reference_penalty(scheme, bag, groups, parameter):
+    if scheme.model.grouped():
+        if scheme.model.index_dependent():
+            _, _, matrices = create_index_dependent_grouped_matrix_jobs(scheme, bag, parameter)
+            residual_function = residual_calculation.create_index_dependent_grouped_residual
+        else:
+            _, _, matrices = calculate_index_independent_grouped_matrices(
+                scheme, groups, parameter
+            )
+            residual_function = residual_calculation.create_index_independent_grouped_residual
+    else:
+        if scheme.model.index_dependent():
+            _, _, matrices = create_index_dependent_ungrouped_matrix_jobs(scheme, bag, parameter)
+            residual_function = residual_calculation.create_index_dependent_ungrouped_residual
+        else:
+            _, _, matrices = calculate_index_independent_ungrouped_matrices(scheme, parameter)
+            residual_function = residual_calculation.create_index_independent_ungrouped_residual
+    _, _, _, penalty = residual_function(
+        scheme, parameter, bag, matrices, residual_variable_projection
+    )
+    return penalty.compute()
+
+
+@pytest.mark.parametrize("index_dependent", [True, False])
+@pytest.mark.parametrize("grouped", [True, False])
+def test_evaluation_plan(grouped, index_dependent):
+    suite = MultichannelMulticomponentDecay
+    model = suite.model
+    model.grouped = lambda: grouped
+    model.index_dependent = lambda: index_dependent
+
+    dataset = simulate(
+        suite.sim_model, "dataset1", suite.wanted, {"e": suite.e_axis, "c": suite.c_axis}
+    )
+    scheme = Scheme(model=model, parameter=suite.initial, data={"dataset1": dataset})
+    scheme.prepare_data(copy=False)
+    bag, groups = _create_problem_bag(scheme)
+
+    plan = EvaluationPlan(scheme, bag, groups)
+
+    for parameter in [suite.initial, suite.wanted]:
+        penalty = plan.evaluate(parameter)
+        wanted = calculate_reference_penalty(scheme, bag, groups, parameter)
+        assert penalty.shape == wanted.shape
+        assert np.allclose(penalty, wanted)
+
+
+@pytest.mark.parametrize("weight", [True, False])
+@pytest.mark.parametrize("index_dependent", [True, False])
+@pytest.mark.parametrize("grouped", [True, False])
+def test_evaluation_plan_jacobian(grouped, index_dependent, weight):
+    suite = MultichannelMulticomponentDecay
+    model = suite.model
+    model.grouped = lambda: grouped
+    model.index_dependent = lambda: index_dependent
+
+    dataset = simulate(
+        suite.sim_model, "dataset1", suite.wanted, {"e": suite.e_axis, "c": suite.c_axis}
+    )
+    if weight:
+        dataset["weight"] = xr.full_like(dataset.data, 1)
+        dataset.weight[5:] = 0.5
+    scheme = Scheme(model=model, parameter=suite.initial, data={"dataset1": dataset})
+    scheme.prepare_data(copy=False)
+    bag, groups = _create_problem_bag(scheme)
+
+    plan = EvaluationPlan(scheme, bag, groups)
+    assert plan.has_jacobian
+
+    # at the exact solution the Kaufman approximation equals the full Jacobian
+    labels = ["k.1", "k.2", "k.3", "k.4", "unknown"]
+    jacobian, uncovered = plan.evaluate_jacobian(suite.wanted, labels)
+    assert jacobian.shape == (plan.evaluate(suite.wanted).size, len(labels))
+    assert uncovered == ["unknown"]
+    assert np.all(jacobian[:, -1] == 0)
+
+    step = 1e-6
+    for i, label in enumerate(labels[:-1]):
+        plus = copy.deepcopy(suite.wanted)
+        plus.get(label).value += step
+        minus = copy.deepcopy(suite.wanted)
+        minus.get(label).value -= step
+        wanted = (plan.evaluate(plus) - plan.evaluate(minus)) / (2 * step)
+        assert np.allclose(jacobian[:, i], wanted, rtol=1e-3, atol=1e-5 * np.abs(wanted).max())
+
+
+def test_evaluation_plan_blocks(monkeypatch):
+    suite = MultichannelMulticomponentDecay
+    model = suite.model
+    model.grouped = lambda: False
+    model.index_dependent = lambda: False
+
+    dataset = simulate(
+        suite.sim_model, "dataset1", suite.wanted, {"e": suite.e_axis, "c": suite.c_axis}
+    )
+    # the weight changes twice along the global axis
+    dataset["weight"] = xr.full_like(dataset.data, 1)
+    dataset.weight.loc[{"e": slice(13000, 14000)}] = 0.5
+    scheme = Scheme(model=model, parameter=suite.initial, data={"dataset1": dataset})
+    scheme.prepare_data(copy=False)
+    bag, groups = _create_problem_bag(scheme)
+
+    # blocks of 3 columns in up to 2 tasks for every part with the same weight
+    monkeypatch.setattr(evaluation_plan, "BLOCK_SIZE", 8 * suite.c_axis.size * 3)
+    monkeypatch.setattr(evaluation_plan, "CPU_COUNT", 2)
+    monkeypatch.setattr(evaluation_plan, "RUN_SIZE", 1)
+    plan = EvaluationPlan(scheme, bag, groups)
+    assert len([key for key in plan._graph if key[0] == "residual"]) == 6
+
+    penalty = plan.evaluate(suite.wanted)
+    wanted = calculate_reference_penalty(scheme, bag, groups, suite.wanted)
+    assert np.allclose(penalty, wanted)
+
+
+@pytest.mark.parametrize("grouped", [True, False])
+def test_evaluation_plan_column_weights(monkeypatch, grouped):
+    suite = MultichannelMulticomponentDecay
+    model = suite.model
+    model.grouped = lambda: grouped
+    model.index_dependent = lambda: False
+
+    dataset = simulate(
+        suite.sim_model, "dataset1", suite.wanted, {"e": suite.e_axis, "c": suite.c_axis}
+    )
+    # the first 20 columns have the same weight, the others a weight per column
+    weight = np.ones((suite.c_axis.size, suite.e_axis.size))
+    weight[:, 20:] = np.linspace(0.5, 1.5, suite.e_axis.size - 20)
+    weight[::2, 20:] *= 0.5
+    dataset["weight"] = (("c", "e"), weight)
+    scheme = Scheme(model=model, parameter=suite.initial, data={"dataset1": dataset})
+    scheme.prepare_data(copy=False)
+    bag, groups = _create_problem_bag(scheme)
+
+    # the 26 columns with different weights are solved in stacks of up to 8 columns
+    monkeypatch.setattr(evaluation_plan, "STACK_SIZE", 8)
+    monkeypatch.setattr(evaluation_plan, "CPU_COUNT", 1)
+    plan = EvaluationPlan(scheme, bag, groups)
+    assert len([key for key in plan._graph if key[0] == "residual"]) == 5
+
+    for parameter in [suite.initial, suite.wanted]:
+        penalty = plan.evaluate(parameter)
+        wanted = calculate_reference_penalty(scheme, bag, groups, parameter)
+        assert np.allclose(penalty, wanted)
+
+    labels = ["k.1", "k.2", "k.3", "k.4"]
+    jacobian, _ = plan.evaluate_jacobian(suite.wanted, labels)
+    step = 1e-6
+    for i, label in enumerate(labels):
+        plus = copy.deepcopy(suite.wanted)
+        plus.get(label).value += step
+        minus = copy.deepcopy(suite.wanted)
+        minus.get(label).value -= step
+        wanted = (plan.evaluate(plus) - plan.evaluate(minus)) / (2 * step)
+        assert np.allclose(jacobian[:, i], wanted, rtol=1e-3, atol=1e-5 * np.abs(wanted).max())
@@ -0,0 +1,89 @@
+import copy
+
+import numpy as np
+
+from glotaran.analysis.evaluation_plan import EvaluationPlan
+from glotaran.analysis.finite_difference import FiniteDifferenceJacobian
+from glotaran.analysis.finite_difference import finite_difference_step
+from glotaran.analysis.optimize import _create_problem_bag
+from glotaran.analysis.optimize import calculate_penalty
+from glotaran.analysis.optimize import optimize
+from glotaran.analysis.scheme import Scheme
+from glotaran.analysis.simulation import simulate
+
+from .test_optimization import MultichannelMulticomponentDecay
+
+
+# the model is shipped to the worker processes, so it can not hold local functions
+def _true():
+    return True
+
+
+def _false():
+    return False
+
+
+def test_finite_difference_jacobian():
+    suite = MultichannelMulticomponentDecay
+    model = suite.model
+    model.grouped = _false
+    model.index_dependent = _false
+
+    dataset = simulate(
+        suite.sim_model, "dataset1", suite.wanted, {"e": suite.e_axis, "c": suite.c_axis}
+    )
+    scheme = Scheme(model=model, parameter=suite.initial, data={"dataset1": dataset})
+    scheme.prepare_data(copy=False)
+    bag, groups = _create_problem_bag(scheme)
+    plan = EvaluationPlan(scheme, bag, groups)
+
+    parameter = copy.deepcopy(suite.initial).as_parameter_dict()
+    var_names = [name for name, param in parameter.items() if param.vary]
+    values = np.asarray([parameter[name].value for name in var_names]) * 1.1
+
+    finite_difference = FiniteDifferenceJacobian(scheme, parameter, plan, workers=2)
+    try:
+        jacobian = finite_difference.evaluate(values, var_names)
+        columns = finite_difference.evaluate(values, var_names, [2, 0])
+    finally:
+        finite_difference.close()
+
+    for name, value in zip(var_names, values):
+        parameter[name].value = value
+    penalty = calculate_penalty(parameter, plan)
+    assert jacobian.shape == (penalty.size, len(var_names))
+    for i, name in enumerate(var_names):
+        value = parameter[name].value
+        step = finite_difference_step(value, parameter[name].max)
+        parameter[name].value = value + step
+        wanted = (calculate_penalty(parameter, plan) - penalty) / step
+        parameter[name].value = value
+        assert np.allclose(jacobian[:, i], wanted)
+    assert np.array_equal(columns, jacobian[:, [2, 0]])
+
+
+def test_fitting_with_jacobian_workers():
+    suite = MultichannelMulticomponentDecay
+    model = suite.model
+    model.grouped = _true
+    model.index_dependent = _false
+
+    dataset = simulate(
+        suite.sim_model, "dataset1", suite.wanted, {"e": suite.e_axis, "c": suite.c_axis}
+    )
+    # without matrix derivatives all columns are finite differences
+    model.matrix_derivative = None
+    try:
+        scheme = Scheme(
+            model=model,
+            parameter=suite.initial,
+            data={"dataset1": dataset},
+            nfev=10,
+            jacobian_workers=2,
+        )
+        result = optimize(scheme, verbose=False)
+    finally:
+        del model.matrix_derivative
+
+    for _, param in result.optimized_parameter.all():
+        assert np.allclose(param.value, suite.wanted.get(param.full_label).value, rtol=1e-1)
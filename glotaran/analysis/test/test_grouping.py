@@ -2,6 +2,7 @@ import numpy as np
 import xarray as xr
 
 from glotaran.analysis.problem_bag import create_grouped_bag
+from glotaran.analysis.problem_bag import create_grouped_problems
 from glotaran.analysis.scheme import Scheme
 from glotaran.parameter import ParameterGroup
 
@@ -152,3 +153,54 @@ def test_multi_dataset_overlap():
     assert np.array_equal(bag[4].descriptor[0].axis, axis_c_1)
     assert np.array_equal(bag[5].descriptor[0].axis, axis_c_2)
     assert [p.descriptor[0].index for p in bag[1:4]] == axis_e_1[:-1]
+
+
+def test_multi_dataset_overlap_with_gap():
+    model = MockModel.from_dict(
+        {
+            "dataset": {
+                "dataset1": {
+                    "megacomplex": [],
+                },
+                "dataset2": {
+                    "megacomplex": [],
+                },
+            }
+        }
+    )
+    parameter = ParameterGroup.from_list([1, 10])
+
+    axis_e_1 = [1, 2, 3]
+    axis_e_2 = [3.05, 2.5, 1.05]
+    axis_c = [5, 7]
+    data = {
+        "dataset1": xr.DataArray(
+            np.ones((3, 2)), coords=[("e", axis_e_1), ("c", axis_c)]
+        ).to_dataset(name="data"),
+        "dataset2": xr.DataArray(
+            np.arange(6).reshape((3, 2)), coords=[("e", axis_e_2), ("c", axis_c)]
+        ).to_dataset(name="data"),
+    }
+
+    scheme = Scheme(model, parameter, data, group_tolerance=1e-1)
+    problems = create_grouped_problems(scheme)
+    assert create_grouped_problems(scheme) is problems
+    assert problems.offsets.tolist() == [0, 4, 6, 8, 12]
+    assert np.array_equal(problems.data, [1, 1, 4, 5, 1, 1, 2, 3, 1, 1, 0, 1])
+
+    bag, datasets = create_grouped_bag(scheme)
+    bag = bag.compute()
+    assert list(datasets) == ["dataset1dataset2"]
+    # the unmatched item inside the overlap is kept at its position
+    assert [[d.index for d in p.descriptor] for p in bag] == [
+        [1, 1.05],
+        [2],
+        [2.5],
+        [3, 3.05],
+    ]
+    assert np.array_equal(bag[0].data, [1, 1, 4, 5])
+    assert np.array_equal(bag[2].data, [2, 3])
+
+    # the cache is bound to the data
+    scheme.data = {**data, "dataset2": data["dataset2"].copy()}
+    assert create_grouped_problems(scheme) is not problems
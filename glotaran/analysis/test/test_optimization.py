@@ -1,10 +1,14 @@
+import subprocess
+import sys
 from typing import List
 
+import dask.array
 import numpy as np
 import pytest
 import xarray as xr
 
 from glotaran.analysis.optimize import optimize
+from glotaran.analysis.result import open_result_store
 from glotaran.analysis.scheme import Scheme
 from glotaran.analysis.simulation import simulate
 from glotaran.model import DatasetDescriptor
@@ -24,6 +28,16 @@ def calculate_kinetic(dataset_descriptor=None, axis=None, index=None, extra_stuf
     return (compartments, array)
 
 
+def calculate_kinetic_derivative(dataset_descriptor=None, axis=None, index=None):
+    compartments, array = calculate_kinetic(dataset_descriptor, axis, index)
+    derivatives = {}
+    for i, parameter in enumerate(dataset_descriptor.kinetic):
+        derivative = np.zeros_like(array)
+        derivative[:, i] = -axis * array[:, i]
+        derivatives[parameter.full_label] = derivative
+    return compartments, array, derivatives
+
+
 def calculate_spectral_simple(dataset, axis):
     kinpar = -1 * np.array(dataset.kinetic)
     compartments = [f"s{i+1}" for i in range(len(kinpar))]
@@ -69,6 +83,7 @@ class GaussianShapeDecayDatasetDescriptor(DatasetDescriptor):
     "one_channel",
     dataset_type=DecayDatasetDescriptor,
     matrix=calculate_kinetic,
+    matrix_derivative=calculate_kinetic_derivative,
     model_dimension="c",
     global_matrix=calculate_spectral_simple,
     global_dimension="e",
@@ -261,3 +276,218 @@ def test_fitting(suite, index_dependent, grouped, weight):
         assert "weighted_residual_left_singular_vectors" in resultdata
         assert "weighted_residual_right_singular_vectors" in resultdata
         assert "weighted_residual_singular_values" in resultdata
+
+
+@pytest.mark.parametrize("index_dependent", [True, False])
+@pytest.mark.parametrize("grouped", [True, False])
+def test_result_assembly(grouped, index_dependent):
+    model = DecayModel.from_dict(
+        {
+            "compartment": ["s1", "s2"],
+            "dataset": {
+                "dataset1": {
+                    "initial_concentration": [],
+                    "megacomplex": [],
+                    "kinetic": ["1", "2"],
+                },
+                "dataset2": {
+                    "initial_concentration": [],
+                    "megacomplex": [],
+                    "kinetic": ["1", "2"],
+                },
+            },
+        }
+    )
+    model.grouped = lambda: grouped
+    model.index_dependent = lambda: index_dependent
+
+    sim_model = TwoCompartmentDecay.sim_model
+    wanted = TwoCompartmentDecay.wanted
+    c_axis = TwoCompartmentDecay.c_axis
+    data = {
+        "dataset1": simulate(
+            sim_model, "dataset1", wanted, {"e": np.asarray([1, 2, 3]), "c": c_axis}
+        ),
+        "dataset2": simulate(
+            sim_model, "dataset1", wanted, {"e": np.asarray([2, 4]), "c": c_axis}
+        ),
+    }
+    data["dataset2"]["weight"] = xr.DataArray(
+        np.ones_like(data["dataset2"].data) * 0.5, coords=data["dataset2"].coords
+    )
+
+    scheme = Scheme(model=model, parameter=TwoCompartmentDecay.initial, data=data, nfev=1)
+    result = optimize(scheme, verbose=False)
+
+    for label in data:
+        dataset = result.data[label]
+        assert dataset.clp.shape == (dataset.e.size, 2)
+        # every dataset is finalized
+        assert "fitted_data" in dataset
+        assert ("weighted_residual" in dataset) == (label == "dataset2")
+
+        # the residual and the clp are assembled at the same indices
+        matrix = dataset.matrix.values
+        if index_dependent:
+            fitted = np.einsum("ecs,es->ce", matrix, dataset.clp.values)
+        else:
+            fitted = matrix @ dataset.clp.values.T
+        assert np.allclose(dataset.fitted_data, fitted)
+
+
+def test_non_finite_penalty():
+    # the fast decay overflows in the first steps, lmfit omits the non-finite penalty values
+    # and the rows of the Jacobian must be omitted as well
+    model = DecayModel.from_dict(
+        {
+            "compartment": ["s1", "s2"],
+            "dataset": {
+                "dataset1": {"initial_concentration": [], "megacomplex": [], "kinetic": ["1", "2"]}
+            },
+        }
+    )
+    model.grouped = lambda: True
+    model.index_dependent = lambda: True
+
+    data = {
+        "dataset1": simulate(
+            TwoCompartmentDecay.sim_model,
+            "dataset1",
+            TwoCompartmentDecay.wanted,
+            {"e": TwoCompartmentDecay.e_axis, "c": np.arange(1, 100)},
+        )
+    }
+    initial = ParameterGroup.from_list([0.05, 800])
+    optimize(Scheme(model=model, parameter=initial, data=data, nfev=20), verbose=False)
+
+
+def test_grouped_result_in_script(tmpdir):
+    # the result of a grouped model must not be computed in a process pool, which needs the
+    # main module of a script to be guarded
+    script = tmpdir.join("script.py")
+    script.write(
+        "from glotaran.analysis.test import test_optimization\n"
+        "test_optimization.test_result_assembly(grouped=True, index_dependent=False)\n"
+    )
+    subprocess.run([sys.executable, str(script)], check=True, timeout=60)
+
+
+def test_lazy_result_data():
+    model = TwoCompartmentDecay.model
+    model.grouped = lambda: False
+    model.index_dependent = lambda: True
+
+    dataset = simulate(
+        TwoCompartmentDecay.sim_model,
+        "dataset1",
+        TwoCompartmentDecay.wanted,
+        {"e": np.asarray([1, 2, 3]), "c": TwoCompartmentDecay.c_axis},
+    )
+    scheme = Scheme(
+        model=model, parameter=TwoCompartmentDecay.initial, data={"dataset1": dataset}, nfev=1
+    )
+    resultdata = optimize(scheme, verbose=False).data["dataset1"]
+
+    for name in [
+        "matrix",
+        "residual_left_singular_vectors",
+        "residual_right_singular_vectors",
+        "residual_singular_values",
+    ]:
+        assert isinstance(resultdata[name].data, dask.array.Array)
+
+    # the rank of the decomposition is truncated to the size of the global axis
+    _, v, _ = np.linalg.svd(resultdata.residual.values)
+    assert np.allclose(resultdata.residual_singular_values, v)
+    assert resultdata.residual_left_singular_vectors.shape == (TwoCompartmentDecay.c_axis.size, 3)
+    assert resultdata.residual_right_singular_vectors.shape == (3, 3)
+
+    assert resultdata.matrix.shape == (3, TwoCompartmentDecay.c_axis.size, 2)
+    fitted = np.einsum("ecs,es->ce", resultdata.matrix.values, resultdata.clp.values)
+    assert np.allclose(resultdata.fitted_data, fitted)
+
+
+def test_save_result(tmpdir):
+    data = {
+        label: simulate(
+            TwoCompartmentDecay.sim_model,
+            "dataset1",
+            TwoCompartmentDecay.wanted,
+            {"e": np.asarray([1, 2, 3]), "c": TwoCompartmentDecay.c_axis},
+        )
+        for label in ["dataset1", "dataset2"]
+    }
+    model = DecayModel.from_dict(
+        {
+            "compartment": ["s1", "s2"],
+            "dataset": {
+                label: {"initial_concentration": [], "megacomplex": [], "kinetic": ["1", "2"]}
+                for label in data
+            },
+        }
+    )
+    model.grouped = lambda: False
+    model.index_dependent = lambda: True
+    scheme = Scheme(model=model, parameter=TwoCompartmentDecay.initial, data=data, nfev=1)
+    result = optimize(scheme, verbose=False)
+
+    paths = result.save(str(tmpdir), complevel=4, chunks={"c": 10}, float32=True)
+    for label in data:
+        assert str(tmpdir.join(f"{label}.nc")) in paths
+        with xr.open_dataset(str(tmpdir.join(f"{label}.nc"))) as saved:
+            assert saved.data.dtype == np.float64
+            assert np.array_equal(saved.data, result.data[label].data)
+
+            assert saved.matrix.dtype == np.float32
+            assert saved.matrix.encoding["zlib"]
+            assert saved.matrix.encoding["chunksizes"] == (3, 10, 2)
+            assert np.allclose(saved.matrix, result.data[label].matrix, rtol=1e-6)
+            assert np.allclose(
+                saved.residual_singular_values, result.data[label].residual_singular_values
+            )
+
+
+def test_save_zarr(tmpdir):
+    pytest.importorskip("zarr")
+
+    model = TwoCompartmentDecay.model
+    model.grouped = lambda: False
+    model.index_dependent = lambda: True
+    store = str(tmpdir.join("results.zarr"))
+
+    results = []
+    for rate in [11e-4, 12e-4]:
+        wanted = ParameterGroup.from_list([rate, 22e-5])
+        dataset = simulate(
+            TwoCompartmentDecay.sim_model,
+            "dataset1",
+            wanted,
+            {"e": np.asarray([1, 2, 3]), "c": TwoCompartmentDecay.c_axis},
+        )
+        scheme = Scheme(
+            model=model, parameter=TwoCompartmentDecay.initial, data={"dataset1": dataset}, nfev=1
+        )
+        results.append(optimize(scheme, verbose=False))
+
+    assert results[0].save_zarr(store) == "0"
+    assert results[1].save_zarr(store, run="second measurement") == "second measurement"
+
+    groups = open_result_store(store)
+    assert set(groups) == {"dataset1", "parameter", "result"}
+    assert list(groups["result"].run.values) == ["0", "second measurement"]
+    assert "2" in groups["result"].markdown.values[1]
+
+    saved = groups["dataset1"]
+    assert isinstance(saved.residual.data, dask.array.Array)
+    assert saved.matrix.dims == ("run", "e", "c", "clp_label")
+    for i, result in enumerate(results):
+        assert np.allclose(saved.data.isel(run=i), result.data["dataset1"].data)
+        assert np.allclose(saved.matrix.isel(run=i), result.data["dataset1"].matrix)
+        assert np.isclose(
+            saved.root_mean_square_error.isel(run=i),
+            result.data["dataset1"].root_mean_square_error,
+        )
+        assert np.allclose(
+            groups["parameter"].value.isel(run=i),
+            [p.value for _, p in result.optimized_parameter.all()],
+        )
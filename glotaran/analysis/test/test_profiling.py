@@ -0,0 +1,82 @@
+import json
+import time
+
+import pytest
+
+from glotaran.analysis.optimize import optimize
+from glotaran.analysis.optimize import profiling
+from glotaran.analysis.profiling import Profile
+from glotaran.analysis.scheme import Scheme
+from glotaran.analysis.simulation import simulate
+
+from .test_optimization import MultichannelMulticomponentDecay
+
+
+def test_profile():
+    profile = Profile()
+
+    def inner():
+        time.sleep(0.01)
+
+    def outer():
+        time.sleep(0.01)
+        profile.wrap("inner", "dataset1", inner)()
+
+    start = time.perf_counter()
+    profile.wrap("outer", None, outer)()
+    profile.wrap("outer", None, outer)()
+    wall_time = time.perf_counter() - start
+    with profile.phase("block", "dataset1"):
+        time.sleep(0.01)
+    profile.count("evaluations")
+
+    statistics = profile.statistics()
+    assert statistics["outer"]["all"].calls == 2
+    assert statistics["inner"]["dataset1"].calls == 2
+    assert statistics["block"]["dataset1"].calls == 1
+    # the time of the inner phase is not counted for the outer phase
+    outer_time = statistics["outer"]["all"].time
+    assert outer_time >= 0.02
+    assert outer_time + statistics["inner"]["dataset1"].time <= wall_time
+    assert profile.counters == {"evaluations": 1}
+
+    content = json.loads(profile.to_json())
+    assert content["phases"]["inner"]["dataset1"]["calls"] == 2
+    assert content["counters"]["evaluations"] == 1
+
+
+@pytest.mark.parametrize("index_dependent", [True, False])
+@pytest.mark.parametrize("grouped", [True, False])
+def test_optimize_profiling(tmpdir, grouped, index_dependent):
+    suite = MultichannelMulticomponentDecay
+    model = suite.model
+    model.grouped = lambda: grouped
+    model.index_dependent = lambda: index_dependent
+
+    dataset = simulate(
+        suite.sim_model, "dataset1", suite.wanted, {"e": suite.e_axis, "c": suite.c_axis}
+    )
+    scheme = Scheme(model=model, parameter=suite.initial, data={"dataset1": dataset}, nfev=3)
+
+    assert optimize(scheme, verbose=False).timings is None
+
+    with profiling():
+        result = optimize(scheme, verbose=False)
+
+    statistics = result.timings.statistics()
+    for phase in ["fill", "matrix", "solve", "residual", "penalty", "result"]:
+        assert phase in statistics
+    counters = result.timings.counters
+    evaluations = counters["evaluations"]
+    assert evaluations >= result.nfev
+    # the descriptors are filled for the Jacobian too
+    assert statistics["fill"]["dataset1"].calls == evaluations + counters.get(
+        "jacobian_evaluations", 0
+    )
+    assert statistics["penalty"]["all"].calls == evaluations
+    assert statistics["penalty"]["all"].bytes > 0
+
+    paths = result.save(str(tmpdir))
+    assert str(tmpdir.join("timings.json")) in paths
+    with open(tmpdir.join("timings.json")) as f:
+        assert "matrix" in json.load(f)["phases"]
@@ -0,0 +1,136 @@
+import numpy as np
+import pytest
+
+from glotaran.analysis.nnls import residual_nnls
+from glotaran.analysis.nnls import residual_nnls_stacked
+from glotaran.analysis.variable_projection import jacobian_variable_projection
+from glotaran.analysis.variable_projection import residual_variable_projection
+from glotaran.analysis.variable_projection import residual_variable_projection_stacked
+
+
+@pytest.mark.parametrize("residual_function", [residual_variable_projection, residual_nnls])
+def test_batched_residual(residual_function):
+    rng = np.random.default_rng(42)
+    matrix = rng.random((50, 3))
+    data = rng.random((50, 7))
+
+    clp, residual = residual_function(matrix, data)
+    assert clp.shape == (3, 7)
+    assert residual.shape == (50, 7)
+
+    for i in range(data.shape[1]):
+        wanted_clp, wanted_residual = residual_function(matrix, data[:, i])
+        assert np.allclose(clp[:, i], wanted_clp)
+        assert np.allclose(residual[:, i], wanted_residual)
+
+
+@pytest.mark.parametrize(
+    "residual_function, stacked_residual_function",
+    [
+        (residual_variable_projection, residual_variable_projection_stacked),
+        (residual_nnls, residual_nnls_stacked),
+    ],
+)
+def test_stacked_residual(residual_function, stacked_residual_function):
+    rng = np.random.default_rng(42)
+    matrices = rng.random((7, 50, 3))
+    data = rng.random((7, 50))
+
+    clp, residual = stacked_residual_function(matrices, data)
+    assert clp.shape == (7, 3)
+    assert residual.shape == (7, 50)
+
+    for i in range(data.shape[0]):
+        wanted_clp, wanted_residual = residual_function(matrices[i], data[i])
+        assert np.allclose(clp[i], wanted_clp)
+        assert np.allclose(residual[i], wanted_residual)
+
+
+@pytest.mark.parametrize(
+    "residual_function, stacked_residual_function",
+    [
+        (residual_variable_projection, residual_variable_projection_stacked),
+        (residual_nnls, residual_nnls_stacked),
+    ],
+)
+def test_weighted_residual(residual_function, stacked_residual_function):
+    rng = np.random.default_rng(42)
+    matrices = rng.random((7, 50, 3))
+    weight = rng.random((7, 50)) + 0.5
+    data = rng.random((7, 50)) * weight
+    original = matrices.copy()
+
+    clp, residual = stacked_residual_function(matrices, data, weight)
+    for i in range(data.shape[0]):
+        wanted_clp, wanted_residual = residual_function(
+            matrices[i] * weight[i][:, np.newaxis], data[i]
+        )
+        assert np.allclose(clp[i], wanted_clp)
+        assert np.allclose(residual[i], wanted_residual)
+
+        weighted_clp, weighted_residual = residual_function(matrices[i], data[i], weight[i])
+        assert np.allclose(weighted_clp, wanted_clp)
+        assert np.allclose(weighted_residual, wanted_residual)
+
+    # the weight is not applied to the matrices in place
+    assert np.array_equal(matrices, original)
+
+
+def test_stacked_residual_degenerate_columns():
+    rng = np.random.default_rng(42)
+    matrices = rng.random((2, 50, 3))
+    # a column which is zero, e.g. a decay which vanished on the axis, and a tiny column
+    matrices[0, :, 1] = 0
+    matrices[1, :, 1] *= 1e-200
+    data = rng.random((2, 50))
+
+    clp, residual = residual_variable_projection_stacked(matrices, data)
+    assert np.all(np.isfinite(clp))
+    for i in range(data.shape[0]):
+        wanted_clp, wanted_residual = residual_variable_projection(matrices[i], data[i])
+        assert np.allclose(residual[i], wanted_residual)
+    # the clp of the zero column is 0, the tiny column is solved like with LAPACK
+    assert clp[0, 1] == 0
+    assert np.allclose(clp[1], wanted_clp, rtol=1e-10)
+
+
+def test_jacobian_variable_projection():
+    axis = np.linspace(0, 10, 50)
+    rates = np.asarray([0.5, 2.0])
+
+    def calculate_matrix(rates):
+        return np.stack([np.exp(-rates[0] * axis), np.exp(-rates[1] * axis), np.ones_like(axis)])
+
+    matrix = calculate_matrix(rates).T
+    derivatives = np.zeros((2,) + matrix.shape)
+    derivatives[0, :, 0] = -axis * matrix[:, 0]
+    derivatives[1, :, 1] = -axis * matrix[:, 1]
+
+    # without residual the Kaufman approximation is exact
+    data = matrix @ np.asarray([[1, 3], [2, -1], [3, 0.5]])
+
+    jacobian = jacobian_variable_projection(matrix, derivatives, data)
+    assert jacobian.shape == (50, 2, 2)
+    assert np.allclose(
+        jacobian_variable_projection(matrix, derivatives, data[:, 0]), jacobian[:, :, 0]
+    )
+
+    step = 1e-6
+    for i in range(rates.size):
+        plus = rates.copy()
+        plus[i] += step
+        minus = rates.copy()
+        minus[i] -= step
+        _, residual_plus = residual_variable_projection(calculate_matrix(plus).T, data)
+        _, residual_minus = residual_variable_projection(calculate_matrix(minus).T, data)
+        assert np.allclose(jacobian[:, i], (residual_plus - residual_minus) / (2 * step))
+
+    weight = np.linspace(0.5, 2, axis.size)
+    assert np.allclose(
+        jacobian_variable_projection(matrix, derivatives, data, weight),
+        jacobian_variable_projection(
+            matrix * weight[:, np.newaxis],
+            derivatives * weight[np.newaxis, :, np.newaxis],
+            data,
+        ),
+    )
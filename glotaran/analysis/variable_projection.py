@@ -3,12 +3,13 @@ projection method."""
 
 import typing
 
+import numba as nb
 import numpy as np
 from scipy.linalg import lapack
 
 
 def residual_variable_projection(
-    matrix: np.ndarray, data: np.ndarray
+    matrix: np.ndarray, data: np.ndarray, weight: np.ndarray = None
 ) -> typing.Tuple[typing.List[str], np.ndarray]:
     """Calculates the conditionally linear parameters and residual with the variable projection
     method.
@@ -18,22 +19,180 @@ def residual_variable_projection(
     matrix :
         The model matrix.
     data : np.ndarray
-        The data to analyze.
+        The data to analyze. If the data is 2-dimensional, every column is solved with the same
+        factorization of the matrix and the clp and residual are 2-dimensional too.
+    weight :
+        The weight of the rows of the matrix. The data must already be weighted. The matrix is
+        not changed, the weighted copy is factorized in place.
     """
     # TODO: Reference Kaufman paper
 
+    nr_clp = matrix.shape[1]
+    # the work size must cover both, the columns of the matrix and the columns of the data
+    work_size = max(1, nr_clp, data.shape[1] if data.ndim == 2 else 1)
+
     # Kaufman Q2 step 3
-    qr, tau, _, _ = lapack.dgeqrf(matrix)
+    qr, tau, _, _ = _factorize(matrix, weight)
 
     # Kaufman Q2 step 4
-    temp, _, _ = lapack.dormqr("L", "T", qr, tau, data, max(1, matrix.shape[1]), overwrite_c=0)
+    temp, _, _ = lapack.dormqr("L", "T", qr, tau, data, work_size, overwrite_c=0)
 
     clp, _ = lapack.dtrtrs(qr, temp)
 
-    for i in range(matrix.shape[1]):
-        temp[i] = 0
+    temp[:nr_clp] = 0
 
     # Kaufman Q2 step 5
 
-    residual, _, _ = lapack.dormqr("L", "N", qr, tau, temp, max(1, matrix.shape[1]), overwrite_c=0)
-    return clp[: matrix.shape[1]], residual
+    residual, _, _ = lapack.dormqr("L", "N", qr, tau, temp, work_size, overwrite_c=0)
+    return clp[:nr_clp], residual
+
+
+def jacobian_variable_projection(
+    matrix: np.ndarray, derivatives: np.ndarray, data: np.ndarray, weight: np.ndarray = None
+) -> np.ndarray:
+    """Calculates the Jacobian of the variable projection residual with the approximation of
+    Kaufman.
+
+    The Jacobian column for a parameter is the negative orthogonal projection of the matrix
+    derivative applied on the conditionally linear parameters.
+
+    Parameters
+    ----------
+    matrix :
+        The model matrix.
+    derivatives :
+        The derivatives of the model matrix with respect to the parameter with shape
+        `(parameter, rows, clp)`.
+    data : np.ndarray
+        The data to analyze. If the data is 2-dimensional, the Jacobian has the shape
+        `(rows, parameter, columns)`, otherwise `(rows, parameter)`.
+    weight :
+        The weight of the rows of the matrix and the derivatives. The data must already be
+        weighted.
+    """
+    nr_clp = matrix.shape[1]
+    work_size = max(1, nr_clp, data.shape[1] if data.ndim == 2 else 1)
+
+    qr, tau, _, _ = _factorize(matrix, weight)
+    temp, _, _ = lapack.dormqr("L", "T", qr, tau, data, work_size, overwrite_c=0)
+    clp, _ = lapack.dtrtrs(qr, temp)
+
+    projected = np.einsum("prc,c...->rp...", derivatives, clp[:nr_clp])
+    if weight is not None:
+        # the weight of the rows commutes with the product with the clp
+        projected *= weight.reshape((-1,) + (1,) * (projected.ndim - 1))
+    shape = projected.shape
+    projected = projected.reshape((shape[0], -1))
+    if projected.shape[1] == 0:
+        return projected.reshape(shape)
+
+    work_size = max(1, nr_clp, projected.shape[1])
+    temp, _, _ = lapack.dormqr("L", "T", qr, tau, projected, work_size, overwrite_c=0)
+    temp[:nr_clp] = 0
+    jacobian, _, _ = lapack.dormqr("L", "N", qr, tau, temp, work_size, overwrite_c=0)
+    return -jacobian.reshape(shape)
+
+
+def residual_variable_projection_stacked(
+    matrices: np.ndarray, data: np.ndarray, weight: np.ndarray = None
+) -> typing.Tuple[np.ndarray, np.ndarray]:
+    """Calculates the conditionally linear parameters and residual with the variable projection
+    method for a stack of matrices.
+
+    All problems are solved together in one compiled kernel with a Householder QR
+    decomposition, instead of one LAPACK call per problem. The kernel itself is serial, stacks
+    are solved in parallel by the tasks of the evaluation plan.
+
+    Parameters
+    ----------
+    matrices :
+        The model matrices with shape `(stack, rows, clp)`.
+    data : np.ndarray
+        The data to analyze with shape `(stack, rows)`.
+    weight :
+        The weight of the rows of the matrices with shape `(stack, rows)`. The data must already
+        be weighted. The matrices are not changed.
+    """
+    matrices = np.asarray(matrices, dtype=np.float64)
+    clp = np.empty((matrices.shape[0], matrices.shape[2]), dtype=np.float64)
+    residual = np.array(data, dtype=np.float64)
+    if weight is None:
+        weight = np.ones(residual.shape, dtype=np.float64)
+    _calculate_stacked_variable_projection(
+        matrices, np.asarray(weight, dtype=np.float64), clp, residual
+    )
+    return clp, residual
+
+
+def _factorize(matrix, weight):
+    if weight is None:
+        return lapack.dgeqrf(matrix)
+    # the weighted matrix is a new array, which can be overwritten by the factorization
+    return lapack.dgeqrf(matrix * weight[:, np.newaxis], overwrite_a=1)
+
+
+@nb.jit(nopython=True, fastmath={"reassoc", "contract"}, cache=True)
+def _calculate_stacked_variable_projection(matrices, weight, clp, residual):
+    nr_stack, nr_rows, nr_clp = matrices.shape
+    for n_s in range(nr_stack):
+        # the columns of the matrix are the rows of the transposed and weighted copy
+        qr = matrices[n_s].T * weight[n_s]
+        temp = residual[n_s]
+        tau = np.zeros(nr_clp)
+        diagonal = np.zeros(nr_clp)
+
+        # Kaufman Q2 step 3 and 4
+        for i in range(nr_clp):
+            reflector = qr[i]
+            # the norm is scaled, so that the squares of tiny columns do not underflow
+            scale = 0.0
+            for n_r in range(i, nr_rows):
+                scale = max(scale, abs(reflector[n_r]))
+            if scale == 0.0:
+                # the column is zero, its clp is set to 0
+                continue
+            norm = 0.0
+            for n_r in range(i, nr_rows):
+                norm += (reflector[n_r] / scale) ** 2
+            norm = scale * np.sqrt(norm)
+            head = reflector[i]
+            diagonal[i] = -norm if head >= 0 else norm
+            # the reflector is normalized to a head of 1 like in LAPACK, so tau does not overflow
+            for n_r in range(i + 1, nr_rows):
+                reflector[n_r] /= head - diagonal[i]
+            reflector[i] = 1.0
+            tau[i] = 1.0 + abs(head) / norm
+
+            for j in range(i + 1, nr_clp):
+                column = qr[j]
+                dot = 0.0
+                for n_r in range(i, nr_rows):
+                    dot += reflector[n_r] * column[n_r]
+                dot *= tau[i]
+                for n_r in range(i, nr_rows):
+                    column[n_r] -= dot * reflector[n_r]
+
+            dot = 0.0
+            for n_r in range(i, nr_rows):
+                dot += reflector[n_r] * temp[n_r]
+            dot *= tau[i]
+            for n_r in range(i, nr_rows):
+                temp[n_r] -= dot * reflector[n_r]
+
+        for i in range(nr_clp - 1, -1, -1):
+            value = temp[i]
+            for j in range(i + 1, nr_clp):
+                value -= qr[j, i] * clp[n_s, j]
+            clp[n_s, i] = value / diagonal[i] if diagonal[i] != 0.0 else 0.0
+
+        temp[:nr_clp] = 0.0
+
+        # Kaufman Q2 step 5
+        for i in range(nr_clp - 1, -1, -1):
+            reflector = qr[i]
+            dot = 0.0
+            for n_r in range(i, nr_rows):
+                dot += reflector[n_r] * temp[n_r]
+            dot *= tau[i]
+            for n_r in range(i, nr_rows):
+                temp[n_r] -= dot * reflector[n_r]
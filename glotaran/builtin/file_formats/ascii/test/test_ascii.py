@@ -0,0 +1,49 @@
+import io
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from glotaran.builtin.file_formats.ascii.wavelength_time_explicit_file import read_ascii_time_trace
+from glotaran.builtin.file_formats.ascii.wavelength_time_explicit_file import read_values
+from glotaran.builtin.file_formats.ascii.wavelength_time_explicit_file import (
+    write_ascii_time_trace,
+)
+
+
+@pytest.mark.parametrize("file_format", ["TimeExplicit", "WavelengthExplicit"])
+def test_write_read_ascii(tmpdir, file_format):
+    data = xr.DataArray(
+        np.random.default_rng(42).random((20, 5)),
+        coords=[("time", np.arange(20) * 0.1), ("spectral", 400.0 + np.arange(5))],
+    )
+    path = str(tmpdir.join("data.ascii"))
+    write_ascii_time_trace(path, data, file_format=file_format)
+
+    result = read_ascii_time_trace(path, prepare=False)
+    assert np.allclose(result.time, data.time)
+    assert np.allclose(result.spectral, data.spectral)
+    assert np.allclose(result, data, rtol=1e-9)
+
+
+def test_read_values():
+    text = "1 2.5\t-3e2\n4　5  6.25E-1\n".encode()
+    assert np.array_equal(read_values(io.BytesIO(text)), [1, 2.5, -300, 4, 5, 0.625])
+    # chunks of a few lines give the same values
+    assert np.array_equal(
+        read_values(io.BytesIO(text * 3), chunk_size=4), [1, 2.5, -300, 4, 5, 0.625] * 3
+    )
+
+    with pytest.raises(ValueError):
+        read_values(io.BytesIO(b"1 2 foo 4\n"))
+
+
+@pytest.mark.parametrize(
+    "rows",
+    ["400 401\n0 1 2\n0.1 nan 4\n", "400 401\n0 1 2\n0.1 3\n"],
+)
+def test_read_ascii_invalid(tmpdir, rows):
+    path = tmpdir.join("data.ascii")
+    path.write(f"comment\ncomment\nWavelength explicit\nIntervalnr 2\n{rows}")
+    with pytest.raises(ValueError):
+        read_ascii_time_trace(str(path), prepare=False)
@@ -1,6 +1,8 @@
 import csv
 import os.path
 import re
+import typing
+import warnings
 from enum import Enum
 
 import numpy as np
@@ -130,62 +132,39 @@ class ExplicitFile:
         if not os.path.isfile(self._file):
             raise Exception("File does not exist.")
 
-        with open(self._file) as f:
+        with open(self._file, "rb") as f:
             f.readline()  # Read first line with comments (and discard for now)
             f.readline()  # Read second line with comments (and discard for now)
             # TODO: what to do with return: None?
-            self._file_data_format = get_data_file_format(f.readline())
+            self._file_data_format = get_data_file_format(f.readline().decode())
             # TODO: what to do with return: None?
-            interval_nr = get_interval_number(f.readline().strip().lower())
-            all_data = []
-            line = f.readline()
-            while line:
-                all_data.append(
-                    [float(i) for i in re.split(r"\s+|\t+|\s+\t+|\t+\s+|\u3000+", line.strip())]
-                )
-                # data_block = pd.read_csv(line, sep="\s+|\t+|\s+\t+|\t+\s+|\u3000+",
-                #                          engine='python', header=None, index_col=False)
-                # all_data.append(data_block.values())
-                line = f.readline()
-            all_data = np.asarray(all_data)
-
-            interval_counter = -interval_nr
-            explicit_axis = []
-            secondary_axis = []
-            observations = [[]]
-            obs_idx = 0
-
-            for item in [sl for sublist in all_data for sl in sublist]:
-                if np.isnan(item):
-                    raise ValueError()
-                if interval_counter < 0:
-                    # print("explicit_axis {}: {}".format(interval_counter, item))
-                    explicit_axis.append(item)
-                elif interval_counter == 0:
-                    # print("secondary_axis: {}".format(item))
-                    secondary_axis.append(item)
-                elif interval_counter < (interval_nr + 1):
-                    observations[obs_idx].append(item)
-                interval_counter += 1
-                if interval_counter == (interval_nr + 1):
-                    interval_counter = 0
-                    obs_idx += 1
-                    observations.append([])
-
-            del observations[-1]
-
-            if self._file_data_format == DataFileType.time_explicit:
-                self._times = np.asarray(explicit_axis)
-                self._spectral_indices = np.asarray(secondary_axis)
-                self._observations = np.asarray(observations)
-
-            elif self._file_data_format == DataFileType.wavelength_explicit:
-                self._spectral_indices = np.asarray(explicit_axis)
-                self._times = np.asarray(secondary_axis)
-                self._observations = np.asarray(observations)
-
-            else:
-                raise NotImplementedError()
+            interval_nr = get_interval_number(f.readline().decode().strip().lower())
+            all_data = read_values(f)
+
+        if np.any(np.isnan(all_data)):
+            raise ValueError("The data contains NaN values.")
+
+        # the explicit axis is followed by rows of a secondary axis value and the observations
+        explicit_axis = all_data[:interval_nr]
+        rows = all_data[interval_nr:]
+        if rows.size % (interval_nr + 1) != 0:
+            raise ValueError(f"The last row does not contain {interval_nr} observations.")
+        rows = rows.reshape((-1, interval_nr + 1))
+        secondary_axis = rows[:, 0]
+        observations = rows[:, 1:]
+
+        if self._file_data_format == DataFileType.time_explicit:
+            self._times = explicit_axis
+            self._spectral_indices = secondary_axis
+            self._observations = observations
+
+        elif self._file_data_format == DataFileType.wavelength_explicit:
+            self._spectral_indices = explicit_axis
+            self._times = secondary_axis
+            self._observations = observations
+
+        else:
+            raise NotImplementedError()
 
         return self.dataset(prepare=prepare)
 
@@ -266,6 +245,40 @@ class TimeExplicitFile(ExplicitFile):
         return DataFileType.time_explicit
 
 
+_IDEOGRAPHIC_SPACE = "\u3000".encode()
+
+
+def read_values(f: typing.BinaryIO, chunk_size: int = 2 ** 24) -> np.ndarray:
+    """Reads all whitespace separated numbers from the current position to the end of a file.
+
+    The file is parsed in chunks of lines of about `chunk_size` bytes, so that the text of the
+    file is never held in memory at once.
+
+    Parameters
+    ----------
+    f :
+        The file opened in binary mode.
+    chunk_size :
+        The approximate number of bytes to parse at once.
+    """
+    chunks = []
+    lines = f.readlines(chunk_size)
+    while lines:
+        text = b"".join(lines)
+        # the ideographic space is used as separator by some exporting programs
+        if _IDEOGRAPHIC_SPACE in text:
+            text = text.replace(_IDEOGRAPHIC_SPACE, b" ")
+        with warnings.catch_warnings():
+            # numpy stops parsing at the first invalid value with a deprecation warning
+            warnings.simplefilter("error", DeprecationWarning)
+            try:
+                chunks.append(np.fromstring(text, dtype=np.float64, sep=" "))
+            except (DeprecationWarning, ValueError):
+                raise ValueError("The data contains values which are not numbers.")
+        lines = f.readlines(chunk_size)
+    return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.float64)
+
+
 def get_interval_number(line):
     interval_number = None
     match = re.search(r"intervalnr\s(.*)", line.strip().lower())
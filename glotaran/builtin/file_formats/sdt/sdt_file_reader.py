@@ -1,10 +1,14 @@
 """
 Glotarans module to read files
 """
+import typing
 import warnings
 
+import dask.array as da
 import numpy as np
 import xarray as xr
+from sdtfile import BlockType
+from sdtfile import FileRevision
 from sdtfile import SdtFile
 
 from glotaran.io.prepare_dataset import prepare_time_trace_dataset
@@ -19,6 +23,7 @@ def read_sdt(
     dataset_index: int = None,
     swap_axis: bool = False,
     orig_time_axis_index: int = 2,
+    memory_map: bool = False,
 ) -> xr.Dataset:
     """
     Reads a `*.sdt` file and returns a pd.DataFrame (`return_dataframe==True`), a
@@ -50,28 +55,34 @@ def read_sdt(
         I.e. for data of shape (64, 64, 256), which are a 64x64 pixel map
         with 256 time steps, orig_time_axis_index=2.
 
+    memory_map: bool, default False
+        Flag to memory map the data block of the file instead of reading it. The FLIM data is
+        returned as dask arrays chunked over the rows of pixels, so that it is only read when
+        it is computed. Not supported for compressed files.
+
     Raises
     ______
     IndexError:
         If the length of the index array is incompatible with the data.
     """
-    sdt_parser = SdtFile(file_path)
-    if not dataset_index:
+    if memory_map:
+        nr_of_datasets, times, data = _memory_map_sdt(file_path, dataset_index or 0)
+    else:
+        sdt_parser = SdtFile(file_path)
         # looking at the source code of SdtFile, times and data
         # always have the same len, so only one needs to be checked
         nr_of_datasets = len(sdt_parser.times)
-        if nr_of_datasets > 1:
-            warnings.warn(
-                UserWarning(
-                    f"The file '{file_path}' contains {nr_of_datasets} Datasets.\n "
-                    f"By default only the first Dataset will be read. "
-                    f"If you only need the first Dataset and want get rid of "
-                    f"this warning you can set dataset_index=0."
-                )
+        times = sdt_parser.times[dataset_index or 0]
+        data = sdt_parser.data[dataset_index or 0]
+    if not dataset_index and nr_of_datasets > 1:
+        warnings.warn(
+            UserWarning(
+                f"The file '{file_path}' contains {nr_of_datasets} Datasets.\n "
+                f"By default only the first Dataset will be read. "
+                f"If you only need the first Dataset and want get rid of "
+                f"this warning you can set dataset_index=0."
             )
-        dataset_index = 0
-    times = sdt_parser.times[dataset_index]
-    data = sdt_parser.data[dataset_index]
+        )
 
     if index and len(index) is not data.shape[0]:
         raise IndexError(
@@ -91,14 +102,24 @@ def read_sdt(
     if flim:
 
         if orig_time_axis_index != 2:
-            np.swapaxes(data, 2, orig_time_axis_index)
+            data = np.swapaxes(data, 2, orig_time_axis_index)
+        if memory_map:
+            # the rows of pixels are contiguous in the file
+            data = da.from_array(data, chunks=("auto", -1, -1))
 
-        full_data = xr.DataArray(data, coords={"time": times}, dims=["x", "y", "time"])
-        data = full_data.stack(pixel=("x", "y")).to_dataset(name="data")
-        data["full_data"] = full_data.rename({"x": "pixel_x", "y": "pixel_y"})
-        data["data_intensity_map"] = (
-            data.data.groupby("pixel").sum().unstack().rename({"x": "pixel_x", "y": "pixel_y"})
+        full_data = xr.DataArray(
+            data,
+            coords={
+                "x": np.arange(data.shape[0]),
+                "y": np.arange(data.shape[1]),
+                "time": times,
+            },
+            dims=["x", "y", "time"],
         )
+        data = full_data.stack(pixel=("x", "y")).to_dataset(name="data")
+        full_data = full_data.rename({"x": "pixel_x", "y": "pixel_y"})
+        data["full_data"] = full_data
+        data["data_intensity_map"] = full_data.sum("time")
     else:
         if swap_axis:
             data = data.T
@@ -107,3 +128,129 @@ def read_sdt(
         data = xr.DataArray(data.T, coords=[("time", times), ("spectral", index)])
         data = prepare_time_trace_dataset(data)
     return data
+
+
+_FILE_HEADER = np.dtype(
+    [
+        ("revision", "<i2"),
+        ("info_offs", "<i4"),
+        ("info_length", "<i2"),
+        ("setup_offs", "<i4"),
+        ("setup_length", "<u2"),
+        ("data_block_offs", "<i4"),
+        ("no_of_data_blocks", "<i2"),
+        ("data_block_length", "<u4"),
+        ("meas_desc_block_offs", "<i4"),
+        ("no_of_meas_desc_blocks", "<i2"),
+        ("meas_desc_block_length", "<i2"),
+        ("header_valid", "<u2"),
+        ("reserved1", "<u4"),
+        ("reserved2", "<u2"),
+        ("chksum", "<u2"),
+    ]
+)
+
+_BLOCK_HEADER = np.dtype(
+    [
+        ("data_offs_ext", "u1"),
+        ("next_block_offs_ext", "u1"),
+        ("data_offs", "<u4"),
+        ("next_block_offs", "<u4"),
+        ("block_type", "<u2"),
+        ("meas_desc_block_no", "<i2"),
+        ("lblock_no", "<u4"),
+        ("block_length", "<u4"),
+    ]
+)
+
+_BLOCK_HEADER_OLD = np.dtype(
+    [
+        ("block_no", "<i2"),
+        ("data_offs", "<i4"),
+        ("next_block_offs", "<i4"),
+        ("block_type", "<u2"),
+        ("meas_desc_block_no", "<i2"),
+        ("lblock_no", "<u4"),
+        ("block_length", "<u4"),
+    ]
+)
+
+_MEASURE_INFO = np.dtype(
+    {
+        "names": ["tac_r", "tac_g", "adc_re", "scan_x", "scan_y", "image_x", "image_y"],
+        "formats": ["<f4", "<i2", "<i2", "<i4", "<i4", "<i4", "<i4"],
+        "offsets": [64, 68, 82, 173, 177, 309, 313],
+    }
+)
+"""The fields of the measurement description block needed to shape the data."""
+
+
+def _memory_map_sdt(
+    file_path: str, dataset_index: int
+) -> typing.Tuple[int, np.ndarray, np.memmap]:
+    """Memory maps a data block of a `*.sdt` file.
+
+    Only the headers of the file are read, shaping the data the same way as
+    :class:`sdtfile.SdtFile`.
+
+    Returns
+    -------
+    nr_of_datasets, times, data
+    """
+    with open(file_path, "rb") as f:
+        header = np.fromfile(f, dtype=_FILE_HEADER, count=1)[0]
+        if header["chksum"] != 0x55AA and header["header_valid"] != 0x5555:
+            raise ValueError(f"The file '{file_path}' is not a valid SDT file.")
+        nr_of_datasets = int(header["no_of_data_blocks"])
+        if nr_of_datasets == 0x7FFF:
+            nr_of_datasets = int(header["reserved1"])
+        if dataset_index >= nr_of_datasets:
+            raise IndexError(
+                f"The file '{file_path}' contains {nr_of_datasets} Datasets, "
+                f"but the dataset with index {dataset_index} was requested."
+            )
+
+        block_header_type = (
+            _BLOCK_HEADER
+            if FileRevision(int(header["revision"])).revision >= 15
+            else _BLOCK_HEADER_OLD
+        )
+        offset = int(header["data_block_offs"])
+        for _ in range(dataset_index + 1):
+            f.seek(offset)
+            block_header = np.fromfile(f, dtype=block_header_type, count=1)[0]
+            offset = int(block_header["next_block_offs"])
+
+        # older files have shorter descriptions, missing fields are read as 0 like by SdtFile
+        f.seek(
+            int(header["meas_desc_block_offs"])
+            + int(block_header["meas_desc_block_no"]) * int(header["meas_desc_block_length"])
+        )
+        measure_info = bytearray(f.read(int(header["meas_desc_block_length"])))
+        measure_info.extend(bytes(max(0, _MEASURE_INFO.itemsize - len(measure_info))))
+        measure_info = np.frombuffer(measure_info, dtype=_MEASURE_INFO, count=1)[0]
+
+    block_type = BlockType(int(block_header["block_type"]))
+    if block_type.compress:
+        raise ValueError(f"The compressed data of the file '{file_path}' can not be mapped.")
+
+    adc_re = int(measure_info["adc_re"]) or 65536
+    size = int(block_header["block_length"]) // block_type.dtype.itemsize
+    if size == measure_info["scan_x"] * measure_info["scan_y"] * adc_re:
+        shape = (int(measure_info["scan_y"]), int(measure_info["scan_x"]), adc_re)
+    elif size == measure_info["image_x"] * measure_info["image_y"] * adc_re:
+        shape = (int(measure_info["image_y"]), int(measure_info["image_x"]), adc_re)
+    else:
+        shape = (-1, adc_re)
+    data = np.memmap(
+        file_path,
+        dtype=block_type.dtype,
+        mode="r",
+        offset=int(block_header["data_offs"]),
+        shape=size,
+    ).reshape(shape)
+
+    times = np.arange(adc_re, dtype=np.float64)
+    if measure_info["tac_g"] != 0:
+        times *= measure_info["tac_r"] / (measure_info["tac_g"] * adc_re)
+    return nr_of_datasets, times, data
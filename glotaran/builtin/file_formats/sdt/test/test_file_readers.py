@@ -1,10 +1,13 @@
+import dask.array
 import numpy as np
 import pandas as pd
 import pytest
 import xarray as xr
+from sdtfile import SdtFile
 
 from glotaran.builtin.file_formats.sdt.sdt_file_reader import read_sdt
 
+from . import FLIM_DATA
 from . import TEMPORAL_DATA
 
 
@@ -27,3 +30,17 @@ def test_read_sdt(test_file_path, result_file_path, index):
 
     assert test_dataset.data.T.shape == result_traces.values.shape
     assert np.allclose(test_dataset.time, np.array(result_traces.columns))
+
+
+def test_read_sdt_flim_memory_map():
+
+    sdt_file = SdtFile(FLIM_DATA["sdt"])
+    test_dataset = read_sdt(file_path=FLIM_DATA["sdt"], flim=True)
+    assert np.array_equal(test_dataset.full_data, sdt_file.data[0])
+    assert np.array_equal(test_dataset.data_intensity_map, sdt_file.data[0].sum(axis=2))
+    assert np.array_equal(test_dataset.data.sel(pixel=(3, 5)), sdt_file.data[0][3, 5])
+
+    mapped_dataset = read_sdt(file_path=FLIM_DATA["sdt"], flim=True, memory_map=True)
+    assert isinstance(mapped_dataset.full_data.data, dask.array.Array)
+    assert isinstance(mapped_dataset.data_intensity_map.data, dask.array.Array)
+    assert mapped_dataset.compute().identical(test_dataset)
@@ -1,5 +1,7 @@
 import typing
 
+import dask
+import dask.array as da
 import numpy as np
 import xarray as xr
 from scipy import fftpack
@@ -65,13 +67,26 @@ def finalize_doas_data(
             clp_label=[f"{osc}_cos" for osc in oscillations]
         ).rename(clp_label="oscillation")
 
-    time_diff = np.diff(dataset.time, n=1, axis=0)
+    # the power spectrum is computed lazily from the lazy singular vectors
+    power = dask.delayed(_calculate_power_spectrum, pure=True)(
+        dataset.time.values,
+        dataset.residual_left_singular_vectors.isel(left_singular_value_index=0).data,
+    )
+    dataset["residual_power_spectrum"] = (
+        ("frequency"),
+        da.from_delayed(power, (_POWER_SPECTRUM_SIZE,), dtype=np.float64),
+    )
 
-    power = dataset.residual_left_singular_vectors.isel(left_singular_value_index=0).values[:-1]
-    power = power[time_diff < time_diff.mean()]
 
-    power = fftpack.fft(power, n=1024, axis=0)
+_POWER_SPECTRUM_SIZE = 1024
+
+
+def _calculate_power_spectrum(time, residual_vector):
+    time_diff = np.diff(time, n=1, axis=0)
+
+    power = residual_vector[:-1]
+    power = power[time_diff < time_diff.mean()]
 
-    power = np.abs(power) / power.size
+    power = fftpack.fft(power, n=_POWER_SPECTRUM_SIZE, axis=0)
 
-    dataset["residual_power_spectrum"] = (("frequency"), power)
+    return np.abs(power) / power.size
@@ -1,9 +1,13 @@
 import numpy as np
 import pytest
+from scipy.special import erf
+from scipy.special import wofz
 
 from glotaran import ParameterGroup
 from glotaran.builtin.models.doas import DOASModel
 from glotaran.builtin.models.doas.doas_matrix import calculate_doas_matrix
+from glotaran.builtin.models.doas.doas_matrix import calculate_doas_matrix_gaussian_irf
+from glotaran.builtin.models.doas.doas_matrix import faddeeva
 
 # import xarray as xr
 
@@ -327,3 +331,46 @@ def test_doas_model(suite):
     assert "dampened_oscillation_sin" in resultdata
     assert "dampened_oscillation_associated_spectra" in resultdata
     assert "dampened_oscillation_phase" in resultdata
+
+
+def test_faddeeva():
+    z = np.asarray([0, 0.1 + 0.2j, 3 + 0.01j, -20 + 5j, 1e-3 + 40j, 1e3 + 1e-3j])
+    wanted = wofz(z)
+    assert np.allclose([faddeeva(value) for value in z], wanted, rtol=1e-13, atol=0)
+
+
+def test_doas_matrix_gaussian_irf():
+    axis = np.linspace(-1, 20, 1000)
+    frequencies = np.asarray([0.5, 4.7, 20.0])
+    rates = np.asarray([0.1, 1.0, 0.0])
+    centers = np.asarray([0.3, 0.5])
+    widths = np.asarray([0.1, 0.05])
+    scales = np.asarray([1.0, 0.5])
+
+    wanted = np.zeros((axis.size, 6))
+    for i, k in enumerate(rates + 1j * frequencies):
+        shift = axis[:, np.newaxis] - centers
+        d = widths ** 2
+        osc = np.exp((-shift + 0.5 * d * k) * k) * (
+            1 + erf((shift - d * k) / (np.sqrt(2) * widths))
+        )
+        osc = osc @ scales / np.sum(scales)
+        wanted[:, 2 * i] = osc.real
+        wanted[:, 2 * i + 1] = osc.imag
+
+    matrix = np.zeros_like(wanted)
+    assert (
+        calculate_doas_matrix_gaussian_irf(
+            matrix, frequencies, rates, axis, centers, widths, scales
+        )
+        == 0
+    )
+    assert np.allclose(matrix, wanted, rtol=0, atol=1e-12)
+
+    widths[1] = np.nan
+    assert (
+        calculate_doas_matrix_gaussian_irf(
+            matrix, frequencies, rates, axis, centers, widths, scales
+        )
+        == axis.size * frequencies.size
+    )
@@ -1,3 +1,6 @@
 from . import kinetic_image_model
+from . import matrix_cache
 
 KineticImageModel = kinetic_image_model.KineticImageModel
+
+kinetic_matrix_cache = matrix_cache.kinetic_matrix_cache
@@ -86,6 +86,24 @@ class IrfMultiGaussian:
 
         return centers, widths, scale, backsweep, backsweep_period
 
+    def parameter_derivatives(self, index):
+        """The derivatives of the centers and widths of the gaussians with respect to the
+        parameter, keyed by the full label of the parameter."""
+
+        centers = self.center if isinstance(self.center, list) else [self.center]
+        widths = self.width if isinstance(self.width, list) else [self.width]
+        size = max(len(centers), len(widths))
+
+        derivatives = {}
+        for i in range(size):
+            center = centers[i] if len(centers) > 1 else centers[0]
+            width = widths[i] if len(widths) > 1 else widths[0]
+            for j, parameter in enumerate([center, width]):
+                if parameter.full_label not in derivatives:
+                    derivatives[parameter.full_label] = (np.zeros(size), np.zeros(size))
+                derivatives[parameter.full_label][j][i] += 1
+        return derivatives
+
     def calculate(self, index, axis):
         center, width, scale, _, _ = self.parameter(index)
         irf = scale[0] * np.exp(-1 * (axis - center[0]) ** 2 / (2 * width[0] ** 2))
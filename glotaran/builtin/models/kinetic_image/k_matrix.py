@@ -212,7 +212,9 @@ class KMatrix:
             return np.diag(self.full(initial_concentration.compartments)).copy()
         else:
             rates, _ = self.eigen(initial_concentration.compartments)
-            return rates
+            # the real part of the complex eigenvalues is a strided view, the compiled kernels
+            # are only compiled and cached for contiguous rates
+            return np.ascontiguousarray(rates)
 
     def _gamma(
         self,
@@ -1,11 +1,16 @@
 """ Glotaran Kinetic Matrix """
 
+import math
+
 import numba as nb
 import numpy as np
 
 from .irf import IrfMultiGaussian
+from .k_matrix import KMatrix
+from .matrix_cache import kinetic_matrix_cache
 
 sqrt2 = np.sqrt(2)
+sqrtpi = np.sqrt(np.pi)
 
 
 def kinetic_image_matrix(dataset_descriptor=None, axis=None, index=None, irf=None):
@@ -50,17 +55,9 @@ def kinetic_matrix(
             compartments = this_compartments
             matrix = this_matrix
         else:
-            new_compartments = compartments + [
-                c for c in this_compartments if c not in compartments
-            ]
-            new_matrix = np.zeros((matrix.shape[0], len(new_compartments)), dtype=np.float64)
-            for i, comp in enumerate(new_compartments):
-                if comp in compartments:
-                    new_matrix[:, i] += matrix[:, compartments.index(comp)]
-                if comp in this_compartments:
-                    new_matrix[:, i] += this_matrix[:, this_compartments.index(comp)]
-            compartments = new_compartments
-            matrix = new_matrix
+            compartments, matrix = _combine_compartments(
+                compartments, matrix, this_compartments, this_matrix
+            )
 
     if dataset_descriptor.baseline:
         baseline_compartment = f"{dataset_descriptor.label}_baseline"
@@ -75,10 +72,193 @@ def kinetic_matrix(
     return (compartments, matrix)
 
 
+def kinetic_image_matrix_block(dataset_descriptor=None, axis=None, indices=None, irf=None):
+    return kinetic_matrix_block(dataset_descriptor, axis, indices)
+
+
+def kinetic_matrix_block(dataset_descriptor=None, axis=None, indices=None):
+    """Calculates the kinetic matrices for a block of indices at once.
+
+    Returns the compartments and an array of shape (indices, axis, compartments). If the irf
+    does not depend on the index, the matrix is calculated only once.
+    """
+
+    irf = dataset_descriptor.irf
+    irf_parameter = None
+    if isinstance(irf, IrfMultiGaussian):
+        irf_parameter = [irf.parameter(index) for index in indices]
+
+    if irf_parameter is None or all(
+        np.array_equal(center, irf_parameter[0][0]) and np.array_equal(width, irf_parameter[0][1])
+        for center, width, _, _, _ in irf_parameter
+    ):
+        compartments, matrix = kinetic_image_matrix(dataset_descriptor, axis, indices[0], irf)
+        if matrix is None:
+            return (None, None)
+        return (compartments, np.repeat(matrix[np.newaxis], len(indices), axis=0))
+
+    compartments = None
+    matrix = None
+    k_matrices = dataset_descriptor.get_k_matrices()
+
+    if len(k_matrices) == 0:
+        return (None, None)
+
+    if dataset_descriptor.initial_concentration is None:
+        raise Exception(
+            f'No initial concentration specified in dataset "{dataset_descriptor.label}"'
+        )
+    initial_concentration = dataset_descriptor.initial_concentration.normalized(dataset_descriptor)
+
+    centers = np.asarray([center for center, _, _, _, _ in irf_parameter], dtype=np.float64)
+    widths = np.asarray([width for _, width, _, _, _ in irf_parameter], dtype=np.float64)
+    _, _, irf_scale, backsweep, backsweep_period = irf_parameter[0]
+    irf_scale = _values_as_array(irf_scale)
+
+    for k_matrix in k_matrices:
+
+        if k_matrix is None:
+            continue
+
+        this_compartments = [
+            comp
+            for comp in initial_concentration.compartments
+            if comp in k_matrix.involved_compartments()
+        ]
+        rates = k_matrix.rates(initial_concentration)
+
+        this_matrix = np.zeros((len(indices), axis.size, rates.size), dtype=np.float64)
+        calculate_kinetic_matrix_gaussian_irf_block(
+            this_matrix, rates, axis, centers, widths, irf_scale, backsweep, backsweep_period
+        )
+        this_matrix /= np.sum(irf_scale)
+
+        if not np.all(np.isfinite(this_matrix)):
+            raise ValueError(
+                f"Non-finite concentrations for K-Matrix '{k_matrix.label}':\n"
+                "{k_matrix.matrix_as_markdown}"
+            )
+
+        this_matrix = this_matrix @ k_matrix.a_matrix(initial_concentration)
+
+        if matrix is None:
+            compartments = this_compartments
+            matrix = this_matrix
+        else:
+            compartments, matrix = _combine_compartments(
+                compartments, matrix, this_compartments, this_matrix
+            )
+
+    if dataset_descriptor.baseline:
+        baseline_compartment = f"{dataset_descriptor.label}_baseline"
+        baseline = np.ones((len(indices), axis.size, 1), dtype=np.float64)
+        if matrix is None:
+            compartments = [baseline_compartment]
+            matrix = baseline
+        else:
+            compartments.append(baseline_compartment)
+            matrix = np.concatenate((matrix, baseline), axis=2)
+
+    return (compartments, matrix)
+
+
+def kinetic_image_matrix_derivative(dataset_descriptor=None, axis=None, index=None, irf=None):
+    return kinetic_matrix_derivative(dataset_descriptor, axis, index)
+
+
+def kinetic_matrix_derivative(dataset_descriptor=None, axis=None, index=None):
+    """Calculates the kinetic matrix and its derivatives with respect to the parameter of the
+    K-matrices and the irf.
+
+    The derivatives of the time dependent part are analytic, the derivatives of the rates and
+    the A-matrix with respect to the K-matrix parameter are taken by central differences.
+    """
+
+    compartments = None
+    matrix = None
+    derivatives = {}
+    k_matrices = dataset_descriptor.get_k_matrices()
+
+    if len(k_matrices) == 0:
+        return (None, None, derivatives)
+
+    if dataset_descriptor.initial_concentration is None:
+        raise Exception(
+            f'No initial concentration specified in dataset "{dataset_descriptor.label}"'
+        )
+    initial_concentration = dataset_descriptor.initial_concentration.normalized(dataset_descriptor)
+
+    for k_matrix in k_matrices:
+
+        if k_matrix is None:
+            continue
+
+        (this_compartments, this_matrix, this_derivatives) = _calculate_derivatives_for_k_matrix(
+            dataset_descriptor,
+            axis,
+            index,
+            k_matrix,
+            initial_concentration,
+        )
+
+        if matrix is None:
+            compartments = this_compartments
+            matrix = this_matrix
+            derivatives = this_derivatives
+        else:
+            derivatives = {
+                label: _combine_compartments(
+                    compartments,
+                    derivatives.get(label, np.zeros_like(matrix)),
+                    this_compartments,
+                    this_derivatives.get(label, np.zeros_like(this_matrix)),
+                )[1]
+                for label in list(derivatives) + list(this_derivatives)
+            }
+            compartments, matrix = _combine_compartments(
+                compartments, matrix, this_compartments, this_matrix
+            )
+
+    if dataset_descriptor.baseline:
+        baseline_compartment = f"{dataset_descriptor.label}_baseline"
+        baseline = np.ones((axis.size, 1), dtype=np.float64)
+        if matrix is None:
+            compartments = [baseline_compartment]
+            matrix = baseline
+        else:
+            compartments.append(baseline_compartment)
+            matrix = np.concatenate((matrix, baseline), axis=1)
+            derivatives = {
+                label: np.concatenate((derivative, np.zeros_like(baseline)), axis=1)
+                for label, derivative in derivatives.items()
+            }
+
+    return (compartments, matrix, derivatives)
+
+
+def _combine_compartments(compartments, matrix, this_compartments, this_matrix):
+    new_compartments = compartments + [c for c in this_compartments if c not in compartments]
+    new_matrix = np.zeros(matrix.shape[:-1] + (len(new_compartments),), dtype=np.float64)
+    for i, comp in enumerate(new_compartments):
+        if comp in compartments:
+            new_matrix[..., i] += matrix[..., compartments.index(comp)]
+        if comp in this_compartments:
+            new_matrix[..., i] += this_matrix[..., this_compartments.index(comp)]
+    return new_compartments, new_matrix
+
+
 def _calculate_for_k_matrix(
     dataset_descriptor, axis, index, k_matrix, initial_concentration, irf, matrix_implementation
 ):
 
+    # only the matrices of the builtin implementation are known to depend on nothing but the key
+    key = None
+    if matrix_implementation is kinetic_image_matrix_implementation:
+        key = _kinetic_matrix_key(dataset_descriptor, axis, index, k_matrix, initial_concentration)
+        cached = kinetic_matrix_cache.get(key)
+        if cached is not None:
+            return cached
+
     # we might have more compartments in the model then in the k matrix
     compartments = [
         comp
@@ -104,82 +284,324 @@ def _calculate_for_k_matrix(
     # apply A matrix
     matrix = matrix @ k_matrix.a_matrix(initial_concentration)
 
+    if key is not None:
+        kinetic_matrix_cache.put(key, compartments, matrix)
+
     # done
     return (compartments, matrix)
 
 
-def kinetic_image_matrix_implementation(
-    matrix, rates, axis, index, dataset_descriptor, measured_irf
-):
+def _kinetic_matrix_key(dataset_descriptor, axis, index, k_matrix, initial_concentration):
+    """Creates the cache key of a kinetic matrix.
 
+    The matrix depends only on the K-matrix, the initial concentration, the parameter of the irf
+    at the index and the axis.
+    """
+    irf_parameter = None
     if isinstance(dataset_descriptor.irf, IrfMultiGaussian):
-
         center, width, irf_scale, backsweep, backsweep_period = dataset_descriptor.irf.parameter(
             index
         )
+        irf_parameter = (
+            _values_as_bytes(center),
+            _values_as_bytes(width),
+            _values_as_bytes(irf_scale),
+            backsweep,
+            float(backsweep_period),
+        )
+    compartments = initial_concentration.compartments
+    return (
+        tuple(compartments),
+        tuple(k_matrix.involved_compartments()),
+        k_matrix.reduced(compartments).tobytes(),
+        _values_as_bytes(initial_concentration.parameters),
+        irf_parameter,
+        axis.tobytes(),
+    )
+
+
+def _values_as_array(values):
+    return np.asarray([float(value) for value in values], dtype=np.float64)
+
+
+def _values_as_bytes(values):
+    return _values_as_array(values).tobytes()
+
+
+def _calculate_derivatives_for_k_matrix(
+    dataset_descriptor, axis, index, k_matrix, initial_concentration
+):
+
+    # we might have more compartments in the model then in the k matrix
+    compartments = [
+        comp
+        for comp in initial_concentration.compartments
+        if comp in k_matrix.involved_compartments()
+    ]
+
+    # the rates are the eigenvalues of the k matrix
+    rates = k_matrix.rates(initial_concentration)
+    a_matrix = k_matrix.a_matrix(initial_concentration)
+
+    size = (axis.size, rates.size)
+    matrix = np.zeros(size, dtype=np.float64)
+    rate_derivative = np.zeros(size, dtype=np.float64)
+    irf_derivatives = {}
+
+    irf = dataset_descriptor.irf
+    if isinstance(irf, IrfMultiGaussian):
+
+        center, width, irf_scale, backsweep, backsweep_period = irf.parameter(index)
+        parameter_derivatives = irf.parameter_derivatives(index)
+        if backsweep:
+            period_label = irf.backsweep_period.full_label
+            irf_derivatives[period_label] = np.zeros(size, dtype=np.float64)
 
         for i in range(len(center)):
-            calculate_kinetic_matrix_gaussian_irf(
+            center_derivative = np.zeros(size, dtype=np.float64)
+            width_derivative = np.zeros(size, dtype=np.float64)
+            period_derivative = np.zeros(size, dtype=np.float64)
+            calculate_kinetic_matrix_gaussian_irf_derivatives(
                 matrix,
+                rate_derivative,
+                center_derivative,
+                width_derivative,
+                period_derivative,
                 rates,
                 axis,
                 center[i],
                 width[i],
-                irf_scale[i],
+                float(irf_scale[i]),
                 backsweep,
                 backsweep_period,
             )
+            for label, (d_center, d_width) in parameter_derivatives.items():
+                derivative = d_center[i] * center_derivative + d_width[i] * width_derivative
+                irf_derivatives[label] = irf_derivatives.get(label, 0) + derivative
+            if backsweep:
+                irf_derivatives[period_label] += period_derivative
+
+        normalization = np.sum(irf_scale)
+        matrix /= normalization
+        rate_derivative /= normalization
+        for derivative in irf_derivatives.values():
+            derivative /= normalization
+
+    else:
+        calculate_kinetic_matrix_no_irf(matrix, rates, axis)
+        rate_derivative = axis[:, np.newaxis] * matrix
+
+    if not np.all(np.isfinite(matrix)):
+        raise ValueError(
+            f"Non-finite concentrations for K-Matrix '{k_matrix.label}':\n"
+            "{k_matrix.matrix_as_markdown}"
+        )
+
+    # apply A matrix
+    derivatives = {label: derivative @ a_matrix for label, derivative in irf_derivatives.items()}
+    for label, (d_rates, d_a_matrix) in _k_matrix_derivatives(
+        k_matrix, initial_concentration
+    ).items():
+        derivative = (rate_derivative * d_rates) @ a_matrix + matrix @ d_a_matrix
+        derivatives[label] = (
+            derivatives[label] + derivative if label in derivatives else derivative
+        )
+    matrix = matrix @ a_matrix
+
+    return (compartments, matrix, derivatives)
+
+
+def _k_matrix_derivatives(k_matrix, initial_concentration):
+    values = {}
+    for parameter in k_matrix.matrix.values():
+        values[parameter.full_label] = parameter.value
+
+    derivatives = {}
+    for label, value in values.items():
+        step = np.cbrt(np.finfo(np.float64).eps) * max(1.0, abs(value))
+        rates_plus, a_matrix_plus = _perturbed_rates_and_a_matrix(
+            k_matrix, initial_concentration, label, step
+        )
+        rates_minus, a_matrix_minus = _perturbed_rates_and_a_matrix(
+            k_matrix, initial_concentration, label, -step
+        )
+        derivatives[label] = (
+            (rates_plus - rates_minus) / (2 * step),
+            (a_matrix_plus - a_matrix_minus) / (2 * step),
+        )
+    return derivatives
+
+
+def _perturbed_rates_and_a_matrix(k_matrix, initial_concentration, label, step):
+    perturbed = KMatrix()
+    perturbed.label = k_matrix.label
+    perturbed.matrix = {
+        index: parameter.value + step if parameter.full_label == label else parameter.value
+        for index, parameter in k_matrix.matrix.items()
+    }
+    return perturbed.rates(initial_concentration), perturbed.a_matrix(initial_concentration)
+
+
+def kinetic_image_matrix_implementation(
+    matrix, rates, axis, index, dataset_descriptor, measured_irf
+):
+
+    if isinstance(dataset_descriptor.irf, IrfMultiGaussian):
+
+        center, width, irf_scale, backsweep, backsweep_period = dataset_descriptor.irf.parameter(
+            index
+        )
+        irf_scale = _values_as_array(irf_scale)
+
+        calculate_kinetic_matrix_gaussian_irf(
+            matrix,
+            rates,
+            axis,
+            np.asarray(center, dtype=np.float64),
+            np.asarray(width, dtype=np.float64),
+            irf_scale,
+            backsweep,
+            backsweep_period,
+        )
         matrix /= np.sum(irf_scale)
 
     else:
         calculate_kinetic_matrix_no_irf(matrix, rates, axis)
 
 
-@nb.jit(nopython=True, parallel=True)
+@nb.jit(nopython=True, nogil=True, cache=True)
 def calculate_kinetic_matrix_no_irf(matrix, rates, times):
-    for n_r in nb.prange(rates.size):
-        r_n = rates[n_r]
+    for n_t in range(times.size):
+        t_n = times[n_t]
+        for n_r in range(rates.size):
+            matrix[n_t, n_r] += np.exp(rates[n_r] * t_n)
+
+
+@nb.jit(nopython=True, nogil=True, cache=True)
+def calculate_kinetic_matrix_gaussian_irf(
+    matrix, rates, times, centers, widths, scales, backsweep, backsweep_period
+):
+    """Calculates a kinetic matrix with a multi gaussian irf.
+
+    All gaussians are summed in one call. The kernel is serial and releases the GIL, the
+    matrices of different indices are calculated in parallel by the evaluation plan.
+    """
+    for n_g in range(centers.size):
+        center = centers[n_g]
+        width = widths[n_g]
+        scale = scales[n_g]
         for n_t in range(times.size):
             t_n = times[n_t]
-            matrix[n_t, n_r] += np.exp(r_n * t_n)
+            beta = (t_n - center) / (width * sqrt2)
+            for n_r in range(rates.size):
+                r_n = -rates[n_r]
+                alpha = (r_n * width) / sqrt2
+                thresh = beta - alpha
+                if thresh < -1:
+                    matrix[n_t, n_r] += scale * 0.5 * erfcx(-thresh) * np.exp(-beta * beta)
+                else:
+                    matrix[n_t, n_r] += (
+                        scale * 0.5 * (1 + erf(thresh)) * np.exp(alpha * (alpha - 2 * beta))
+                    )
+                if backsweep:
+                    x1 = np.exp(-r_n * (t_n - center + backsweep_period))
+                    x2 = np.exp(-r_n * ((backsweep_period / 2) - (t_n - center)))
+                    x3 = np.exp(-r_n * backsweep_period)
+                    matrix[n_t, n_r] += scale * (x1 + x2) / (1 - x3)
+
+
+@nb.jit(nopython=True, nogil=True, cache=True)
+def calculate_kinetic_matrix_gaussian_irf_block(
+    matrices, rates, times, centers, widths, scales, backsweep, backsweep_period
+):
+    """Calculates the kinetic matrices of a block of indices with a multi gaussian irf.
+
+    The matrices have the shape (indices, times, rates), the centers and widths the shape
+    (indices, gaussians).
+    """
+    for n_i in range(matrices.shape[0]):
+        calculate_kinetic_matrix_gaussian_irf(
+            matrices[n_i],
+            rates,
+            times,
+            centers[n_i],
+            widths[n_i],
+            scales,
+            backsweep,
+            backsweep_period,
+        )
 
 
-@nb.jit(nopython=True, parallel=True)
-def calculate_kinetic_matrix_gaussian_irf(
-    matrix, rates, times, center, width, scale, backsweep, backsweep_period
+@nb.jit(nopython=True, cache=True)
+def calculate_kinetic_matrix_gaussian_irf_derivatives(
+    matrix,
+    rate_derivative,
+    center_derivative,
+    width_derivative,
+    period_derivative,
+    rates,
+    times,
+    center,
+    width,
+    scale,
+    backsweep,
+    backsweep_period,
 ):
-    """Calculates a kinetic matrix with a gaussian irf."""
-    for n_r in nb.prange(rates.size):
+    """Calculates a kinetic matrix with a gaussian irf and its derivatives with respect to the
+    rates, the center and width of the irf and the backsweep period."""
+    for n_r in range(rates.size):
         r_n = -rates[n_r]
         alpha = (r_n * width) / sqrt2
-        for n_t in nb.prange(times.size):
+        for n_t in range(times.size):
             t_n = times[n_t]
             beta = (t_n - center) / (width * sqrt2)
             thresh = beta - alpha
             if thresh < -1:
-                matrix[n_t, n_r] += scale * 0.5 * erfcx(-thresh) * np.exp(-beta * beta)
+                value = 0.5 * erfcx(-thresh) * np.exp(-beta * beta)
             else:
-                matrix[n_t, n_r] += (
-                    scale * 0.5 * (1 + erf(thresh)) * np.exp(alpha * (alpha - 2 * beta))
-                )
+                value = 0.5 * (1 + erf(thresh)) * np.exp(alpha * (alpha - 2 * beta))
+            gauss = np.exp(-beta * beta) / sqrtpi
+            matrix[n_t, n_r] += scale * value
+            # the rates are negative, so the derivative of the decay rate changes sign
+            rate_derivative[n_t, n_r] -= scale * (
+                value * (r_n * width * width - (t_n - center)) - gauss * width / sqrt2
+            )
+            center_derivative[n_t, n_r] += scale * (r_n * value - gauss / (width * sqrt2))
+            width_derivative[n_t, n_r] += scale * (
+                r_n * r_n * width * value
+                - gauss * ((t_n - center) / (width * width) + r_n) / sqrt2
+            )
             if backsweep:
                 x1 = np.exp(-r_n * (t_n - center + backsweep_period))
                 x2 = np.exp(-r_n * ((backsweep_period / 2) - (t_n - center)))
                 x3 = np.exp(-r_n * backsweep_period)
                 matrix[n_t, n_r] += scale * (x1 + x2) / (1 - x3)
+                rate_derivative[n_t, n_r] -= scale * (
+                    (
+                        -(t_n - center + backsweep_period) * x1
+                        - (backsweep_period / 2 - (t_n - center)) * x2
+                    )
+                    / (1 - x3)
+                    - (x1 + x2) * backsweep_period * x3 / (1 - x3) ** 2
+                )
+                center_derivative[n_t, n_r] += scale * r_n * (x1 - x2) / (1 - x3)
+                period_derivative[n_t, n_r] += scale * (
+                    -r_n * (x1 + x2 / 2) / (1 - x3) - (x1 + x2) * r_n * x3 / (1 - x3) ** 2
+                )
 
 
-import ctypes  # noqa: E402
-
-# This is a work around to use scipy.special function with numba
-from numba.extending import get_cython_function_address  # noqa: E402
-
-_dble = ctypes.c_double
-
-functype = ctypes.CFUNCTYPE(_dble, _dble)
+@nb.jit(nopython=True, nogil=True, cache=True)
+def erf(x):
+    return math.erf(x)
 
-erf_addr = get_cython_function_address("scipy.special.cython_special", "__pyx_fuse_1erf")
-erfcx_addr = get_cython_function_address("scipy.special.cython_special", "__pyx_fuse_1erfcx")
 
-erf = functype(erf_addr)
-erfcx = functype(erfcx_addr)
+@nb.jit(nopython=True, nogil=True, cache=True)
+def erfcx(x):
+    """The scaled complementary error function exp(x**2) * erfc(x)."""
+    if x < 10:
+        return np.exp(x * x) * math.erfc(x)
+    # erfc underflows for large arguments, so the continued fraction of erfcx is used
+    fraction = x
+    for k in range(20, 0, -1):
+        fraction = x + 0.5 * k / fraction
+    return 1 / (sqrtpi * fraction)
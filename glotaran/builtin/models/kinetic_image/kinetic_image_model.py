@@ -6,6 +6,8 @@ from .irf import Irf
 from .k_matrix import KMatrix
 from .kinetic_image_dataset_descriptor import KineticImageDatasetDescriptor
 from .kinetic_image_matrix import kinetic_image_matrix
+from .kinetic_image_matrix import kinetic_image_matrix_block
+from .kinetic_image_matrix import kinetic_image_matrix_derivative
 from .kinetic_image_megacomplex import KineticImageMegacomplex
 from .kinetic_image_result import finalize_kinetic_image_result
 
@@ -20,6 +22,8 @@ from .kinetic_image_result import finalize_kinetic_image_result
     dataset_type=KineticImageDatasetDescriptor,
     megacomplex_type=KineticImageMegacomplex,
     matrix=kinetic_image_matrix,
+    matrix_derivative=kinetic_image_matrix_derivative,
+    matrix_block=kinetic_image_matrix_block,
     model_dimension="time",
     global_dimension="pixel",
     grouped=False,
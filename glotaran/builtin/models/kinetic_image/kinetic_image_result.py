@@ -51,14 +51,14 @@ def retrieve_species_assocatiated_data(model, dataset, dataset_descriptor, name)
     )
 
     if len(dataset.matrix.shape) == 3:
-        #  index dependent
+        #  index dependent, the matrix can be a lazy dask array which is kept lazy
         dataset["species_concentration"] = (
             (
                 model.global_dimension,
                 model.model_dimension,
                 "species",
             ),
-            dataset.matrix.sel(clp_label=compartments).values,
+            dataset.matrix.sel(clp_label=compartments).data,
         )
     else:
         #  index independent
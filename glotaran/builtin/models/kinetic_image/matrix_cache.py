@@ -0,0 +1,82 @@
+"""A least recently used cache for kinetic matrices."""
+
+import collections
+import threading
+import typing
+
+import numpy as np
+
+CacheInfo = collections.namedtuple("CacheInfo", "hits misses size current_size")
+
+
+class MatrixCache:
+    """A thread safe least recently used cache for matrices.
+
+    Matrices are stored and returned as copies, so that callers can modify them in place.
+
+    Parameters
+    ----------
+    size :
+        The maximum number of cached matrices. `0` disables the cache.
+    """
+
+    def __init__(self, size: int = 128):
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+        self._size = size
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def size(self) -> int:
+        """The maximum number of cached matrices. Setting it evicts surplus entries."""
+        return self._size
+
+    @size.setter
+    def size(self, size: int):
+        if size < 0:
+            raise ValueError("The size of the matrix cache must be non-negative.")
+        with self._lock:
+            self._size = size
+            self._evict()
+
+    def get(self, key: typing.Hashable) -> typing.Optional[typing.Tuple[typing.List, np.ndarray]]:
+        """Returns the cached labels and matrix for the key or `None`."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            labels, matrix = self._entries[key]
+        return list(labels), matrix.copy()
+
+    def put(self, key: typing.Hashable, labels: typing.List, matrix: np.ndarray):
+        """Caches the labels and matrix for the key."""
+        if self._size == 0:
+            return
+        entry = (list(labels), matrix.copy())
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+
+    def clear(self):
+        """Removes all entries and resets the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> CacheInfo:
+        """Returns the hit and miss counters and the size of the cache."""
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self._size, len(self._entries))
+
+    def _evict(self):
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+
+kinetic_matrix_cache = MatrixCache()
+"""The cache of the kinetic matrices of the K-matrices, shared by all kinetic models."""
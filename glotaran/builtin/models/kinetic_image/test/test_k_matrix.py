@@ -210,6 +210,8 @@ def test_matrix_non_unibranch(matrix):
     vals, vec = mat.eigen(matrix.compartments)
     assert np.allclose(vals, matrix.wanted_eigen_vals)
     assert np.allclose(vec, matrix.wanted_eigen_vec)
+    # the compiled kernels are cached for contiguous rates only
+    assert mat.rates(con).flags.c_contiguous
 
     print(mat._gamma(vec, con))
     assert np.allclose(mat._gamma(vec, con), matrix.wanted_gamma)
@@ -0,0 +1,129 @@
+import copy
+
+import numpy as np
+import pytest
+
+from glotaran.builtin.models.kinetic_image import KineticImageModel
+from glotaran.parameter import ParameterGroup
+
+
+def assert_matrix_derivative(model, parameter, axis, index=None):
+    def calculate(parameter):
+        dataset = model.dataset["dataset1"].fill(model, parameter)
+        return model.matrix_derivative(dataset_descriptor=dataset, axis=axis, index=index)
+
+    dataset = model.dataset["dataset1"].fill(model, parameter)
+    wanted_clp_label, wanted_matrix = model.matrix(
+        dataset_descriptor=dataset, axis=axis, index=index
+    )
+    clp_label, matrix, derivatives = calculate(parameter)
+    assert clp_label == wanted_clp_label
+    assert np.allclose(matrix, wanted_matrix)
+
+    labels = [label for label, p in parameter.all(separator=".") if p.vary]
+    assert sorted(derivatives) == sorted(labels)
+
+    step = 1e-6
+    for label, derivative in derivatives.items():
+        plus = copy.deepcopy(parameter)
+        plus.get(label).value += step
+        minus = copy.deepcopy(parameter)
+        minus.get(label).value -= step
+        wanted = (calculate(plus)[1] - calculate(minus)[1]) / (2 * step)
+        assert np.allclose(derivative, wanted, atol=1e-6 * np.abs(wanted).max())
+
+
+class SequentialMultiGaussianIrfBacksweep:
+    model = KineticImageModel.from_dict(
+        {
+            "initial_concentration": {
+                "j1": {"compartments": ["s1", "s2", "s3"], "parameters": ["j.1", "j.0", "j.0"]},
+            },
+            "megacomplex": {
+                "mc1": {"k_matrix": ["k1"]},
+            },
+            "k_matrix": {
+                "k1": {
+                    "matrix": {
+                        ("s2", "s1"): "kinetic.1",
+                        ("s3", "s2"): "kinetic.2",
+                        ("s3", "s3"): "kinetic.3",
+                    }
+                }
+            },
+            "irf": {
+                "irf1": {
+                    "type": "multi-gaussian",
+                    "center": ["irf.center"],
+                    "width": ["irf.width1", "irf.width2"],
+                    "scale": ["irf.scale1", "irf.scale2"],
+                    "backsweep": True,
+                    "backsweep_period": "irf.backsweep",
+                },
+            },
+            "dataset": {
+                "dataset1": {
+                    "initial_concentration": "j1",
+                    "irf": "irf1",
+                    "megacomplex": ["mc1"],
+                },
+            },
+        }
+    )
+    parameter = ParameterGroup.from_dict(
+        {
+            "j": [
+                ["1", 1, {"vary": False, "non-negative": False}],
+                ["0", 0, {"vary": False, "non-negative": False}],
+            ],
+            "kinetic": [["1", 0.5], ["2", 0.3], ["3", 0.1]],
+            "irf": [
+                ["center", 0.3],
+                ["width1", 0.1],
+                ["width2", 0.4],
+                ["scale1", 1, {"vary": False}],
+                ["scale2", 0.5, {"vary": False}],
+                ["backsweep", 100],
+            ],
+        }
+    )
+
+
+class BranchedNoIrfBaseline:
+    model = KineticImageModel.from_dict(
+        {
+            "initial_concentration": {
+                "j1": {"compartments": ["s1", "s2"], "parameters": ["j.1", "j.1"]},
+            },
+            "megacomplex": {
+                "mc1": {"k_matrix": ["k1"]},
+            },
+            "k_matrix": {
+                "k1": {
+                    "matrix": {
+                        ("s2", "s1"): "kinetic.1",
+                        ("s1", "s2"): "kinetic.2",
+                        ("s2", "s2"): "kinetic.3",
+                    }
+                }
+            },
+            "dataset": {
+                "dataset1": {
+                    "initial_concentration": "j1",
+                    "megacomplex": ["mc1"],
+                    "baseline": True,
+                },
+            },
+        }
+    )
+    parameter = ParameterGroup.from_dict(
+        {
+            "j": [["1", 1, {"vary": False, "non-negative": False}]],
+            "kinetic": [["1", 0.5], ["2", 0.3], ["3", 0.1]],
+        }
+    )
+
+
+@pytest.mark.parametrize("suite", [SequentialMultiGaussianIrfBacksweep, BranchedNoIrfBaseline])
+def test_kinetic_image_matrix_derivative(suite):
+    assert_matrix_derivative(suite.model, suite.parameter, np.linspace(-1, 20, 200))
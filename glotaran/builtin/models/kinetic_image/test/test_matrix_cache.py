@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from glotaran.builtin.models.kinetic_image import KineticImageModel
+from glotaran.builtin.models.kinetic_image import kinetic_matrix_cache
+from glotaran.builtin.models.kinetic_image.matrix_cache import MatrixCache
+from glotaran.parameter import ParameterGroup
+
+
+def test_matrix_cache():
+    cache = MatrixCache(size=2)
+
+    assert cache.get("a") is None
+    cache.put("a", ["s1"], np.ones((3, 1)))
+    cache.put("b", ["s2"], np.zeros((3, 1)))
+
+    labels, matrix = cache.get("a")
+    assert labels == ["s1"]
+    assert np.array_equal(matrix, np.ones((3, 1)))
+
+    # the returned matrix is a copy
+    matrix[0, 0] = 5
+    assert cache.get("a")[1][0, 0] == 1
+
+    # "b" is the least recently used entry
+    cache.put("c", ["s3"], np.zeros((3, 1)))
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+
+    assert cache.info() == (3, 2, 2, 2)
+
+    cache.size = 1
+    assert cache.info().current_size == 1
+    assert cache.get("c") is not None
+
+    with pytest.raises(ValueError):
+        cache.size = -1
+
+    cache.clear()
+    assert cache.info() == (0, 0, 1, 0)
+
+    cache.size = 0
+    cache.put("a", ["s1"], np.ones((3, 1)))
+    assert cache.get("a") is None
+
+
+def test_kinetic_matrix_cache():
+    model = KineticImageModel.from_dict(
+        {
+            "initial_concentration": {
+                "j1": {"compartments": ["s1", "s2"], "parameters": ["j.1", "j.0"]},
+            },
+            "megacomplex": {
+                "mc1": {"k_matrix": ["k1"]},
+            },
+            "k_matrix": {
+                "k1": {
+                    "matrix": {
+                        ("s2", "s1"): "kinetic.1",
+                        ("s2", "s2"): "kinetic.2",
+                    }
+                }
+            },
+            "irf": {
+                "irf1": {
+                    "type": "multi-gaussian",
+                    "center": ["irf.center"],
+                    "width": ["irf.width"],
+                },
+            },
+            "dataset": {
+                "dataset1": {
+                    "initial_concentration": "j1",
+                    "irf": "irf1",
+                    "megacomplex": ["mc1"],
+                },
+            },
+        }
+    )
+    parameter = ParameterGroup.from_dict(
+        {
+            "j": [["1", 1, {"vary": False}], ["0", 0, {"vary": False}]],
+            "kinetic": [["1", 0.5], ["2", 0.3]],
+            "irf": [["center", 0.3], ["width", 0.1]],
+        }
+    )
+    axis = np.linspace(-1, 10, 50)
+
+    def calculate(parameter, index=0):
+        dataset = model.dataset["dataset1"].fill(model, parameter)
+        return model.matrix(dataset_descriptor=dataset, axis=axis, index=index)
+
+    kinetic_matrix_cache.clear()
+
+    clp_label, matrix = calculate(parameter)
+    assert kinetic_matrix_cache.info()[:2] == (0, 1)
+
+    # the irf does not depend on the index
+    cached_clp_label, cached_matrix = calculate(parameter, index=1)
+    assert kinetic_matrix_cache.info()[:2] == (1, 1)
+    assert cached_clp_label == clp_label
+    assert np.array_equal(cached_matrix, matrix)
+
+    parameter.get("kinetic.1").value = 0.6
+    changed_matrix = calculate(parameter)[1]
+    assert kinetic_matrix_cache.info()[:2] == (1, 2)
+    assert not np.allclose(changed_matrix, matrix)
+
+    parameter.get("irf.width").value = 0.2
+    calculate(parameter)
+    assert kinetic_matrix_cache.info()[:2] == (1, 3)
+
+    kinetic_matrix_cache.clear()
@@ -3,6 +3,8 @@
 import numpy as np
 
 from glotaran.builtin.models.kinetic_image.kinetic_image_matrix import kinetic_image_matrix
+from glotaran.builtin.models.kinetic_image.kinetic_image_matrix import kinetic_matrix_block
+from glotaran.builtin.models.kinetic_image.kinetic_image_matrix import kinetic_matrix_derivative
 
 from .spectral_irf import IrfGaussianCoherentArtifact
 
@@ -23,3 +25,51 @@ def kinetic_spectrum_matrix(dataset_descriptor=None, axis=None, index=None, irf=
             matrix = np.concatenate((matrix, irf_matrix), axis=1)
 
     return (clp_label, matrix)
+
+
+def kinetic_spectrum_matrix_block(dataset_descriptor=None, axis=None, indices=None, irf=None):
+
+    clp_label, matrix = kinetic_matrix_block(dataset_descriptor, axis, indices)
+
+    if isinstance(dataset_descriptor.irf, IrfGaussianCoherentArtifact):
+        irf_clp_label, irf_matrix = dataset_descriptor.irf.calculate_coherent_artifact(axis)
+        irf_matrix = np.repeat(irf_matrix[np.newaxis], len(indices), axis=0)
+        if matrix is None:
+            clp_label = irf_clp_label
+            matrix = irf_matrix
+        else:
+            clp_label += irf_clp_label
+            matrix = np.concatenate((matrix, irf_matrix), axis=2)
+
+    return (clp_label, matrix)
+
+
+def kinetic_spectrum_matrix_derivative(dataset_descriptor=None, axis=None, index=None, irf=None):
+
+    clp_label, matrix, derivatives = kinetic_matrix_derivative(dataset_descriptor, axis, index)
+
+    if isinstance(dataset_descriptor.irf, IrfGaussianCoherentArtifact):
+        (
+            irf_clp_label,
+            irf_matrix,
+            irf_derivatives,
+        ) = dataset_descriptor.irf.calculate_coherent_artifact_derivatives(axis)
+        if matrix is None:
+            clp_label = irf_clp_label
+            matrix = irf_matrix
+            derivatives = irf_derivatives
+        else:
+            derivatives = {
+                label: np.concatenate(
+                    (
+                        derivatives.get(label, np.zeros_like(matrix)),
+                        irf_derivatives.get(label, np.zeros_like(irf_matrix)),
+                    ),
+                    axis=1,
+                )
+                for label in list(derivatives) + list(irf_derivatives)
+            }
+            clp_label += irf_clp_label
+            matrix = np.concatenate((matrix, irf_matrix), axis=1)
+
+    return (clp_label, matrix, derivatives)
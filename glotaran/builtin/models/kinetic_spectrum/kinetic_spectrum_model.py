@@ -9,6 +9,8 @@ from glotaran.parameter import ParameterGroup
 
 from .kinetic_spectrum_dataset_descriptor import KineticSpectrumDatasetDescriptor
 from .kinetic_spectrum_matrix import kinetic_spectrum_matrix
+from .kinetic_spectrum_matrix import kinetic_spectrum_matrix_block
+from .kinetic_spectrum_matrix import kinetic_spectrum_matrix_derivative
 from .kinetic_spectrum_result import finalize_kinetic_spectrum_result
 from .spectral_constraints import SpectralConstraint
 from .spectral_constraints import apply_spectral_constraints
@@ -72,6 +74,8 @@ def grouped(model: T_KineticSpectrumModel):
     dataset_type=KineticSpectrumDatasetDescriptor,
     megacomplex_type=KineticImageMegacomplex,
     matrix=kinetic_spectrum_matrix,
+    matrix_block=kinetic_spectrum_matrix_block,
+    matrix_derivative=kinetic_spectrum_matrix_derivative,
     model_dimension="time",
     global_matrix=spectral_matrix,
     global_dimension="spectral",
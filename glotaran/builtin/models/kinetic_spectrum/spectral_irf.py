@@ -70,6 +70,33 @@ class IrfSpectralMultiGaussian(IrfMultiGaussian):
 
         return centers, widths, scale, backsweep, backsweep_period
 
+    def parameter_derivatives(self, index):
+        derivatives = super().parameter_derivatives(index)
+        if len(self.center_dispersion) == 0 and len(self.width_dispersion) == 0:
+            return derivatives
+
+        size = len(next(iter(derivatives.values()))[0])
+        if self.model_dispersion_with_wavenumber:
+            dist = 1e3 / index - 1e3 / self.dispersion_center
+            dist_derivative = 1e3 / self.dispersion_center ** 2
+        else:
+            dist = (index - self.dispersion_center) / 100
+            dist_derivative = -1 / 100
+
+        for j, dispersion in enumerate([self.center_dispersion, self.width_dispersion]):
+            for i, disp in enumerate(dispersion):
+                for label, derivative in [
+                    (disp.full_label, np.power(dist, i + 1)),
+                    (
+                        self.dispersion_center.full_label,
+                        disp * (i + 1) * np.power(dist, i) * dist_derivative,
+                    ),
+                ]:
+                    if label not in derivatives:
+                        derivatives[label] = (np.zeros(size), np.zeros(size))
+                    derivatives[label][j][:] += derivative
+        return derivatives
+
     def calculate_dispersion(self, axis):
         dispersion = []
         for index in axis:
@@ -121,8 +148,52 @@ class IrfGaussianCoherentArtifact(IrfSpectralGaussian):
 
         return clp_label, matrix
 
+    def calculate_coherent_artifact_derivatives(self, axis):
+        clp_label, matrix = self.calculate_coherent_artifact(axis)
+
+        center, width, _, _, _ = self.parameter(None)
+        center = center[0]
+        width_parameter = (
+            self.coherent_artifact_width
+            if self.coherent_artifact_width is not None
+            else self.width[0]
+            if isinstance(self.width, list)
+            else self.width
+        )
+        width = width_parameter.value
+        center_parameter = self.center[0] if isinstance(self.center, list) else self.center
+
+        shift = center - axis
+        gauss = matrix[:, 0]
+        center_derivative = np.zeros_like(matrix)
+        width_derivative = np.zeros_like(matrix)
+        center_derivative[:, 0] = -gauss * shift / width ** 2
+        width_derivative[:, 0] = gauss * shift ** 2 / width ** 3
+        if self.coherent_artifact_order > 1:
+            center_derivative[:, 1] = (
+                center_derivative[:, 0] * shift / width ** 2 + gauss / width ** 2
+            )
+            width_derivative[:, 1] = (
+                width_derivative[:, 0] * shift / width ** 2 - 2 * gauss * shift / width ** 3
+            )
+        if self.coherent_artifact_order > 2:
+            polynomial = (shift ** 2 - width ** 2) / width ** 4
+            center_derivative[:, 2] = (
+                center_derivative[:, 0] * polynomial + 2 * gauss * shift / width ** 4
+            )
+            width_derivative[:, 2] = width_derivative[:, 0] * polynomial + gauss * (
+                -2 / width ** 3 - 4 * polynomial / width
+            )
+
+        derivatives = {center_parameter.full_label: center_derivative}
+        if width_parameter.full_label in derivatives:
+            derivatives[width_parameter.full_label] += width_derivative
+        else:
+            derivatives[width_parameter.full_label] = width_derivative
+        return clp_label, matrix, derivatives
+
     @staticmethod
-    @nb.jit(nopython=True, parallel=True)
+    @nb.jit(nopython=True, parallel=True, cache=True)
     def _calculate_coherent_artifact_matrix(center, width, axis, order):
         matrix = np.zeros((axis.size, order), dtype=np.float64)
 
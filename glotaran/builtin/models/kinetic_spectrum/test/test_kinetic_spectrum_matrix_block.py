@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from glotaran.builtin.models.kinetic_spectrum import KineticSpectrumModel
+from glotaran.parameter import ParameterGroup
+
+from .test_kinetic_spectrum_matrix_derivative import CoherentArtifact
+from .test_kinetic_spectrum_matrix_derivative import IrfDispersion
+
+
+class MultiGaussianIrfDispersionBacksweep:
+    irf = {
+        "type": "spectral-multi-gaussian",
+        "center": ["irf.center1", "irf.center2"],
+        "width": ["irf.width1", "irf.width2"],
+        "scale": ["irf.scale1", "irf.scale2"],
+        "backsweep": True,
+        "backsweep_period": "irf.backsweep",
+        "dispersion_center": "irf.dispersion_center",
+        "center_dispersion": ["irf.center_dispersion"],
+        "model_dispersion_with_wavenumber": True,
+    }
+    irf_parameter = [
+        ["center1", 0.3],
+        ["center2", 0.5],
+        ["width1", 0.1],
+        ["width2", 0.4],
+        ["scale1", 1],
+        ["scale2", 0.5],
+        ["backsweep", 13000],
+        ["dispersion_center", 500],
+        ["center_dispersion", 0.2],
+    ]
+
+
+class IrfBaseline:
+    irf = {"type": "spectral-gaussian", "center": "irf.center", "width": "irf.width"}
+    irf_parameter = [["center", 0.3], ["width", 0.1]]
+    baseline = True
+
+
+@pytest.mark.parametrize(
+    "suite", [IrfDispersion, MultiGaussianIrfDispersionBacksweep, CoherentArtifact, IrfBaseline]
+)
+def test_kinetic_spectrum_matrix_block(suite):
+    model = KineticSpectrumModel.from_dict(
+        {
+            "initial_concentration": {
+                "j1": {"compartments": ["s1", "s2", "s3"], "parameters": ["j.1", "j.0", "j.0"]},
+            },
+            "megacomplex": {
+                "mc1": {"k_matrix": ["k1"]},
+                "mc2": {"k_matrix": ["k2"]},
+            },
+            "k_matrix": {
+                "k1": {
+                    "matrix": {
+                        ("s2", "s1"): "kinetic.1",
+                        ("s2", "s2"): "kinetic.2",
+                    }
+                },
+                "k2": {"matrix": {("s3", "s3"): "kinetic.3"}},
+            },
+            "irf": {"irf1": suite.irf},
+            "dataset": {
+                "dataset1": {
+                    "initial_concentration": "j1",
+                    "irf": "irf1",
+                    "megacomplex": ["mc1", "mc2"],
+                    "baseline": getattr(suite, "baseline", False),
+                },
+            },
+        }
+    )
+    parameter = ParameterGroup.from_dict(
+        {
+            "j": [
+                ["1", 1, {"vary": False, "non-negative": False}],
+                ["0", 0, {"vary": False, "non-negative": False}],
+            ],
+            "kinetic": [["1", 0.5], ["2", 0.3], ["3", 0.01]],
+            "irf": suite.irf_parameter,
+        }
+    )
+    axis = np.linspace(-1, 20, 200)
+    indices = np.asarray([480, 500, 520, 540])
+
+    dataset = model.dataset["dataset1"].fill(model, parameter)
+    clp_label, block = model.matrix_block(dataset_descriptor=dataset, axis=axis, indices=indices)
+    assert block.shape == (indices.size, axis.size, len(clp_label))
+
+    for index, matrix in zip(indices, block):
+        wanted_clp_label, wanted_matrix = model.matrix(
+            dataset_descriptor=dataset, axis=axis, index=index
+        )
+        assert clp_label == wanted_clp_label
+        assert np.allclose(matrix, wanted_matrix)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from glotaran.builtin.models.kinetic_image.test.test_kinetic_image_matrix_derivative import (
+    assert_matrix_derivative,
+)
+from glotaran.builtin.models.kinetic_spectrum import KineticSpectrumModel
+from glotaran.parameter import ParameterGroup
+
+
+class IrfDispersion:
+    irf = {
+        "type": "spectral-gaussian",
+        "center": "irf.center",
+        "width": "irf.width",
+        "dispersion_center": "irf.dispersion_center",
+        "center_dispersion": ["irf.center_dispersion1", "irf.center_dispersion2"],
+        "width_dispersion": ["irf.width_dispersion"],
+    }
+    irf_parameter = [
+        ["center", 0.3],
+        ["width", 0.1],
+        ["dispersion_center", 500],
+        ["center_dispersion1", 0.2],
+        ["center_dispersion2", 0.05],
+        ["width_dispersion", 0.02],
+    ]
+    index = 520
+
+
+class CoherentArtifact:
+    irf = {
+        "type": "gaussian-coherent-artifact",
+        "center": "irf.center",
+        "width": "irf.width",
+        "coherent_artifact_order": 3,
+    }
+    irf_parameter = [["center", 0.3], ["width", 0.1]]
+    index = None
+
+
+@pytest.mark.parametrize("suite", [IrfDispersion, CoherentArtifact])
+def test_kinetic_spectrum_matrix_derivative(suite):
+    model = KineticSpectrumModel.from_dict(
+        {
+            "initial_concentration": {
+                "j1": {"compartments": ["s1", "s2"], "parameters": ["j.1", "j.0"]},
+            },
+            "megacomplex": {
+                "mc1": {"k_matrix": ["k1"]},
+            },
+            "k_matrix": {
+                "k1": {
+                    "matrix": {
+                        ("s2", "s1"): "kinetic.1",
+                        ("s2", "s2"): "kinetic.2",
+                    }
+                }
+            },
+            "irf": {"irf1": suite.irf},
+            "dataset": {
+                "dataset1": {
+                    "initial_concentration": "j1",
+                    "irf": "irf1",
+                    "megacomplex": ["mc1"],
+                },
+            },
+        }
+    )
+    parameter = ParameterGroup.from_dict(
+        {
+            "j": [
+                ["1", 1, {"vary": False, "non-negative": False}],
+                ["0", 0, {"vary": False, "non-negative": False}],
+            ],
+            "kinetic": [["1", 0.5], ["2", 0.3]],
+            "irf": suite.irf_parameter,
+        }
+    )
+    assert_matrix_derivative(model, parameter, np.linspace(-1, 20, 200), index=suite.index)
@@ -12,7 +12,7 @@ from . import util
     "--dataformat",
     "-dfmt",
     default=None,
-    type=click.Choice(gta.io.reader.known_reading_formats.keys()),
+    type=util.LazyChoice(util.known_reading_formats),
     help="The input format of the data. Will be inferred from extension if not set.",
 )
 @click.option(
@@ -1,11 +1,15 @@
 import click
 
-from glotaran.io.reader import known_reading_formats
-from glotaran.parse.register import known_model_names
+from glotaran.plugins import load_plugins
 
 
 def plugin_list_cmd():
     """Prints a list of intalled plugins."""
+    # the registries import the numerical libraries, which are not needed to start the cli
+    from glotaran.io.reader import known_reading_formats
+    from glotaran.parse.register import known_model_names
+
+    load_plugins()
 
     output = """
 Installed Glotaran Plugins:
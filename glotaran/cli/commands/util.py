@@ -5,6 +5,37 @@ from click import echo
 from click import prompt
 
 import glotaran as gta
+from glotaran.plugins import load_plugins
+
+
+class LazyChoice(click.Choice):
+    """A choice of values which are looked up on the first use of the option.
+
+    The file formats of the plugins are only known after the plugins are loaded, which imports
+    the numerical libraries and should not be done to start the cli.
+    """
+
+    def __init__(self, get_choices, case_sensitive=True):
+        self._get_choices = get_choices
+        self._choices = None
+        super().__init__([], case_sensitive=case_sensitive)
+
+    @property
+    def choices(self):
+        if self._choices is None:
+            self._choices = list(self._get_choices())
+        return self._choices
+
+    @choices.setter
+    def choices(self, choices):
+        # the choices passed by click.Choice.__init__ are replaced by the looked up ones
+        pass
+
+
+def known_reading_formats():
+    """Returns the names of the file formats of glotaran and the installed plugins."""
+    load_plugins()
+    return gta.io.reader.known_reading_formats.keys()
 
 
 def signature_analysis(cmd):
@@ -2,12 +2,14 @@ import typing
 
 import numpy as np
 import xarray as xr
+from scipy.sparse.linalg import svds
 
 
 def prepare_time_trace_dataset(
     dataset: typing.Union[xr.DataArray, xr.Dataset],
     weight: np.ndarray = None,
     irf: typing.Union[np.ndarray, xr.DataArray] = None,
+    svd_rank: typing.Optional[int] = 10,
 ) -> xr.Dataset:
     """Prepares a time trace for global analysis.
 
@@ -19,13 +21,16 @@ def prepare_time_trace_dataset(
         A weight for the dataset.
     irf :
         An IRF for the dataset.
+    svd_rank :
+        The number of singular vectors of the data to calculate, see :func:`calculate_svd`.
+        `None` for the full singular value decomposition.
     """
 
     if isinstance(dataset, xr.DataArray):
         dataset = dataset.to_dataset(name="data")
 
     if "data_singular_values" not in dataset:
-        l, s, r = np.linalg.svd(dataset.data)
+        l, s, r = calculate_svd(dataset.data.values, svd_rank)
         dataset["data_left_singular_vectors"] = (("time", "left_singular_value_index"), l)
         dataset["data_singular_values"] = (("singular_value_index"), s)
         dataset["data_right_singular_vectors"] = (("right_singular_value_index", "spectral"), r)
@@ -43,3 +48,38 @@ def prepare_time_trace_dataset(
             dataset["irf"] = irf
 
     return dataset
+
+
+def calculate_svd(
+    data: np.ndarray, rank: typing.Optional[int] = None
+) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Calculates the singular value decomposition of a matrix.
+
+    If a rank is given, only the leading singular values and vectors are calculated with the
+    Lanczos method of ARPACK, see :func:`scipy.sparse.linalg.svds`. The left and right singular
+    vectors then have the shapes `(rows, rank)` and `(rank, columns)`. Otherwise the full
+    decomposition with square bases is calculated with :func:`numpy.linalg.svd`.
+
+    Parameters
+    ----------
+    data :
+        The 2-dimensional matrix to decompose.
+    rank :
+        The number of singular values and vectors to calculate. `None` for all.
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if rank is None:
+        return np.linalg.svd(data)
+
+    rank = min(rank, *data.shape)
+    # the Lanczos method is only faster for a small part of the singular values
+    if 2 * rank >= min(data.shape):
+        l, s, r = np.linalg.svd(data, full_matrices=False)
+        return l[:, :rank], s[:rank], r[:rank]
+
+    # the start vector is fixed, so that the decomposition of the same data is always the same
+    start = np.random.default_rng(0).uniform(-1, 1, min(data.shape))
+    l, s, r = svds(data, k=rank, v0=start)
+    # the singular values are not returned in descending order
+    order = np.argsort(s)[::-1]
+    return l[:, order], s[order], r[order]
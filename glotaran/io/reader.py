@@ -2,10 +2,13 @@ import pathlib
 
 import xarray as xr
 
+from glotaran.plugins import load_plugins
+
 known_reading_formats = {}
 
 
 def read_data_file(filename: str, fmt: str = None) -> xr.Dataset:
+    load_plugins()
     path = pathlib.Path(filename)
 
     if fmt is None:
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import xarray as xr
+
+from glotaran.io.prepare_dataset import calculate_svd
+from glotaran.io.prepare_dataset import prepare_time_trace_dataset
+
+
+@pytest.mark.parametrize("shape", [(400, 100), (100, 400)])
+def test_truncated_svd(shape):
+    rng = np.random.default_rng(42)
+    data = rng.random((shape[0], 4)) @ rng.random((4, shape[1]))
+    data += rng.normal(scale=1e-3, size=shape)
+
+    wanted_l, wanted_s, wanted_r = np.linalg.svd(data)
+    l, s, r = calculate_svd(data, 5)
+    assert l.shape == (shape[0], 5)
+    assert s.shape == (5,)
+    assert r.shape == (5, shape[1])
+    assert np.allclose(s, wanted_s[:5], rtol=1e-10)
+    # the singular vectors are unique up to their sign
+    assert np.allclose(np.abs(l[:, :4]), np.abs(wanted_l[:, :4]), atol=1e-6)
+    assert np.allclose(np.abs(r[:4]), np.abs(wanted_r[:4]), atol=1e-6)
+
+    l, s, r = calculate_svd(data)
+    assert l.shape == (shape[0], shape[0])
+    assert r.shape == (shape[1], shape[1])
+    assert np.allclose(s, wanted_s)
+
+
+def test_truncated_svd_of_noise():
+    # the residual of a good fit is mostly noise with slowly decaying singular values
+    data = np.random.default_rng(42).standard_normal((1000, 300))
+
+    wanted_l, wanted_s, wanted_r = np.linalg.svd(data, full_matrices=False)
+    l, s, r = calculate_svd(data, 10)
+    assert np.allclose(s, wanted_s[:10], rtol=1e-10)
+    assert np.allclose(np.abs(np.sum(l * wanted_l[:, :10], axis=0)), 1)
+    assert np.allclose(np.abs(np.sum(r * wanted_r[:10], axis=1)), 1)
+
+
+def test_prepare_time_trace_dataset_svd_rank():
+    data = xr.DataArray(
+        np.random.default_rng(42).random((50, 20)),
+        coords=[("time", np.arange(50)), ("spectral", np.arange(20))],
+    )
+
+    dataset = prepare_time_trace_dataset(data, svd_rank=3)
+    assert dataset.data_left_singular_vectors.shape == (50, 3)
+    assert dataset.data_singular_values.shape == (3,)
+    assert dataset.data_right_singular_vectors.shape == (3, 20)
+
+    dataset = prepare_time_trace_dataset(data, svd_rank=None)
+    assert dataset.data_left_singular_vectors.shape == (50, 50)
+    assert dataset.data_right_singular_vectors.shape == (20, 20)
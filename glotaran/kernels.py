@@ -0,0 +1,72 @@
+"""Compilation of the numba kernels of glotaran and its builtin models.
+
+The kernels are compiled on their first call and cached on disk next to their modules, or in
+the directory given by the environment variable ``NUMBA_CACHE_DIR`` if the installation is not
+writable. Only the first process after an installation or update compiles a kernel, every later
+process loads it from the cache.
+
+:func:`warmup` loads or compiles all kernels at once, e.g. when a worker process is started,
+instead of on the first evaluation of a model.
+"""
+import numpy as np
+
+
+def warmup():
+    """Loads or compiles the numba kernels of glotaran and its builtin models.
+
+    Every kernel is called once with small inputs of the types used by the models.
+    """
+    from glotaran.analysis.variable_projection import residual_variable_projection_stacked
+    from glotaran.builtin.models.doas import doas_matrix
+    from glotaran.builtin.models.kinetic_image import kinetic_image_matrix
+    from glotaran.builtin.models.kinetic_spectrum.spectral_irf import IrfGaussianCoherentArtifact
+
+    axis = np.linspace(-1, 1, 4)
+    rates = np.asarray([0.5, 1.0])
+    centers = np.zeros(1)
+    widths = np.ones(1)
+    scales = np.ones(1)
+
+    def matrix():
+        return np.zeros((axis.size, rates.size))
+
+    residual_variable_projection_stacked(np.ones((1, axis.size, 1)), np.ones((1, axis.size)))
+
+    kinetic_image_matrix.calculate_kinetic_matrix_no_irf(matrix(), rates, axis)
+    # the backsweep period is 0 without a backsweep
+    for backsweep, backsweep_period in [(False, 0), (True, 1.0)]:
+        kinetic_image_matrix.calculate_kinetic_matrix_gaussian_irf(
+            matrix(), rates, axis, centers, widths, scales, backsweep, backsweep_period
+        )
+        kinetic_image_matrix.calculate_kinetic_matrix_gaussian_irf_block(
+            matrix()[np.newaxis],
+            rates,
+            axis,
+            centers[np.newaxis],
+            widths[np.newaxis],
+            scales,
+            backsweep,
+            backsweep_period,
+        )
+        kinetic_image_matrix.calculate_kinetic_matrix_gaussian_irf_derivatives(
+            matrix(),
+            matrix(),
+            matrix(),
+            matrix(),
+            matrix(),
+            rates,
+            axis,
+            centers[0],
+            widths[0],
+            float(scales[0]),
+            backsweep,
+            backsweep_period,
+        )
+
+    IrfGaussianCoherentArtifact._calculate_coherent_artifact_matrix(
+        centers[0], float(widths[0]), axis, 3
+    )
+    doas_matrix.calculate_doas_matrix_no_irf(matrix(), rates[:1], rates[:1], axis)
+    doas_matrix.calculate_doas_matrix_gaussian_irf(
+        matrix(), rates[:1], rates[:1], axis, centers, widths, scales
+    )
@@ -4,12 +4,17 @@ This package contains the Glotaran's base model object, the model decorators and
 common model items.
 """
 
+from . import bound_item
 from . import dataset_descriptor
 from . import model
 from . import model_attribute
 from . import model_decorator
 from . import weight
 
+# Bound Item
+
+BoundItem = bound_item.BoundItem
+
 # Dataset
 
 DatasetDescriptor = dataset_descriptor.DatasetDescriptor
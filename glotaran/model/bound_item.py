@@ -0,0 +1,52 @@
+"""The bound item class."""
+
+import typing
+
+import glotaran
+from glotaran.parameter import ParameterGroup
+
+
+class BoundItem:
+    """A model item which is resolved once and filled without copies.
+
+    Binding creates a copy of the item in which all references to other model items are
+    replaced by bound copies of those items. Filling the bound item only sets the values of its
+    parameter from a parameter group and returns the same item every time, instead of copying the
+    whole item tree like :meth:`fill` of a model item does.
+
+    Notes
+    -----
+
+    The returned item is shared between fills and is only valid until the next fill. A bound item
+    must not be filled by several threads at the same time.
+    """
+
+    def __init__(self, item: typing.Any, model: "glotaran.model.Model"):
+        """
+
+        Parameters
+        ----------
+        item :
+            A model item, e.g. a :class:`glotaran.model.DatasetDescriptor`.
+        model :
+            The model of the item.
+        """
+        self._parameter_slots = []
+        self._item = item.bind(model, self._parameter_slots)
+
+    @property
+    def item(self) -> typing.Any:
+        """The bound item."""
+        return self._item
+
+    def fill(self, parameter: ParameterGroup) -> typing.Any:
+        """Sets the parameter of the bound item from the parameter group and returns the item.
+
+        Parameters
+        ----------
+        parameter :
+            The parameter group to fill from.
+        """
+        for slot in self._parameter_slots:
+            slot.set_from_group(parameter)
+        return self._item
@@ -8,12 +8,11 @@ import typing
 import numpy as np
 import xarray as xr
 
-from glotaran.analysis.optimize import optimize
-from glotaran.analysis.result import Result
-from glotaran.analysis.scheme import Scheme
-from glotaran.analysis.simulation import simulate
 from glotaran.parameter import ParameterGroup
 
+if typing.TYPE_CHECKING:
+    from glotaran.analysis.result import Result
+
 
 class Model:
     """A base class for global analysis models."""
@@ -158,6 +157,9 @@ class Model:
         noise_seed :
             Seed for the noise.
         """
+        # the analysis package imports the model package
+        from glotaran.analysis.simulation import simulate
+
         return simulate(
             self,
             dataset,
@@ -177,8 +179,9 @@ class Model:
         verbose: bool = True,
         max_nfev: int = None,
         group_tolerance: int = 0,
+        jacobian_workers: int = None,
         client=None,
-    ) -> Result:
+    ) -> "Result":
         """Optimizes the parameter for this model.
 
         Parameters
@@ -195,7 +198,15 @@ class Model:
             Maximum number of function evaluations. `None` for unlimited.
         group_tolerance :
             The tolerance for grouping datasets along the global dimension.
+        jacobian_workers :
+            The number of processes evaluating finite difference columns of the Jacobian
+            concurrently. `None` evaluates them in the optimizing process.
+        client :
+            A dask distributed client to evaluate finite difference columns of the Jacobian on.
         """
+        from glotaran.analysis.optimize import optimize
+        from glotaran.analysis.scheme import Scheme
+
         scheme = Scheme(
             model=self,
             parameter=parameter,
@@ -203,6 +214,7 @@ class Model:
             nnls=nnls,
             group_tolerance=group_tolerance,
             nfev=max_nfev,
+            jacobian_workers=jacobian_workers,
         )
         result = optimize(scheme, verbose=verbose, client=client)
         return result
@@ -213,7 +225,7 @@ class Model:
         data: typing.Dict[str, typing.Union[xr.DataArray, xr.Dataset]],
         nnls: bool = False,
         group_atol: float = 0.0,
-    ) -> Result:
+    ) -> "Result":
         """Loads a result from parameters without optimization.
 
         Parameters
@@ -228,6 +240,8 @@ class Model:
             The tolerance for grouping datasets along the global axes.
 
         """
+        from glotaran.analysis.result import Result
+
         return Result.from_parameter(self, data, parameter, nnls, group_atol)
 
     def problem_list(self, parameter: ParameterGroup = None) -> typing.List[str]:
@@ -104,6 +104,9 @@ def model_attribute(
         fill = _create_fill_func(cls)
         setattr(cls, "fill", fill)
 
+        bind = _create_bind_func(cls)
+        setattr(cls, "bind", bind)
+
         mprint = _create_mprint_func(cls)
         setattr(cls, "mprint", mprint)
 
@@ -262,6 +265,40 @@ def _create_fill_func(cls):
     return fill
 
 
+def _create_bind_func(cls):
+    @wrap_func_as_method(cls)
+    def bind(
+        self, model: "glotaran.model.BaseModel", parameter_slots: typing.List[Parameter]
+    ) -> cls:
+        """Returns a copy of the {cls._name} instance with all references to model items
+        resolved to bound copies of the items.
+
+        The parameter of the copy and its items are copies too and are appended to the parameter
+        slots, so that the copy can be filled by setting the slots.
+
+        Notes
+        -----
+
+        For internal use, see :class:`glotaran.model.BoundItem`.
+
+        Parameters
+        ----------
+        model :
+            A glotaran model.
+        parameter_slots :
+            The list the parameter of the copy are appended to.
+        """
+        item = copy.copy(self)
+        for name in self._glotaran_properties:
+            prop = getattr(self.__class__, name)
+            value = getattr(self, name)
+            value = prop.bind(value, model, parameter_slots)
+            setattr(item, name, value)
+        return item
+
+    return bind
+
+
 def _create_get_state_func(cls):
     @wrap_func_as_method(cls)
     def get_state(self) -> cls:
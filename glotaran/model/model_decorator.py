@@ -25,6 +25,20 @@ IndexDependedMatrixFunction = typing.Callable[
 ]
 """A `MatrixFunction` calculates the matrix for a model."""
 
+MatrixDerivativeFunction = typing.Callable[
+    [typing.Type[DatasetDescriptor], xr.Dataset, typing.Any],
+    typing.Tuple[typing.List[str], np.ndarray, typing.Dict[str, np.ndarray]],
+]
+"""A `MatrixDerivativeFunction` calculates the matrix for a model together with its derivatives
+with respect to the parameter, keyed by the full parameter label."""
+
+MatrixBlockFunction = typing.Callable[
+    [typing.Type[DatasetDescriptor], xr.Dataset, typing.List[typing.Any]],
+    typing.Tuple[typing.List[str], np.ndarray],
+]
+"""A `MatrixBlockFunction` calculates the matrices for a block of indices at once. The matrices
+are returned as one array with the shape (indices, model axis, clp)."""
+
 GlobalMatrixFunction = typing.Callable[
     [typing.Type[DatasetDescriptor], np.ndarray], typing.Tuple[typing.List[str], np.ndarray]
 ]
@@ -51,6 +65,8 @@ def model(
     dataset_type: typing.Type[DatasetDescriptor] = DatasetDescriptor,
     megacomplex_type: typing.Any = None,
     matrix: typing.Union[MatrixFunction, IndexDependedMatrixFunction] = None,
+    matrix_derivative: MatrixDerivativeFunction = None,
+    matrix_block: MatrixBlockFunction = None,
     global_matrix: GlobalMatrixFunction = None,
     model_dimension: str = None,
     global_dimension: str = None,
@@ -81,6 +97,13 @@ def model(
         :func:`glotaran.model.model_attribute` decorator.
     matrix :
         A function to calculate the matrix for the model.
+    matrix_derivative :
+        A function to calculate the matrix for the model and its derivatives with respect to the
+        parameter. If given, the optimization uses an analytic Jacobian. Parameter which are not
+        in the derivatives get their derivatives by finite differences.
+    matrix_block :
+        A function to calculate the matrices of an index dependent model for a block of indices
+        at once. If given, it is used instead of `matrix` for datasets which are not grouped.
     global_matrix :
         A function to calculate the global matrix for the model.
     model_dimension :
@@ -162,6 +185,20 @@ def model(
         setattr(cls, "matrix", mat)
         setattr(cls, "model_dimension", model_dimension)
 
+        if matrix_derivative:
+            d_mat = wrap_func_as_method(cls, name="matrix_derivative")(matrix_derivative)
+            d_mat = staticmethod(d_mat)
+            setattr(cls, "matrix_derivative", d_mat)
+        else:
+            setattr(cls, "matrix_derivative", None)
+
+        if matrix_block:
+            b_mat = wrap_func_as_method(cls, name="matrix_block")(matrix_block)
+            b_mat = staticmethod(b_mat)
+            setattr(cls, "matrix_block", b_mat)
+        else:
+            setattr(cls, "matrix_block", None)
+
         if global_matrix:
             g_mat = wrap_func_as_method(cls, name="global_matrix")(global_matrix)
             g_mat = staticmethod(g_mat)
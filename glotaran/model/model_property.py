@@ -1,5 +1,6 @@
 """The model property class."""
 
+import copy
 import typing
 
 from glotaran.parameter import Parameter
@@ -117,6 +118,38 @@ class ModelProperty(property):
 
         return value
 
+    def bind(self, value, model, parameter_slots):
+
+        if value is None:
+            return None
+
+        if self._is_parameter:
+
+            if self._is_parameter_value:
+                value = copy.deepcopy(value)
+                parameter_slots.append(value)
+
+            elif self._is_parameter_list:
+                value = [copy.deepcopy(v) for v in value]
+                parameter_slots += value
+
+            elif self._is_parameter_dict:
+                value = {k: copy.deepcopy(v) for k, v in value.items()}
+                parameter_slots += value.values()
+
+        elif hasattr(model, self._name):
+            if isinstance(value, list):
+                value = [getattr(model, self._name)[v].bind(model, parameter_slots) for v in value]
+            elif isinstance(value, dict):
+                value = {
+                    k: getattr(model, self._name)[v].bind(model, parameter_slots)
+                    for (k, v) in value.items()
+                }
+            else:
+                value = getattr(model, self._name)[value].bind(model, parameter_slots)
+
+        return value
+
     def _determine_if_parameter(self, type):
         self._is_parameter_value = type is Parameter
         self._is_parameter_list = (
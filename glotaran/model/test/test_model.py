@@ -1,9 +1,11 @@
+import copy
 from typing import Dict
 from typing import List
 from typing import Tuple
 
 import pytest
 
+from glotaran.model import BoundItem
 from glotaran.model import Model
 from glotaran.model import model
 from glotaran.model import model_attribute
@@ -192,3 +194,24 @@ def test_fill(model, parameter):
     assert t.param_list == [3]
     assert t.default_item == 7
     assert t.complex == {}
+
+
+def test_bound_item(model, parameter):
+    bound = BoundItem(model.get_test("t1"), model)
+    t = bound.fill(parameter)
+    assert t.param == 3
+    assert t.megacomplex.label == "m1"
+    assert t.param_list == [4, 2]
+    assert t.default_item == 42
+    assert t.complex == {("s1", "s2"): 2}
+
+    # filling writes into the same item and leaves the model untouched
+    changed = copy.deepcopy(parameter)
+    changed.get("foo").value = 9
+    assert bound.fill(changed) is t
+    assert t.param == 9
+    assert model.get_test("t1").fill(model, parameter).param == 3
+
+    dataset = BoundItem(model.get_dataset("dataset2"), model).fill(parameter)
+    assert [cmplx.label for cmplx in dataset.megacomplex] == ["m2"]
+    assert dataset.scale == 8
@@ -1,5 +1,7 @@
 from . import parameter
 from . import parameter_group
+from . import parameter_layout
 
 Parameter = parameter.Parameter
 ParameterGroup = parameter_group.ParameterGroup
+ParameterLayout = parameter_layout.ParameterLayout
@@ -35,6 +35,7 @@ class ParameterGroup(dict):
         self._label = label
         self._parameters = {}
         self._root = None
+        self._index = None
         super().__init__()
 
     @classmethod
@@ -281,6 +282,7 @@ class ParameterGroup(dict):
                 p.label = f"{p.index}"
             p.full_label = f"{self.label}.{p.label}" if self.label else p.label
             self._parameters[p.label] = p
+        self._invalidate_index()
 
     def add_group(self, group: "ParameterGroup"):
         """Adds a :class:`ParameterGroup` to the group.
@@ -294,6 +296,7 @@ class ParameterGroup(dict):
             raise TypeError("Group must be glotaran.model.ParameterGroup")
         group.set_root(self)
         self[group.label] = group
+        self._invalidate_index()
 
     def set_root(self, root: "ParameterGroup"):
         """Sets the root of the group.
@@ -351,6 +354,11 @@ class ParameterGroup(dict):
         # sometimes the spec parser delivers the labels as int
         label = str(label)
 
+        if self._index is None:
+            self._index = dict(self.all())
+        if label in self._index:
+            return self._index[label]
+
         path = label.split(".")
         label = path.pop()
 
@@ -366,6 +374,12 @@ class ParameterGroup(dict):
         except KeyError:
             raise ParameterNotFoundException(path, label)
 
+    def _invalidate_index(self):
+        group = self
+        while group is not None:
+            group._index = None
+            group = group._root
+
     def all(
         self, root: str = None, separator: str = "."
     ) -> typing.Generator[typing.Tuple[str, Parameter], None, None]:
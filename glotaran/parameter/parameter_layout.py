@@ -0,0 +1,117 @@
+"""The array backed layout of a parameter group."""
+
+import copy
+import typing
+
+import numpy as np
+from lmfit import Parameters
+
+from .parameter_group import ParameterGroup
+
+
+class ParameterLayout:
+    """A compiled layout of the parameter of a :class:`ParameterGroup`.
+
+    The layout assigns every parameter a slot in a flat float64 array. It holds its own copy of
+    the group, whose parameter values are updated in place from such an array, so that turning
+    the values of an optimizer into a parameter group neither parses labels nor creates objects.
+
+    Notes
+    -----
+
+    The group returned by :meth:`update` is shared between calls and is only valid until the next
+    call. A layout must not be used by several threads at the same time.
+    """
+
+    def __init__(self, group: ParameterGroup):
+        """
+
+        Parameters
+        ----------
+        group :
+            The parameter group to compile the layout for.
+        """
+        self._group = copy.deepcopy(group)
+        labels_and_parameter = list(self._group.all())
+
+        self._labels = [label for label, _ in labels_and_parameter]
+        self._parameter = [parameter for _, parameter in labels_and_parameter]
+        self._index = {label: i for i, label in enumerate(self._labels)}
+        # the names of the parameter in the dictionary created by `as_parameter_dict`
+        self._names = ["_" + label.replace(".", "_") for label in self._labels]
+        self._non_neg = np.asarray(
+            [parameter.non_neg for parameter in self._parameter], dtype=bool
+        )
+
+        # the values are set from the optimizer, expressions are evaluated by lmfit
+        for parameter in self._parameter:
+            parameter.expr = None
+
+    @property
+    def labels(self) -> typing.List[str]:
+        """The full labels of the parameter in the order of their slots."""
+        return list(self._labels)
+
+    @property
+    def size(self) -> int:
+        """The number of slots."""
+        return len(self._labels)
+
+    @property
+    def values(self) -> np.ndarray:
+        """The current values of the parameter."""
+        return np.asarray([parameter.value for parameter in self._parameter], dtype=np.float64)
+
+    def index(self, label: str) -> int:
+        """Returns the slot of a parameter.
+
+        Parameters
+        ----------
+        label :
+            The full label of the parameter.
+        """
+        return self._index[label]
+
+    def values_from_parameter_dict(self, parameter: Parameters) -> np.ndarray:
+        """Returns the values of an lmfit.Parameters dictionary as array in slot order.
+
+        The values of non-negative parameter are transformed back from logarithmic space.
+
+        Parameters
+        ----------
+        parameter :
+            A lmfit.Parameters dictionary created by
+            :meth:`ParameterGroup.as_parameter_dict` of the group of the layout.
+        """
+        values = np.fromiter(
+            (parameter[name].value for name in self._names), dtype=np.float64, count=self.size
+        )
+        np.exp(values, out=values, where=self._non_neg)
+        return values
+
+    def update(self, values: np.ndarray) -> ParameterGroup:
+        """Writes values into the group of the layout and returns the group.
+
+        Parameters
+        ----------
+        values :
+            The values of the parameter in slot order.
+        """
+        if len(values) != self.size:
+            raise ValueError(f"Expected {self.size} parameter values, got {len(values)}.")
+        for parameter, value in zip(self._parameter, np.asarray(values, dtype=float).tolist()):
+            parameter.value = value
+        return self._group
+
+    def update_from_parameter_dict(self, parameter: Parameters) -> ParameterGroup:
+        """Writes the values of an lmfit.Parameters dictionary into the group of the layout.
+
+        This is a replacement for :meth:`ParameterGroup.from_parameter_dict` in loops.
+
+        Parameters
+        ----------
+        parameter :
+            A lmfit.Parameters dictionary created by
+            :meth:`ParameterGroup.as_parameter_dict` of the group of the layout.
+        """
+        return self.update(self.values_from_parameter_dict(parameter))
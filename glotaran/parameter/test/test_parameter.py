@@ -1,6 +1,9 @@
 import numpy as np
+import pytest
 
+from glotaran.parameter import Parameter
 from glotaran.parameter import ParameterGroup
+from glotaran.parameter import ParameterLayout
 
 
 def test_param_array():
@@ -140,3 +143,52 @@ def test_non_negative():
         assert np.allclose(r.value, p.value)
         assert np.allclose(r.min, p.min)
         assert np.allclose(r.max, p.max)
+
+
+def test_parameter_layout():
+
+    params = """
+    kinetic:
+        - ["1", 0.5, {non-negative: True}]
+        - ["2", -1]
+    irf:
+        shape:
+            - ["width", 2, {non-negative: True, min: 1}]
+    """
+    params = ParameterGroup.from_yaml(params)
+    layout = ParameterLayout(params)
+
+    assert layout.labels == ["kinetic.1", "kinetic.2", "irf.shape.width"]
+    assert layout.index("irf.shape.width") == 2
+    assert np.allclose(layout.values, [0.5, -1, 2])
+
+    parameter_dict = params.as_parameter_dict()
+    parameter_dict["_kinetic_1"].value = np.log(0.7)
+    parameter_dict["_irf_shape_width"].value = np.log(3)
+    wanted = ParameterGroup.from_parameter_dict(parameter_dict)
+
+    assert np.allclose(layout.values_from_parameter_dict(parameter_dict), [0.7, -1, 3])
+    group = layout.update_from_parameter_dict(parameter_dict)
+    for label, p in wanted.all():
+        assert np.isclose(group.get(label).value, p.value)
+    # the layout works on a copy of the group
+    assert params.get("kinetic.1").value == 0.5
+    # the group of the layout is reused
+    assert layout.update([0.1, 0.2, 4]) is group
+    assert group.get("kinetic.2").value == 0.2
+
+    with pytest.raises(ValueError):
+        layout.update([1.0])
+
+
+def test_parameter_index():
+
+    params = ParameterGroup.from_dict({"kinetic": [1, 2]})
+    assert params.get("kinetic.1").value == 1
+
+    # the index of the labels is updated if parameter are added
+    params["kinetic"].add_parameter(Parameter.from_list_or_value(3))
+    params.add_group(ParameterGroup.from_list([4], label="irf"))
+    assert params.get("kinetic.3").value == 3
+    assert params.get("irf.1").value == 4
+    assert not params.has("kinetic.4")
@@ -1,12 +1,16 @@
 """A register for models"""
 import typing
 
-from glotaran.model.model import Model
+from glotaran.plugins import load_plugins
+
+if typing.TYPE_CHECKING:
+    # the model package registers models on import
+    from glotaran.model.model import Model
 
 _model_register = {}
 
 
-def register_model(model_type: str, model: Model):
+def register_model(model_type: str, model: "Model"):
     """register_model registers a model.
 
     Parameters
@@ -27,10 +31,11 @@ def known_model(model_type: str) -> bool:
     model_type :
         model_type is type of the model.
     """
+    load_plugins()
     return model_type in _model_register
 
 
-def get_model(model_type: str) -> Model:
+def get_model(model_type: str) -> "Model":
     """get_model gets a model from the register.
 
     Parameters
@@ -38,8 +43,10 @@ def get_model(model_type: str) -> Model:
     model_type :
         model_type is type of the model.
     """
+    load_plugins()
     return _model_register[model_type]
 
 
 def known_model_names() -> typing.List[str]:
+    load_plugins()
     return [name for name in _model_register]
@@ -0,0 +1,51 @@
+"""Discovery of the models and file formats of installed plugins.
+
+Plugins register their models and file formats when their module is imported. The modules are
+declared as entry points in the group ``glotaran.plugins`` and are loaded on the first lookup of
+a model or file format, not when glotaran is imported.
+"""
+import threading
+
+PLUGIN_GROUP = "glotaran.plugins"
+
+_lock = threading.RLock()
+_loaded = False
+_loading = False
+
+
+def load_plugins():
+    """Imports the modules of all installed plugins, if it was not done before.
+
+    Other threads wait until all plugins are loaded.
+    """
+    global _loaded, _loading
+    if _loaded:
+        return
+    with _lock:
+        # only the loading thread holds the lock while loading, so this is a plugin which looks
+        # up models while it is imported
+        if _loaded or _loading:
+            return
+        _loading = True
+        try:
+            for entry_point in _entry_points(PLUGIN_GROUP):
+                entry_point.load()
+            _loaded = True
+        finally:
+            _loading = False
+
+
+def _entry_points(group):
+    try:
+        from importlib.metadata import entry_points
+    except ImportError:
+        # python < 3.8
+        import pkg_resources
+
+        return list(pkg_resources.iter_entry_points(group))
+
+    entry_points = entry_points()
+    if hasattr(entry_points, "select"):
+        # python >= 3.10
+        return list(entry_points.select(group=group))
+    return list(entry_points.get(group, []))
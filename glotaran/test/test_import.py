@@ -0,0 +1,88 @@
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+IMPORT_TIME_BUDGET = 0.5
+"""The time in seconds importing glotaran or its cli may take."""
+
+HEAVY_MODULES = ["dask", "lmfit", "numba", "numpy", "pkg_resources", "scipy", "xarray"]
+
+
+@pytest.mark.parametrize("module", ["glotaran", "glotaran.cli.main"])
+def test_import_time(module):
+    # a new interpreter is needed, since glotaran is already imported by the other tests
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+        "print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))\n"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], check=True, stdout=subprocess.PIPE, universal_newlines=True
+    ).stdout.splitlines()
+
+    assert float(output[0]) < IMPORT_TIME_BUDGET
+    modules = output[1].split()
+    assert [name for name in HEAVY_MODULES if name in modules] == []
+
+
+def test_lazy_attributes():
+    import glotaran
+    from glotaran.parameter import ParameterGroup
+    from glotaran.parse import parser
+
+    assert glotaran.ParameterGroup is ParameterGroup
+    assert glotaran.read_parameter_from_yml == ParameterGroup.from_yaml
+    assert glotaran.read_model_from_yml is parser.load_yml
+    assert glotaran.io.read_data_file is not None
+    assert "model" in dir(glotaran)
+
+
+def test_plugins_are_loaded_on_lookup():
+    from glotaran.io.reader import known_reading_formats
+    from glotaran.parse.register import known_model
+
+    assert known_model("kinetic-spectrum")
+    assert "sdt" in known_reading_formats
+
+
+def test_plugins_are_loaded_once_for_all_threads(monkeypatch):
+    from glotaran import plugins
+
+    loaded = []
+    started = threading.Event()
+
+    class EntryPoint:
+        def load(self):
+            started.set()
+            # plugins may look up models while they are imported
+            plugins.load_plugins()
+            time.sleep(0.1)
+            loaded.append(self)
+
+    monkeypatch.setattr(plugins, "_loaded", False)
+    monkeypatch.setattr(plugins, "_entry_points", lambda group: [EntryPoint(), EntryPoint()])
+
+    first = threading.Thread(target=plugins.load_plugins)
+    first.start()
+    started.wait()
+    # the second thread returns only after the first one loaded all plugins
+    plugins.load_plugins()
+    assert len(loaded) == 2
+    first.join()
+    plugins.load_plugins()
+    assert len(loaded) == 2
+
+
+def test_cli_data_formats_are_loaded_on_use():
+    from click.testing import CliRunner
+
+    from glotaran.cli.main import glotaran
+
+    result = CliRunner().invoke(glotaran, ["optimize", "--dataformat", "unknown"])
+    assert result.exit_code == 2
+    assert "'sdt'" in result.output
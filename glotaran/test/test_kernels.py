@@ -0,0 +1,62 @@
+import importlib
+
+import pytest
+
+KERNELS = [
+    ("glotaran.analysis.variable_projection", "_calculate_stacked_variable_projection"),
+    ("glotaran.builtin.models.doas.doas_matrix", "calculate_doas_matrix_no_irf"),
+    ("glotaran.builtin.models.doas.doas_matrix", "calculate_doas_matrix_gaussian_irf"),
+    ("glotaran.builtin.models.doas.doas_matrix", "faddeeva"),
+    ("glotaran.builtin.models.kinetic_image.kinetic_image_matrix", "erf"),
+    ("glotaran.builtin.models.kinetic_image.kinetic_image_matrix", "erfcx"),
+    (
+        "glotaran.builtin.models.kinetic_image.kinetic_image_matrix",
+        "calculate_kinetic_matrix_no_irf",
+    ),
+    (
+        "glotaran.builtin.models.kinetic_image.kinetic_image_matrix",
+        "calculate_kinetic_matrix_gaussian_irf",
+    ),
+    (
+        "glotaran.builtin.models.kinetic_image.kinetic_image_matrix",
+        "calculate_kinetic_matrix_gaussian_irf_block",
+    ),
+    (
+        "glotaran.builtin.models.kinetic_image.kinetic_image_matrix",
+        "calculate_kinetic_matrix_gaussian_irf_derivatives",
+    ),
+    (
+        "glotaran.builtin.models.kinetic_spectrum.spectral_irf",
+        "IrfGaussianCoherentArtifact._calculate_coherent_artifact_matrix",
+    ),
+]
+
+
+def _kernel(module_name, name):
+    kernel = importlib.import_module(module_name)
+    for part in name.split("."):
+        kernel = getattr(kernel, part)
+    return kernel
+
+
+@pytest.mark.parametrize("module_name, name", KERNELS)
+def test_kernels_are_cached(module_name, name):
+    assert _kernel(module_name, name)._cache.__class__.__name__ == "FunctionCache"
+
+
+def test_warmup():
+    import glotaran
+
+    glotaran.warmup()
+    # erf, erfcx and faddeeva are compiled into the kernels which call them
+    signatures = {
+        kernel: list(_kernel(*kernel).signatures)
+        for kernel in KERNELS
+        if kernel[1] not in ["erf", "erfcx", "faddeeva"]
+    }
+    assert all(signatures.values())
+
+    # the simulation of the example evaluates the kinetic model with an irf
+    importlib.import_module("glotaran.examples.sequential")
+    for kernel, warm_signatures in signatures.items():
+        assert _kernel(*kernel).signatures == warm_signatures
@@ -69,6 +69,7 @@ setup(
     python_requires=">=3.6, <3.9",
     packages=find_packages(),
     install_requires=install_requires,
+    extras_require={"zarr": ["zarr>=2.4"]},
     entry_points=entry_points,
     test_suite="glotaran",
     tests_require=["pytest"],